@@ -0,0 +1,73 @@
+"""
+核心函数微基准：get_julian_day_with_time、get_planet_positions、calculate_house_cusps、
+calculate_aspects 与 plot_natal_chart 的单次调用耗时。
+
+结果写入 benchmarks/results/core-<时间戳>.json，并与上一次（或 --compare 指定的）结果比较，
+中位数变慢超过 10% 的项目标为 REGRESSION，此时退出码为 1，可直接用于 CI。
+
+用法:
+  python benchmarks/bench_core.py [--min-time 秒] [--only 名称 ...] [--compare 基准.json] [--output 路径]
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from harness import compare, latest_results, measure, save_results  # noqa: E402
+from visualization import (  # noqa: E402
+    calculate_aspects, calculate_house_cusps, get_julian_day_with_time, get_planet_positions, plot_natal_chart
+)
+
+LATITUDE, LONGITUDE = 25.03, 121.30
+
+
+def build_benchmarks(output_dir):
+    """返回 {名称: 无参数函数}；宫头有 LRU 缓存，依次使用不同的时刻，测得的是未命中缓存的耗时"""
+    julian_day = get_julian_day_with_time(1990, 5, 21, 14, 30, 0, 8)
+    positions = get_planet_positions(julian_day)
+    house_jds = itertools.cycle([julian_day + i / 1440 for i in range(10000)])
+    output_path = os.path.join(output_dir, "chart.png")
+    return {
+        "get_julian_day_with_time": lambda: get_julian_day_with_time(1990, 5, 21, 14, 30, 0, 8),
+        "get_planet_positions": lambda: get_planet_positions(julian_day),
+        "calculate_house_cusps": lambda: calculate_house_cusps(next(house_jds), LATITUDE, LONGITUDE),
+        "calculate_aspects": lambda: calculate_aspects(positions),
+        "plot_natal_chart": lambda: plot_natal_chart(positions, julian_day, LATITUDE, LONGITUDE,
+                                                     output_path=output_path, show=False),
+    }
+
+
+def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, func in build_benchmarks(output_dir).items():
+            if args.only and name not in args.only:
+                continue
+            stats = measure(func, min_time=args.min_time)
+            results[name] = stats
+            print(f"{name:<28} median {stats['median'] * 1e6:>12.1f} us  "
+                  f"min {stats['min'] * 1e6:>12.1f} us  stddev {stats['stddev'] * 1e6:>10.1f} us  "
+                  f"({stats['rounds']} rounds x {stats['iterations']})")
+
+    path = save_results("core", results, args.output)
+    print(f"\nresults saved to {path}")
+    baseline = args.compare or latest_results("core", exclude=path)
+    if baseline and compare(results, baseline):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-time", type=float, default=1.0, help="每项至少计时的秒数")
+    parser.add_argument("--only", nargs="*", help="只运行这些项目")
+    parser.add_argument("--compare", help="作为基准的结果文件，默认为上一次的结果")
+    parser.add_argument("--output", help="结果文件路径，默认写入 benchmarks/results/")
+    sys.exit(main(parser.parse_args()))
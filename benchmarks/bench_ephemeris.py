@@ -0,0 +1,56 @@
+"""
+比较 PositionEngine 与原有逐行星循环（get_planet_positions / calculate_planet_positions 的写法）的耗时。
+若 data/ephemeris_table.npz 存在，同时给出 Chebyshev 表求值的耗时。
+
+用法:
+  python benchmarks/bench_ephemeris.py              # 默认 1、1k、1M 个时刻
+  python benchmarks/bench_ephemeris.py 1 1000       # 自定义时刻数
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import swisseph as swe
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from ephemeris import PositionEngine, planet_codes  # noqa: E402
+from ephemeris_table import load_table  # noqa: E402
+
+
+def legacy_positions(julian_day):
+    # 原 visualization.get_planet_positions 的实现，作为基准
+    positions = {}
+    for planet, code in planet_codes.items():
+        result = swe.calc(julian_day, code, swe.FLG_SWIEPH | swe.FLG_SPEED)
+        pos = result[0][0] % 360
+        speed = result[0][3] if len(result[0]) > 3 else 0
+        positions[planet] = {'position': pos, 'retrograde': speed < 0, 'speed': speed}
+    return positions
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    engine = PositionEngine()
+    table = load_table()
+    header = f"{'timestamps':>12} {'legacy (s)':>12} {'engine (s)':>12} {'speedup':>8}"
+    print(header + (f" {'table (s)':>12} {'speedup':>8}" if table else ""))
+    for n in sizes:
+        jds = 2415020.5 + np.linspace(0, 73000, n)
+        legacy = timed(lambda: [legacy_positions(jd) for jd in jds])
+        batched = timed(lambda: engine.calc(jds))
+        line = f"{n:>12} {legacy:>12.4f} {batched:>12.4f} {legacy / batched:>7.2f}x"
+        if table:
+            cached = timed(lambda: table.calc(jds))
+            line += f" {cached:>12.4f} {legacy / cached:>7.2f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 1000, 1000000])
@@ -0,0 +1,80 @@
+"""
+冷启动基准：在全新的 Python 进程中导入各模块，报告导入耗时（不含解释器自身的启动时间）。
+用于跟踪无服务器与自动扩缩容部署中新进程处理第一个请求前的等待时间。
+
+结果写入 benchmarks/results/import-<时间戳>.json，并与上一次（或 --compare 指定的）结果比较，
+中位数变慢超过 10% 的项目标为 REGRESSION，此时退出码为 1。
+
+用法:
+  python benchmarks/bench_import.py [--rounds N] [--compare 基准.json] [--output 路径]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from harness import compare, latest_results, save_results
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# 名称 -> 要导入的模块；app 只返回 JSON 的路径不应导入 matplotlib
+MODULES = {
+    "astro": "astro",
+    "app": "app",
+    "visualization": "visualization",
+    "wsgi (PRELOAD_RENDERER=0)": "wsgi",
+}
+
+_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, int("matplotlib" in sys.modules))
+"""
+
+
+def import_time(module, output_dir):
+    """在子进程中导入 module，返回 (秒, 是否导入了 matplotlib)"""
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, CHART_OUTPUT_FOLDER=output_dir, PRELOAD_RENDERER="0")
+    result = subprocess.run([sys.executable, "-c", _SCRIPT.format(module=module)], capture_output=True,
+                            text=True, env=env, check=True)
+    elapsed, has_matplotlib = result.stdout.split()[-2:]
+    return float(elapsed), has_matplotlib == "1"
+
+
+def main(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, module in MODULES.items():
+            import_time(module, output_dir)  # 预热：生成 .pyc 与操作系统文件缓存
+            samples = []
+            for _ in range(args.rounds):
+                elapsed, has_matplotlib = import_time(module, output_dir)
+                samples.append(elapsed)
+            results[name] = {
+                "min": min(samples),
+                "median": statistics.median(samples),
+                "max": max(samples),
+                "rounds": len(samples),
+                "matplotlib": has_matplotlib
+            }
+            print(f"{name:<28} median {results[name]['median'] * 1000:>8.1f} ms  "
+                  f"min {results[name]['min'] * 1000:>8.1f} ms  matplotlib={'yes' if has_matplotlib else 'no'}")
+
+    path = save_results("import", results, args.output)
+    print(f"\nresults saved to {path}")
+    baseline = args.compare or latest_results("import", exclude=path)
+    if baseline and compare(results, baseline):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="每个模块导入的次数")
+    parser.add_argument("--compare", help="作为基准的结果文件，默认为上一次的结果")
+    parser.add_argument("--output", help="结果文件路径，默认写入 benchmarks/results/")
+    sys.exit(main(parser.parse_args()))
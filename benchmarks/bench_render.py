@@ -0,0 +1,45 @@
+"""
+命盘绘图基准：在单个进程（单核）内连续绘制 N 张命盘，报告每秒绘制张数。
+
+用法:
+  python benchmarks/bench_render.py [N]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from visualization import get_julian_day_with_time, get_planet_positions, plot_natal_chart  # noqa: E402
+
+
+def main(n):
+    # 出生时间逐张错开，使每张命盘的宫头与行星位置都不同
+    charts = []
+    for i in range(n):
+        julian_day = get_julian_day_with_time(1960 + i % 60, 1 + i % 12, 1 + i % 28, i % 24, 0, 0, 8)
+        charts.append((get_planet_positions(julian_day), julian_day, 25.03, 121.30))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        # 预热：字体缓存、图表模板等只在第一次绘制时构建
+        positions, julian_day, latitude, longitude = charts[0]
+        plot_natal_chart(positions, julian_day, latitude, longitude,
+                         output_path=os.path.join(output_dir, "warmup.png"), show=False)
+
+        start = time.perf_counter()
+        for i, (positions, julian_day, latitude, longitude) in enumerate(charts):
+            plot_natal_chart(positions, julian_day, latitude, longitude,
+                             output_path=os.path.join(output_dir, f"chart_{i}.png"), show=False)
+        elapsed = time.perf_counter() - start
+
+    print(f"{n} charts in {elapsed:.2f}s: {n / elapsed:.2f} charts/s per core "
+          f"({elapsed / n * 1000:.0f} ms/chart)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,115 @@
+"""
+基准测试的公共工具：计时、结果保存为 JSON，以及与上一次结果比较。
+
+计时方式与 pytest-benchmark 相同：先校准每轮的调用次数，使一轮至少耗时 MIN_ROUND_SECONDS，
+再重复多轮直到总耗时达到 min_time，报告单次调用的 min / median / mean / stddev。
+结果默认写入 benchmarks/results/（不纳入版本控制），文件名带时间戳，便于逐次比较。
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+MIN_ROUND_SECONDS = 0.01
+# 比较时中位数变慢超过该比例即视为退化
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(func, min_time=1.0, min_rounds=5, max_rounds=1000):
+    """反复调用 func（无参数），返回单次调用耗时（秒）的统计"""
+    func()  # 预热
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        iterations *= 10 if elapsed < MIN_ROUND_SECONDS / 10 else 2
+
+    samples = [elapsed / iterations]
+    total = elapsed
+    while (total < min_time or len(samples) < min_rounds) and len(samples) < max_rounds:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / iterations)
+        total += elapsed
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": len(samples),
+        "iterations": iterations
+    }
+
+
+def environment():
+    """记录结果时附带的运行环境，比较不同机器上的结果时用来提示"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def save_results(suite, results, path=None):
+    """把结果（{名称: 统计}）连同运行环境写入 JSON，返回文件路径"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"{suite}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"suite": suite, "environment": environment(), "results": results}, f, indent=2)
+    return path
+
+
+def latest_results(suite, exclude=None):
+    """返回 RESULTS_DIR 中该套件最近一次结果的路径，没有时返回 None"""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(name for name in os.listdir(RESULTS_DIR)
+                   if name.startswith(f"{suite}-") and name.endswith(".json"))
+    paths = [os.path.join(RESULTS_DIR, name) for name in names]
+    paths = [path for path in paths if exclude is None or os.path.abspath(path) != os.path.abspath(exclude)]
+    return paths[-1] if paths else None
+
+
+def compare(results, baseline_path, key="median", threshold=REGRESSION_THRESHOLD, higher_is_better=False):
+    """
+    打印本次结果与基准文件的对比，返回退化的项目名称列表。
+    key 为比较的统计量；higher_is_better 用于吞吐量之类越大越好的指标
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {os.path.basename(baseline_path)} "
+          f"(commit {baseline['environment'].get('commit') or '?'}):")
+    regressions = []
+    for name, stats in results.items():
+        old = baseline["results"].get(name)
+        if old is None or not old.get(key) or stats.get(key) is None:
+            continue
+        ratio = stats[key] / old[key]
+        slower = ratio < 1 - threshold if higher_is_better else ratio > 1 + threshold
+        if slower:
+            regressions.append(name)
+        print(f"  {name:<28} {old[key]:>12.6g} -> {stats[key]:>12.6g}  {ratio:6.2f}x"
+              + ("  REGRESSION" if slower else ""))
+    return regressions
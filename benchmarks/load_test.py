@@ -0,0 +1,138 @@
+"""
+HTTP 压力测试：以若干并发客户端持续向 /generate-chart 发送请求，报告吞吐量与延迟分位数。
+每个请求的出生时间都不同（按序号错开分钟数），不会命中命盘缓存，测得的是完整计算与绘图的开销。
+
+用法:
+  gunicorn wsgi:application                      # 另开终端启动服务
+  python benchmarks/load_test.py [--url URL] [--concurrency N] [--duration 秒] [--profile P] [--format F]
+  python benchmarks/load_test.py --local         # 不另起服务：在本进程内启动 Flask 应用（werkzeug 多线程服务器）
+
+--local 模式下客户端与服务端共用一个进程的 GIL，结果只适合同一台机器上逐次比较。
+结果写入 benchmarks/results/load-<时间戳>.json，并与上一次（或 --compare 指定的）结果比较，
+吞吐量下降超过 10% 时标为 REGRESSION，退出码为 1。
+
+参考结果（1 核 CPU、Linux，并发 4，持续 20 秒；gunicorn 为默认配置：1 worker × 4 线程、MAX_INFLIGHT_RENDERS=1）:
+                                   gunicorn                      python src/app.py（开发服务器）
+  profile=thumbnail format=png     2.6 req/s   p50 1.5 s         2.2 req/s   p50 1.8 s
+  profile=print     format=png     0.7 req/s   p50 5.4 s         0.7 req/s   p50 5.5 s
+  format=svg                       173 req/s   p50 22 ms         173 req/s   p50 23 ms
+绘图受 CPU 限制，单核上两者相差不大；gunicorn 的吞吐量大致随 worker 数（不超过核数）线性增加，
+且 worker 由已预热的主进程 fork 而来，不承担首个请求的冷启动开销。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from harness import compare, latest_results, save_results
+
+
+def build_record(i, profile, chart_format):
+    # 以序号错开出生时间，保证每个请求的缓存键不同
+    return {
+        "year": 1950 + i % 60, "month": 1 + i % 12, "day": 1 + i % 28,
+        "hour": i % 24, "minute": (i // 24) % 60,
+        "latitude": 25.03, "longitude": 121.30,
+        "profile": profile, "format": chart_format
+    }
+
+
+def run(url, concurrency, duration, profile, chart_format):
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter)
+            body = json.dumps(build_record(i, profile, chart_format)).encode("utf-8")
+            req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=300) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except OSError:
+                status = "connection error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+
+    result = {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "ok": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "status_codes": {str(status): count for status, count in statuses.items()}
+    }
+    print(f"{result['ok']} ok in {elapsed:.1f}s: {result['rps']:.2f} req/s, "
+          f"p50 {result['p50'] * 1000:.0f} ms, p95 {result['p95'] * 1000:.0f} ms, "
+          f"p99 {result['p99'] * 1000:.0f} ms")
+    print(f"status codes: {dict(statuses)}")
+    return result
+
+
+def start_local_server():
+    """在后台线程中启动 Flask 应用，返回 /generate-chart 的地址；图片写入临时目录"""
+    os.environ.setdefault("CHART_OUTPUT_FOLDER", tempfile.mkdtemp(prefix="load_test_"))
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+    from werkzeug.serving import make_server
+    import wsgi
+
+    # 应用逐条记录请求日志，压测时只保留警告以上
+    for name in ("", "werkzeug"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, wsgi.application, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/generate-chart"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000/generate-chart")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--profile", default="print")
+    parser.add_argument("--format", default="png")
+    parser.add_argument("--local", action="store_true", help="在本进程内启动应用，忽略 --url")
+    parser.add_argument("--compare", help="作为基准的结果文件，默认为上一次的结果")
+    parser.add_argument("--output", help="结果文件路径，默认写入 benchmarks/results/")
+    args = parser.parse_args()
+
+    url = start_local_server() if args.local else args.url
+    results = {f"{args.profile}/{args.format}": run(url, args.concurrency, args.duration, args.profile, args.format)}
+    path = save_results("load", results, args.output)
+    print(f"results saved to {path}")
+    baseline = args.compare or latest_results("load", exclude=path)
+    if baseline and compare(results, baseline, key="rps", higher_is_better=True):
+        sys.exit(1)
@@ -0,0 +1,14 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# src 下的模块之间以裸模块名互相导入（与 `python src/app.py` 运行方式一致）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+# 测试中 app 生成的图片写入临时目录（须在导入 app 之前设置），
+# 不在仓库的 src/output 中留下文件，也不会命中上一次运行留下的缓存
+_output_folder = tempfile.mkdtemp(prefix="chart_output_")
+os.environ["CHART_OUTPUT_FOLDER"] = _output_folder
+atexit.register(shutil.rmtree, _output_folder, ignore_errors=True)
@@ -0,0 +1,30 @@
+"""
+gunicorn 配置（Procfile 使用）：gunicorn wsgi:application
+
+可用环境变量调整：
+  PORT                  监听端口，默认 5000
+  WEB_CONCURRENCY       worker 进程数，默认为 CPU 核数
+  WEB_THREADS           每个 worker 的线程数，默认 4
+  WEB_TIMEOUT           单个请求的超时秒数，默认 120（300 dpi 绘图约需 1 秒）
+  MAX_INFLIGHT_RENDERS  每个 worker 同时进行的 matplotlib 绘图数，见 app.py
+  PRELOAD_RENDERER      为 0 时主进程不预加载 matplotlib 绘图代码，见 src/wsgi.py
+
+matplotlib 绘图期间持有 GIL，同一 worker 内的多个线程无法并行绘图；
+线程主要用于在绘图的同时处理只返回 JSON 的请求。需要更多绘图吞吐量时增加 worker 数。
+"""
+import multiprocessing
+import os
+
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+timeout = int(os.environ.get("WEB_TIMEOUT", 120))
+
+# 在主进程中导入应用（wsgi.preload），worker fork 后共享已初始化的内存
+preload_app = True
+
+# 重启 worker 以限制 matplotlib 缓存带来的内存增长，加随机量避免所有 worker 同时重启
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
@@ -1,16 +1,31 @@
+import base64
 import logging
 import os
+import threading
 import time
 import uuid
-
-import matplotlib
-from flask import Flask, request, jsonify, url_for, send_file
-
-matplotlib.use('Agg')  # 非交互式后端
-
-# 从 visualization 模块中导入所需函数
-from visualization import plot_natal_chart, get_planet_positions, get_julian_day_with_time, calculate_house_cusps, \
-    get_house, zodiac_signs, planet_symbols, zodiac_names
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from flask import Flask, Response, g, request, jsonify, url_for, send_file, stream_with_context
+
+# 计算与符号表来自 astro，不导入 matplotlib；栅格绘图所需的 visualization 在第一次绘图时才导入
+from astro import get_positions_with_backend, get_julian_day_with_time, calculate_house_cusps, \
+    get_planet_positions, julian_day_to_datetime, zodiac_signs, planet_symbols, zodiac_names, planet_codes
+from chart import Chart, aspect_arrays, charts_from_positions
+from ephemeris_data import warm_up_from_env
+from houses import DEFAULT_HOUSE_SYSTEM, HOUSE_SYSTEMS, batch_houses
+from chart_cache import ChartCache, VariantRegistry, chart_filename, chart_key
+from blob_store import BlobStore, blob_etag
+from render_queue import RenderQueue, RenderQueueFull
+from render_pool import RenderPool
+from transits import iter_json_lines, iter_npy_bytes, transit_count
+from events import DEFAULT_INDEX_PATH as DEFAULT_EVENT_INDEX_PATH, MAJOR_ASPECTS, find_aspect_events, \
+    find_next_event, load_event_index
+from synastry import composite, synastry
+from svg_chart import HAS_RASTERIZER, render_svg, svg_to_png
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, counter, finish_request, gauge, histogram, \
+    server_timing_header, stage, start_request
 
 # 初始化日志
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +33,114 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# 按 EPHE_WARM_YEARS 预热星历文件（未配置时跳过）
+warm_up_from_env()
+
+OUTPUT_FOLDER = os.environ.get("CHART_OUTPUT_FOLDER", os.path.join(os.path.dirname(__file__), "output"))
+
+# 宫位系统（请求字段 house_system，默认 Placidus）与绘图参数都参与缓存键的计算
+RENDER_OPTIONS = {"dpi": 300, "format": "png"}
+
+# 请求字段 format 可选的图片格式：{格式: 文件扩展名}
+#   png：matplotlib 绘制（默认）；png8：256 色调色板 PNG；webp：有损 WebP，后两者体积约为 png 的四分之一；
+#   svg：直接生成矢量图，只需几毫秒；svg-png：由 SVG 栅格化的 PNG，需安装可选的 cairosvg
+RENDER_FORMATS = {
+    "png": "png",
+    "png8": "png",
+    "webp": "webp",
+    "svg": "svg",
+    "svg-png": "png"
+}
+IMAGE_MIMETYPES = {"png": "image/png", "webp": "image/webp", "svg": "image/svg+xml"}
+
+# 请求字段 profile 可选的分辨率：{名称: dpi}。默认 print 与原先的 300 dpi 相同；
+# 响应中的 variants 列出同一命盘其他分辨率的链接，这些图片在第一次被请求时才绘制
+RENDER_PROFILES = {"thumbnail": 50, "web": 110, "print": 300}
+DEFAULT_RENDER_PROFILE = "print"
+
+# 命盘缓存：按 LRU 保留最近的 CHART_CACHE_SIZE 张图片；后台清理线程每 CHART_SWEEP_INTERVAL 秒
+# 删除生成超过 CHART_MAX_AGE 秒的图片，并把总大小限制在 CHART_CACHE_MAX_BYTES 以内（0 表示不限制）
+CHART_MAX_AGE = int(os.environ.get("CHART_MAX_AGE", 3600))
+CHART_CACHE_MAX_BYTES = int(os.environ.get("CHART_CACHE_MAX_BYTES", 1024 ** 3))
+# 图片存储：CHART_STORAGE=disk（默认）写入输出目录；memory 时保存在进程内存中（最多 CHART_MEMORY_MAX_BYTES），
+# 不读写磁盘。memory 模式下各 worker 分别保存，多 worker 部署时应使用 inline=1 或会话粘滞
+CHART_STORAGE = os.environ.get("CHART_STORAGE", "disk")
+blob_store = BlobStore(max_bytes=int(os.environ.get("CHART_MEMORY_MAX_BYTES", 256 * 1024 ** 2))) \
+    if CHART_STORAGE == "memory" else None
+chart_cache = ChartCache(OUTPUT_FOLDER, max_entries=int(os.environ.get("CHART_CACHE_SIZE", 1000)),
+                         max_age=CHART_MAX_AGE or None, max_bytes=CHART_CACHE_MAX_BYTES or None,
+                         sweep_interval=int(os.environ.get("CHART_SWEEP_INTERVAL", 60)), blob_store=blob_store)
+pending_variants = VariantRegistry(max_entries=int(os.environ.get("CHART_CACHE_SIZE", 1000)))
+
+# 批量接口单次请求的记录数上限，以及每批向量化计算的记录数
+MAX_BATCH_RECORDS = int(os.environ.get("MAX_BATCH_RECORDS", 1000))
+BATCH_CHUNK_SIZE = 256
+
+# 行运接口单次请求的时刻数上限（默认约一年每分钟一个点）
+MAX_TRANSIT_STEPS = int(os.environ.get("MAX_TRANSIT_STEPS", 600000))
+
+# 相位事件搜索单次请求的最大天数
+MAX_EVENT_SEARCH_DAYS = float(os.environ.get("MAX_EVENT_SEARCH_DAYS", 3660))
+
+# 预先计算的换座与停滞事件索引（python src/events.py 生成）；不存在时 /next-event 改为即时搜索
+event_index = load_event_index(os.environ.get("EVENT_INDEX", DEFAULT_EVENT_INDEX_PATH))
+
+# /next-event 的事件类型 -> events 中的事件名
+NEXT_EVENT_KINDS = {
+    "ingress": ("ingress",),
+    "station": ("station_retrograde", "station_direct"),
+    "station_retrograde": ("station_retrograde",),
+    "station_direct": ("station_direct",)
+}
+
+# 多进程绘图池：RENDER_PROCESSES 大于 0 时绘图在独立进程中进行，可利用多核；
+# 为 0（默认）时在请求线程或后台线程中直接绘图
+RENDER_PROCESSES = int(os.environ.get("RENDER_PROCESSES", 0))
+render_pool = RenderPool(processes=RENDER_PROCESSES,
+                         max_tasks_per_child=int(os.environ.get("RENDER_MAX_TASKS_PER_CHILD", 200))) \
+    if RENDER_PROCESSES > 0 else None
+
+# 后台绘图队列：请求中带 "async": true 时先返回 JSON，图片由工作线程生成；
+# 启用进程池时工作线程只负责派发任务，数量至少与进程数相同
+render_queue = RenderQueue(workers=int(os.environ.get("RENDER_WORKERS", max(2, RENDER_PROCESSES))),
+                           max_pending=int(os.environ.get("RENDER_QUEUE_SIZE", 32)))
+
+# 每个 worker 进程同时进行的 matplotlib 绘图数上限，同步请求、后台队列与按需绘制的变体共用。
+# 进程内绘图受 GIL 限制，并发绘图只会增加内存占用，默认只允许 1 个；启用进程池时与进程数相同。
+# 同步请求最多等待 RENDER_SLOT_TIMEOUT 秒，仍无空位时返回 503
+MAX_INFLIGHT_RENDERS = int(os.environ.get("MAX_INFLIGHT_RENDERS", max(1, RENDER_PROCESSES)))
+RENDER_SLOT_TIMEOUT = float(os.environ.get("RENDER_SLOT_TIMEOUT", 30))
+render_slots = threading.BoundedSemaphore(MAX_INFLIGHT_RENDERS)
+
+# 指标（/metrics）：各处理阶段的耗时直方图由 metrics.stage 记录，这里定义其余指标
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "HTTP request latency", ["endpoint"])
+CHART_CACHE_REQUESTS = counter("chart_cache_requests_total", "Chart cache lookups in /generate-chart", ["result"])
+gauge("chart_cache_entries", "Charts in the cache").set_function(lambda: len(chart_cache))
+gauge("render_queue_depth", "Renders queued or in progress in the background queue").set_function(
+    lambda: render_queue.pending_count())
+gauge("chart_cache_bytes", "Total size of the cached chart files").set_function(lambda: chart_cache.total_bytes)
+
+
+@app.before_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    start_request()
+
+
+@app.after_request
+def add_server_timing(response):
+    """记录请求耗时，并以 Server-Timing 响应头返回本次请求各阶段的耗时（毫秒）"""
+    elapsed = time.perf_counter() - g.request_start
+    REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "none")
+    response.headers["Server-Timing"] = server_timing_header(finish_request() + [("total", elapsed)])
+    return response
+
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus 文本格式的指标；多 worker 部署时每个进程各自统计"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route("/")
 def home():
     return "Server is running!"
@@ -29,62 +152,6 @@ def favicon():
         return send_file(icon_path, mimetype="image/vnd.microsoft.icon")
     return '', 404
 
-def calculate_aspects(planet_positions):
-    """
-    根据行星间角度，自动判断主要及辅助相位，并返回一个包含
-    (行星1, 行星2, 相位线颜色, 实际角度差, 标准相位角) 的列表。
-
-    新增相位包括：
-      - 半六分相：30° (容差 3°, 颜色 "magenta")
-      - 半方相：45° (容差 3°, 颜色 "cyan")
-      - 七分相：约51.43° (容差 3°, 颜色 "olive")
-      - 五分相：72° (容差 3°, 颜色 "teal")
-      - Sesquisquare：135° (容差 3°, 颜色 "pink")
-      - 双五分相：144° (容差 3°, 颜色 "brown")
-      - 欠刑相：150° (容差 3°, 颜色 "gray")
-    同时保留原有的主要相位：
-      - 合相：0° (容差 8°, 颜色 "purple")
-      - 六分相：60° (容差 6°, 颜色 "green")
-      - 四分相：90° (容差 6°, 颜色 "blue")
-      - 拱相：120° (容差 6°, 颜色 "orange")
-      - 对分相：180° (容差 8°, 颜色 "red")
-    """
-    aspects_def = [
-        (0, 8, 'purple'),
-        (30, 3, 'magenta'),
-        (45, 3, 'cyan'),
-        (51.43, 3, 'olive'),
-        (60, 6, 'green'),
-        (72, 3, 'teal'),
-        (90, 6, 'blue'),
-        (120, 6, 'orange'),
-        (135, 3, 'pink'),
-        (144, 3, 'brown'),
-        (150, 3, 'gray'),
-        (180, 8, 'red')
-    ]
-    aspect_lines = []
-    planets = list(planet_positions.keys())
-    for i in range(len(planets)):
-        for j in range(i + 1, len(planets)):
-            pos1 = planet_positions[planets[i]]['position']
-            pos2 = planet_positions[planets[j]]['position']
-            diff = abs(pos1 - pos2) % 360
-            if diff > 180:
-                diff = 360 - diff
-            best = None
-            best_error = None
-            for aspect_angle, orb, color in aspects_def:
-                error = abs(diff - aspect_angle)
-                if error <= orb:
-                    if best_error is None or error < best_error:
-                        best = (aspect_angle, color)
-                        best_error = error
-            if best is not None:
-                aspect_angle, color = best
-                aspect_lines.append((planets[i], planets[j], color, diff, aspect_angle))
-    return aspect_lines
-
 # 在文件顶部增加辅助字典
 planet_names_en = {
     "Sun": "Sun",
@@ -143,20 +210,41 @@ def generate_chart():
     minute = data.get("minute")
     latitude = data.get("latitude")
     longitude = data.get("longitude")
+    house_system = data.get("house_system", DEFAULT_HOUSE_SYSTEM)
+    chart_format = data.get("format", "png")
+    profile = data.get("profile", DEFAULT_RENDER_PROFILE)
+    # ?inline=1：响应中以 data URI 直接附上图片（chart_data），客户端无需再请求 chart_url
+    inline = request.args.get("inline") in ("1", "true")
 
     # 检查必要字段是否均有提供
     if any(value is None for value in [year, month, day, hour, minute, latitude, longitude]):
         logger.error("Invalid request: Missing required fields")
         return jsonify({"error": "Invalid request: Missing required fields"}), 400
 
-    # 建立输出文件夹，并产生唯一文件名
-    output_folder = os.path.join(os.path.dirname(__file__), "output")
-    os.makedirs(output_folder, exist_ok=True)
-    output_filename = f"natal_chart_{uuid.uuid4().hex}.png"
-    output_path = os.path.join(output_folder, output_filename)
-
-    # 清理过期的旧文件
-    clean_output_folder(output_folder, max_age_seconds=3600)
+    try:
+        latitude, longitude = parse_coordinates(latitude, longitude)
+    except ValueError as e:
+        logger.error(f"Invalid request: {e}")
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+
+    if not isinstance(house_system, str) or house_system not in HOUSE_SYSTEMS:
+        logger.error(f"Invalid request: Unsupported house system {house_system!r}")
+        return jsonify({"error": f"Invalid request: house_system must be one of {', '.join(HOUSE_SYSTEMS)}"}), 400
+
+    if not isinstance(chart_format, str) or chart_format not in RENDER_FORMATS or \
+            (chart_format == "svg-png" and not HAS_RASTERIZER):
+        available = [name for name in RENDER_FORMATS if name != "svg-png" or HAS_RASTERIZER]
+        logger.error(f"Invalid request: Unsupported format {chart_format!r}")
+        return jsonify({"error": f"Invalid request: format must be one of {', '.join(available)}"}), 400
+
+    if not isinstance(profile, str) or profile not in RENDER_PROFILES:
+        logger.error(f"Invalid request: Unsupported profile {profile!r}")
+        return jsonify({"error": f"Invalid request: profile must be one of {', '.join(RENDER_PROFILES)}"}), 400
+
+    run_async = data.get("async", False)
+    if not isinstance(run_async, bool):
+        logger.error(f"Invalid request: Unsupported async {run_async!r}")
+        return jsonify({"error": "Invalid request: async must be true or false"}), 400
 
     try:
         # 设置默认秒数与时区（此处固定为 UTC+8）
@@ -164,39 +252,198 @@ def generate_chart():
         timezone_offset = 8
 
         # 计算 Julian Day
-        julian_day = get_julian_day_with_time(year, month, day, hour, minute, second, timezone_offset)
+        with stage("julian_day"):
+            julian_day = get_julian_day_with_time(year, month, day, hour, minute, second, timezone_offset)
+    except Exception as e:
+        logger.error(f"Error calculating julian day: {e}")
+        return jsonify({"error": "Error occurred during calculation."}), 500
 
-        # 计算行星位置
-        positions = get_planet_positions(julian_day)
-        logger.info(f"Calculated positions: {positions}")
+    # 相同出生资料直接返回缓存的图片与行星信息，不再重新计算和绘图
+    cache_key = chart_key(julian_day, latitude, longitude, house_system, render_options(chart_format, profile))
+    cached = chart_cache.get(cache_key)
+    image_bytes = load_chart_bytes(cached["filename"]) if cached is not None and inline else None
+    if inline and image_bytes is None:
+        cached = None
+    if cached is not None and "planetary_positions" in cached:
+        logger.info(f"Chart cache hit: {cached['filename']}")
+        CHART_CACHE_REQUESTS.inc(result="hit")
+        register_variants(cached)
+        return chart_response(cached, latitude, longitude, image_bytes=image_bytes)
+    CHART_CACHE_REQUESTS.inc(result="miss")
 
-        # 计算相位线
-        aspect_lines = calculate_aspects(positions)
+    try:
+        # 计算行星位置，并记录实际提供数据的星历后端
+        with stage("positions"):
+            positions_array, ephemeris_backend = get_positions_with_backend(julian_day)
+        logger.info(f"Calculated positions ({ephemeris_backend}): "
+                    f"{dict(zip(planet_codes, positions_array[0]['lon'].tolist()))}")
+
+        # 计算相位与宫头，连同星座、宫位等派生字段一次存入 Chart
+        with stage("aspects"):
+            aspects = aspect_arrays(positions_array['lon'])[0]
+        with stage("houses"):
+            house_cusps = calculate_house_cusps(julian_day, latitude, longitude, house_system)
+            chart = Chart.from_row(positions_array[0], planet_codes, house_cusps, aspects)
     except Exception as e:
-        logger.error(f"Error calculating positions or aspects: {e}")
+        logger.error(f"Error calculating positions, aspects or houses: {e}")
         return jsonify({"error": "Error occurred during calculation."}), 500
 
-    # 更新文件名以确保唯一性，并生成完整路径
-    output_filename = f"natal_chart_{uuid.uuid4().hex}.png"
-    output_path = os.path.join(output_folder, output_filename)
+    entry = chart_entry(chart, cache_key, julian_day, latitude, longitude, house_system, ephemeris_backend,
+                        chart_format)
+    output_path = os.path.join(OUTPUT_FOLDER, entry["filename"])
+    dpi = RENDER_PROFILES[profile]
+
+    # 图片已存在（例如重启前生成的）时跳过绘图
+    if cached is not None:
+        chart_cache.put(cache_key, entry)
+        register_variants(entry)
+        return chart_response(entry, latitude, longitude, image_bytes=image_bytes)
+
+    register_variants(entry)
+
+    # 异步模式：绘图交给后台队列，立即返回行星数据；图片生成后再写入缓存。inline 时忽略
+    if run_async and not inline:
+        try:
+            render_queue.submit(entry["filename"], render_chart_file, chart, output_path, chart_format, dpi,
+                                block=True, on_done=lambda: chart_cache.put(cache_key, entry))
+        except RenderQueueFull as e:
+            logger.warning(str(e))
+            return busy_response()
+        return chart_response(entry, latitude, longitude, status="pending")
+
     try:
-        plot_natal_chart(positions, julian_day, latitude, longitude,
-                         aspect_lines=aspect_lines, output_path=output_path, show=False)
-        logger.info(f"Chart saved successfully to: {output_path}")
+        image_bytes = render_chart_file(chart, output_path, chart_format, dpi)
+    except RenderQueueFull as e:
+        logger.warning(str(e))
+        return busy_response()
     except Exception as e:
         logger.error(f"Error saving chart: {e}")
         return jsonify({"error": "Error occurred while generating the chart."}), 500
 
-    # 构造包含行星信息的 JSON 数组
-    house_cusps = calculate_house_cusps(julian_day, latitude, longitude)
+    chart_cache.put(cache_key, entry)
+    return chart_response(entry, latitude, longitude, image_bytes=image_bytes if inline else None)
+
+
+def chart_entry(chart, cache_key, julian_day, latitude, longitude, house_system, ephemeris_backend,
+                chart_format="png", planetary_positions=None):
+    """/generate-chart 与批量接口共用的缓存条目，两者写入同一缓存键时内容相同"""
+    entry = {
+        "filename": chart_filename(cache_key, RENDER_FORMATS[chart_format]),
+        "ephemeris_backend": ephemeris_backend,
+        "house_system": house_system,
+        "planetary_positions": planetary_positions or chart_planetary_positions(chart),
+        # 以下字段不出现在响应中，供按需绘制其他分辨率时使用
+        "format": chart_format,
+        "chart": chart
+    }
+    if chart_format != "svg":
+        entry["variants"] = {}
+        for name in RENDER_PROFILES:
+            variant_key = chart_key(julian_day, latitude, longitude, house_system, render_options(chart_format, name))
+            entry["variants"][name] = (variant_key, chart_filename(variant_key, RENDER_FORMATS[chart_format]))
+    return entry
+
+
+def render_options(chart_format, profile=DEFAULT_RENDER_PROFILE):
+    """
+    参与缓存键计算的绘图参数；默认的 png、print 与原先的 RENDER_OPTIONS 相同，已有缓存保持有效。
+    svg 与分辨率无关，只有一种
+    """
+    if chart_format == "svg":
+        return dict(RENDER_OPTIONS, format=chart_format)
+    return dict(RENDER_OPTIONS, format=chart_format, dpi=RENDER_PROFILES[profile])
+
+
+def register_variants(entry):
+    """登记尚未生成的其他分辨率，/output 第一次请求时再绘制"""
+    for profile, (variant_key, filename) in entry.get("variants", {}).items():
+        if filename != entry["filename"] and chart_cache.get(variant_key) is None:
+            pending_variants.register(filename, (variant_key, profile, entry))
+
+
+def busy_response():
+    response = jsonify({"error": "Server is busy rendering charts, please retry later."})
+    response.headers["Retry-After"] = str(render_queue.retry_after())
+    return response, 503
+
+
+def render_chart_file(chart, output_path, chart_format="png", dpi=RENDER_OPTIONS["dpi"], block=False):
+    """
+    绘制命盘（Chart）图片，由 store_chart 保存并返回图片字节。
+    matplotlib 绘图需取得 render_slots 的空位：block 为 True（后台队列）时一直等待，
+    否则等待超过 RENDER_SLOT_TIMEOUT 秒后抛出 RenderQueueFull
+    """
+    if chart_format in ("svg", "svg-png"):
+        # 矢量绘图只需几毫秒，直接在当前线程完成，不经过进程池
+        with stage("render_svg"):
+            svg = render_svg(chart)
+            image_bytes = svg.encode("utf-8") if chart_format == "svg" else svg_to_png(svg, dpi)
+    else:
+        with stage("render_wait"):
+            acquired = render_slots.acquire(timeout=None if block else RENDER_SLOT_TIMEOUT)
+        if not acquired:
+            raise RenderQueueFull(f"Too many renders in progress ({MAX_INFLIGHT_RENDERS} per worker)")
+        try:
+            # 进程内绘图时 render_chart_image 另外记录 draw 与 savefig 两个阶段
+            with stage("render"):
+                if render_pool is not None:
+                    image_bytes = render_pool.render_chart(chart, dpi, chart_format)
+                else:
+                    import visualization
+                    image_bytes = visualization.render_chart(chart, dpi, chart_format)
+        finally:
+            render_slots.release()
+    with stage("write"):
+        store_chart(output_path, image_bytes)
+    logger.info(f"Chart saved successfully to: {output_path}")
+    return image_bytes
+
+
+def store_chart(output_path, image_bytes):
+    """
+    保存图片：memory 模式下存入 blob_store（键为文件名）；
+    否则先写入临时文件再原子替换，避免并发的相同请求读到写了一半的图片
+    """
+    if blob_store is not None:
+        blob_store.put(os.path.basename(output_path), image_bytes)
+        return
+    temp_path = os.path.join(os.path.dirname(output_path), f".{uuid.uuid4().hex}{os.path.splitext(output_path)[1]}")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(image_bytes)
+        os.replace(temp_path, output_path)
+    except OSError:
+        # 临时文件不符合 natal_chart_* 命名，启动时不会被索引或清理，失败时立即删除
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_chart_bytes(filename):
+    """读取已保存的图片，不存在时返回 None"""
+    if blob_store is not None:
+        blob = blob_store.get(filename)
+        return blob[0] if blob is not None else None
+    try:
+        with open(os.path.join(OUTPUT_FOLDER, filename), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def build_planetary_positions(positions, house_cusps):
+    """由行星字典与宫头构造包含行星信息的 JSON 数组，见 chart_planetary_positions"""
+    return chart_planetary_positions(Chart.from_positions(positions, house_cusps, []))
+
+
+def chart_planetary_positions(chart):
+    """构造包含行星信息的 JSON 数组；星座、星座内度数与宫位直接取自 Chart"""
     planetary_positions = []
-    for planet, data in positions.items():
-        pos = data['position']
-        retrograde = data['retrograde']
-        idx = int(pos // 30) % 12
-        degree_in_sign = pos % 30
-        zodiac_value = f"{zodiac_signs[idx]}{degree_in_sign:.1f}°"
-        house_val = get_house(pos, house_cusps)
+    for planet, retrograde, idx, degree_in_sign, house_val in zip(
+            chart.bodies, chart.retrograde.tolist(), chart.sign_index.tolist(), chart.degree_in_sign.tolist(),
+            chart.houses.tolist()):
         planet_symbol = planet_symbols[planet] + (" R" if retrograde else "")
 
         p_name_en = planet_names_en.get(planet, planet)
@@ -219,33 +466,473 @@ def generate_chart():
             },
             "house": house_val
         })
+    return planetary_positions
 
-    chart_url = url_for('serve_output_file', filename=output_filename, _external=True)
-    return jsonify({
-        "message": "Chart generated successfully",
+
+def chart_response(entry, latitude, longitude, status="ready", image_bytes=None):
+    """
+    status 为 "pending" 时图片仍在后台绘制，返回 202，客户端可轮询 chart_url。
+    传入 image_bytes 时以 data URI 附在 chart_data 字段中
+    """
+    chart_url = url_for('serve_output_file', filename=entry["filename"], _external=True)
+    body = {
+        "message": "Chart generated successfully" if status == "ready" else "Chart rendering in progress",
+        "chart_status": status,
         "chart_url": chart_url,
         "latitude": latitude,
         "longitude": longitude,
-        "planetary_positions": planetary_positions
-    }), 200
+        "ephemeris_backend": entry["ephemeris_backend"],
+        "house_system": entry["house_system"],
+        "planetary_positions": entry["planetary_positions"],
+        "variants": {
+            profile: url_for('serve_output_file', filename=filename, _external=True)
+            for profile, (_, filename) in entry.get("variants", {}).items()
+        }
+    }
+    if image_bytes is not None:
+        mimetype = IMAGE_MIMETYPES[entry["filename"].rsplit(".", 1)[-1]]
+        body["chart_data"] = f"data:{mimetype};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+    response = jsonify(body)
+    if status == "pending":
+        response.headers["Retry-After"] = str(render_queue.retry_after())
+        return response, 202
+    return response, 200
+
+@app.route("/generate-charts", methods=["POST"])
+def generate_charts():
+    """
+    批量生成命盘：请求体为出生资料的 JSON 数组，或每行一条记录的 NDJSON（application/x-ndjson）。
+    每条记录的字段与 /generate-chart 相同，另可带 "id"（原样返回）和 "render"（是否绘图，默认否）。
+    以 NDJSON 流式返回，每条记录一行，"index" 为记录在请求中的序号；单条记录出错时该行只含 "error"。
+    """
+    try:
+        records = parse_batch_records()
+    except ValueError as e:
+        logger.error(f"Invalid batch request: {e}")
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+
+    if len(records) > MAX_BATCH_RECORDS:
+        return jsonify({"error": f"Too many records: at most {MAX_BATCH_RECORDS} per request"}), 413
+
+    return Response(stream_with_context(generate_batch_lines(records)), mimetype="application/x-ndjson")
+
+
+def parse_batch_records():
+    """读取批量请求中的记录列表，格式错误时抛出 ValueError"""
+    if request.is_json:
+        records = request.get_json(silent=True)
+    elif request.mimetype == "application/x-ndjson":
+        lines = request.get_data(as_text=True).splitlines()
+        try:
+            records = [app.json.loads(line) for line in lines if line.strip()]
+        except ValueError:
+            raise ValueError("Malformed NDJSON line")
+    else:
+        raise ValueError("Expected a JSON array or NDJSON")
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of birth records")
+    return records
+
+
+def generate_batch_lines(records):
+    """
+    按 BATCH_CHUNK_SIZE 分批：整批 Julian Day 一次算出行星位置与相位，
+    宫头按宫位系统分组批量计算、行星宫位一次判定，再逐条按需绘图，每完成一条就输出一行
+    """
+    for start in range(0, len(records), BATCH_CHUNK_SIZE):
+        parsed = []
+        for index, record in enumerate(records[start:start + BATCH_CHUNK_SIZE], start):
+            try:
+                parsed.append((index, record, *parse_birth_record(record)))
+            except ValueError as e:
+                yield batch_line({"index": index, "id": record_id(record), "error": str(e)})
+        if not parsed:
+            continue
+
+        try:
+            julian_days = np.array([item[2] for item in parsed])
+            positions_array, ephemeris_backend = get_positions_with_backend(julian_days)
+            aspects = aspect_arrays(positions_array['lon'])
+        except Exception as e:
+            logger.error(f"Error calculating batch positions or aspects: {e}")
+            for index, record, *_ in parsed:
+                yield batch_line({"index": index, "id": record_id(record),
+                                  "error": "Error occurred during calculation."})
+            continue
+
+        # 宫头按宫位系统整组计算；整组失败时逐条重算，只有本身无法计算的记录（如极圈内的 Placidus）
+        # 在 cusps 中保留 NaN
+        cusps = np.full((len(parsed), 12), np.nan)
+        systems = [item[5] for item in parsed]
+        for house_system in set(systems):
+            rows = [i for i, system in enumerate(systems) if system == house_system]
+            try:
+                cusps[rows] = batch_houses(julian_days[rows], [parsed[i][3] for i in rows],
+                                           [parsed[i][4] for i in rows], house_system)[0]
+                continue
+            except Exception as e:
+                logger.error(f"Error calculating {house_system} houses, retrying per record: {e}")
+            for i in rows:
+                try:
+                    cusps[i] = batch_houses(julian_days[i], parsed[i][3], parsed[i][4], house_system)[0][0]
+                except Exception as e:
+                    logger.error(f"Error calculating {house_system} houses for record {parsed[i][0]}: {e}")
+        failed = np.isnan(cusps).any(axis=1)
+        cusps[failed] = 0  # 占位，避免把 NaN 转换为星座下标；这些记录只输出错误行
+        charts = charts_from_positions(positions_array, cusps, planet_codes, aspects)
+
+        for (index, record, julian_day, latitude, longitude, house_system), chart, chart_failed in zip(
+                parsed, charts, failed.tolist()):
+            if chart_failed:
+                yield batch_line({"index": index, "id": record_id(record),
+                                  "error": "Error occurred during calculation."})
+                continue
+            result = {
+                "index": index,
+                "id": record_id(record),
+                "latitude": latitude,
+                "longitude": longitude,
+                "ephemeris_backend": ephemeris_backend,
+                "house_system": house_system,
+                "planetary_positions": chart_planetary_positions(chart),
+                "aspects": aspect_list(chart.aspect_lines())
+            }
+            if record.get("render"):
+                result.update(render_batch_chart(chart, julian_day, latitude, longitude, house_system,
+                                                 ephemeris_backend, result["planetary_positions"]))
+            yield batch_line(result)
+
+
+def parse_coordinates(latitude, longitude):
+    """把经纬度转换为 float 并检查范围（纬度 ±90°，经度 ±180°），无效时抛出 ValueError"""
+    try:
+        if isinstance(latitude, bool) or isinstance(longitude, bool):
+            raise TypeError("boolean coordinates")
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must be numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be within [-90, 90] and longitude within [-180, 180]")
+    return latitude, longitude
+
+
+def parse_birth_record(record):
+    """
+    校验单条出生资料并计算 Julian Day，返回 (julian_day, latitude, longitude, house_system)；
+    无效时抛出 ValueError
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Invalid record: Expected JSON object")
+    fields = [record.get(name) for name in ("year", "month", "day", "hour", "minute", "latitude", "longitude")]
+    if any(value is None for value in fields):
+        raise ValueError("Invalid record: Missing required fields")
+    house_system = record.get("house_system", DEFAULT_HOUSE_SYSTEM)
+    if not isinstance(house_system, str) or house_system not in HOUSE_SYSTEMS:
+        raise ValueError(f"Invalid record: house_system must be one of {', '.join(HOUSE_SYSTEMS)}")
+    year, month, day, hour, minute, latitude, longitude = fields
+    try:
+        latitude, longitude = parse_coordinates(latitude, longitude)
+    except ValueError as e:
+        raise ValueError(f"Invalid record: {e}")
+    try:
+        # 与 /generate-chart 相同：秒数为 0，时区固定为 UTC+8
+        julian_day = get_julian_day_with_time(year, month, day, hour, minute, 0, 8)
+    except Exception as e:
+        logger.error(f"Error calculating julian day: {e}")
+        raise ValueError("Error occurred during calculation.")
+    return julian_day, latitude, longitude, house_system
+
+
+def render_batch_chart(chart, julian_day, latitude, longitude, house_system, ephemeris_backend, planetary_positions):
+    """为批量记录绘图（已缓存时直接复用），返回要合并进结果行的字段"""
+    cache_key = chart_key(julian_day, latitude, longitude, house_system, render_options("png"))
+    entry = chart_entry(chart, cache_key, julian_day, latitude, longitude, house_system, ephemeris_backend,
+                        planetary_positions=planetary_positions)
+    register_variants(entry)
+    if chart_cache.get(cache_key) is None:
+        try:
+            render_chart_file(chart, os.path.join(OUTPUT_FOLDER, entry["filename"]))
+        except Exception as e:
+            logger.error(f"Error saving chart: {e}")
+            return {"chart_error": "Error occurred while generating the chart."}
+    chart_cache.put(cache_key, entry)
+    return {"chart_url": url_for('serve_output_file', filename=entry["filename"], _external=True)}
+
+
+def record_id(record):
+    return record.get("id") if isinstance(record, dict) else None
+
+
+def batch_line(result):
+    return app.json.dumps(result) + "\n"
+
+
+@app.route("/synastry", methods=["POST"])
+def synastry_chart():
+    """
+    比较盘：请求体 {"person1": 出生资料, "person2": 出生资料}，出生资料字段同 /generate-chart。
+    返回两人的行星信息、交叉相位，以及各自行星落入对方命盘的宫位；不绘图
+    """
+    pair, error = chart_pair()
+    if error is not None:
+        return error
+    planets, positions_array, ephemeris_backend, cusps, charts = pair
+    aspects, overlays = synastry(positions_array, cusps, planets)
+    return jsonify({
+        "ephemeris_backend": ephemeris_backend,
+        "charts": charts,
+        "aspects": aspect_list(aspects),
+        "house_overlays": {"person1_in_person2": overlays[0], "person2_in_person1": overlays[1]}
+    })
+
+
+@app.route("/composite", methods=["POST"])
+def composite_chart():
+    """组合盘：请求体同 /synastry，返回中点组合盘的行星信息、宫头与相位；不绘图"""
+    pair, error = chart_pair()
+    if error is not None:
+        return error
+    planets, positions_array, ephemeris_backend, cusps, charts = pair
+    if charts[0]["house_system"] != charts[1]["house_system"]:
+        logger.error("Invalid composite request: house systems differ")
+        return jsonify({"error": "Invalid request: person1 and person2 must use the same house_system"}), 400
+    positions, composite_cusps, aspects = composite(positions_array, cusps, planets)
+    return jsonify({
+        "ephemeris_backend": ephemeris_backend,
+        "charts": charts,
+        "composite": {
+            "house_cusps": composite_cusps.tolist(),
+            "planetary_positions": build_planetary_positions(positions, composite_cusps),
+            "aspects": aspect_list(aspects)
+        }
+    })
+
+
+def chart_pair():
+    """
+    /synastry 与 /composite 共用的计算：两人的行星位置一次批量算出，宫头经由 houses 的缓存取得；
+    命盘缓存中已有的出生资料直接复用其行星信息与图片链接。
+    返回 ((天体列表, 位置数组, 星历后端, 宫头, 两人的命盘信息), None)，出错时返回 (None, 错误响应)
+    """
+    if not request.is_json:
+        logger.error("Invalid request: Expected JSON")
+        return None, (jsonify({"error": "Invalid request: Expected JSON"}), 400)
+
+    data = request.json
+    try:
+        if not isinstance(data, dict):
+            raise ValueError("Invalid request: Expected JSON object")
+        parsed = [parse_birth_record(data.get(person)) for person in ("person1", "person2")]
+    except ValueError as e:
+        logger.error(f"Invalid pair request: {e}")
+        return None, (jsonify({"error": str(e)}), 400)
+
+    planets = list(planet_codes)
+    try:
+        positions_array, ephemeris_backend = get_positions_with_backend(np.array([item[0] for item in parsed]))
+        cusps = np.array([calculate_house_cusps(*item) for item in parsed])
+    except Exception as e:
+        logger.error(f"Error calculating pair positions or houses: {e}")
+        return None, (jsonify({"error": "Error occurred during calculation."}), 500)
+
+    charts = []
+    for (julian_day, latitude, longitude, house_system), row, house_cusps in zip(parsed, positions_array, cusps):
+        chart = {"latitude": latitude, "longitude": longitude, "house_system": house_system}
+        cached = chart_cache.get(chart_key(julian_day, latitude, longitude, house_system, RENDER_OPTIONS))
+        if cached is not None and "planetary_positions" in cached:
+            chart["planetary_positions"] = cached["planetary_positions"]
+            chart["chart_url"] = url_for('serve_output_file', filename=cached["filename"], _external=True)
+        else:
+            chart["planetary_positions"] = chart_planetary_positions(Chart.from_row(row, planets, house_cusps))
+        charts.append(chart)
+    return (planets, positions_array, ephemeris_backend, cusps, charts), None
+
+
+def aspect_list(aspect_lines):
+    return [
+        {"planets": [planet1, planet2], "aspect": aspect_angle, "difference": round(diff, 2)}
+        for planet1, planet2, _, diff, aspect_angle in aspect_lines
+    ]
+
+
+@app.route("/transits", methods=["POST"])
+def get_transits():
+    """
+    行运时间序列：请求体 {"start", "end", "step_minutes", "format"}。
+    start / end 为 ISO 8601 时间（未带时区的按 UTC+8），取样区间为 [start, end)；
+    step_minutes 默认 60；format 为 "json"（列式 NDJSON，默认）或 "npy"。结果分块流式输出
+    """
+    if not request.is_json:
+        logger.error("Invalid request: Expected JSON")
+        return jsonify({"error": "Invalid request: Expected JSON"}), 400
+
+    data = request.json
+    try:
+        start_jd = parse_datetime_jd(data["start"])
+        end_jd = parse_datetime_jd(data["end"])
+        step_days = float(data.get("step_minutes", 60)) / 1440
+        count = transit_count(start_jd, end_jd, step_days)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Invalid transit request: {e}")
+        return jsonify({"error": "Invalid request: start and end must be ISO 8601 datetimes, "
+                                 "step_minutes a positive number"}), 400
+
+    if count > MAX_TRANSIT_STEPS:
+        return jsonify({"error": f"Too many steps: at most {MAX_TRANSIT_STEPS} per request"}), 413
+
+    output_format = data.get("format", "json")
+    if output_format == "json":
+        return Response(iter_json_lines(start_jd, end_jd, step_days), mimetype="application/x-ndjson")
+    if output_format == "npy":
+        return Response(iter_npy_bytes(start_jd, end_jd, step_days), mimetype="application/octet-stream",
+                        headers={"Content-Disposition": "attachment; filename=transits.npy",
+                                 "X-Bodies": ",".join(planet_codes)})
+    return jsonify({"error": "Invalid request: format must be json or npy"}), 400
+
+
+@app.route("/transit-aspects", methods=["POST"])
+def transit_aspects():
+    """
+    行运对本命的精确相位时刻：请求体为出生资料（字段同 /generate-chart）加上
+    "start"、"end"（ISO 8601，未带时区的按 UTC+8），可选 "aspects"（相位角列表，默认主要相位）
+    与 "bodies"（行运天体列表，默认全部）。以 NDJSON 逐条返回，按时间排序
+    """
+    if not request.is_json:
+        logger.error("Invalid request: Expected JSON")
+        return jsonify({"error": "Invalid request: Expected JSON"}), 400
+
+    data = request.json
+    try:
+        natal_jd = parse_birth_record(data)[0]
+        start_jd = parse_datetime_jd(data["start"])
+        end_jd = parse_datetime_jd(data["end"])
+        aspects = data.get("aspects", list(MAJOR_ASPECTS))
+        bodies = data.get("bodies", list(planet_codes))
+        if not isinstance(aspects, list) or not aspects or \
+                any(isinstance(angle, bool) or not isinstance(angle, (int, float)) for angle in aspects):
+            raise ValueError("aspects must be a non-empty list of numbers")
+        if any(not 0 <= angle <= 180 for angle in aspects):
+            raise ValueError("aspect angles must be within 0-180")
+        if not isinstance(bodies, list) or not bodies or any(not isinstance(body, str) for body in bodies):
+            raise ValueError("bodies must be a non-empty list of strings")
+        if len(set(bodies)) != len(bodies):
+            raise ValueError("bodies must not contain duplicates")
+        unknown = [body for body in bodies if body not in planet_codes]
+        if unknown:
+            raise ValueError(f"unknown body {', '.join(unknown)}")
+        aspects = [float(angle) for angle in aspects]
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Invalid transit aspect request: {e}")
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+
+    if not 0 < end_jd - start_jd <= MAX_EVENT_SEARCH_DAYS:
+        return jsonify({"error": f"Invalid request: end must be after start and within "
+                                 f"{MAX_EVENT_SEARCH_DAYS:g} days"}), 400
+
+    natal_positions = get_planet_positions(natal_jd)
+
+    def generate():
+        for event in find_aspect_events(start_jd, end_jd, natal_positions, bodies, aspects):
+            event["datetime"] = julian_day_to_datetime(event["jd"]).isoformat(timespec="seconds")
+            yield app.json.dumps(event) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+
+@app.route("/next-event", methods=["POST"])
+def next_event():
+    """
+    下一次换座或停滞：请求体为 {"body": 天体名称, "type": "ingress" | "station" | "station_retrograde" |
+    "station_direct", "after": ISO 8601 时间（可选，默认当前时刻）}。
+    时刻在事件索引范围内时以二分查找直接返回，否则即时搜索
+    """
+    if not request.is_json:
+        logger.error("Invalid request: Expected JSON")
+        return jsonify({"error": "Invalid request: Expected JSON"}), 400
+
+    data = request.json
+    try:
+        body = data["body"]
+        kinds = NEXT_EVENT_KINDS[data.get("type", "ingress")]
+        after = data.get("after")
+        after_jd = parse_datetime_jd(after) if after else parse_datetime_jd(datetime.now(timezone.utc).isoformat())
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Invalid next event request: {e}")
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+    if not isinstance(body, str) or body not in planet_codes:
+        return jsonify({"error": f"Invalid request: unknown body {body!r}"}), 400
+
+    event = find_next_event(after_jd, body, kinds, event_index)
+    if event is None:
+        return jsonify({"error": f"No {data.get('type', 'ingress')} found for {body}"}), 404
+    event["datetime"] = julian_day_to_datetime(event["jd"]).isoformat(timespec="seconds")
+    return jsonify(event)
+
+
+def parse_datetime_jd(value):
+    """把 ISO 8601 时间字符串转换为 Julian Day（UT）；未带时区的按 UTC+8，与 /generate-chart 一致"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone(timedelta(hours=8)))
+    moment = moment.astimezone(timezone.utc)
+    second = moment.second + moment.microsecond / 1e6
+    return get_julian_day_with_time(moment.year, moment.month, moment.day, moment.hour, moment.minute, second, 0)
+
 
 @app.route("/output/<filename>")
 def serve_output_file(filename):
-    output_folder = os.path.join(os.path.dirname(__file__), "output")
-    file_path = os.path.abspath(os.path.join(output_folder, filename))
+    file_path = os.path.abspath(os.path.join(OUTPUT_FOLDER, filename))
 
     # 验证路径安全性
-    if not file_path.startswith(os.path.abspath(output_folder)):
+    if not file_path.startswith(os.path.abspath(OUTPUT_FOLDER)):
         logger.error(f"Attempted access to unsafe path: {file_path}")
         return jsonify({"error": "Access denied"}), 403
 
-    if os.path.exists(file_path):
+    mimetype = IMAGE_MIMETYPES.get(filename.rsplit(".", 1)[-1], "image/png")
+    if blob_store is not None:
+        blob = blob_store.get(filename)
+        if blob is not None:
+            return blob_response(blob, mimetype)
+    elif os.path.exists(file_path):
         logger.info(f"File found: {file_path}")
-        return send_file(file_path, mimetype="image/png")
+        return send_file(file_path, mimetype=mimetype)
+
+    # 尚未生成的其他分辨率：第一次请求时绘制
+    variant = pending_variants.get(filename)
+    if variant is not None:
+        variant_key, profile, entry = variant
+        try:
+            image_bytes = render_chart_file(entry["chart"], file_path, entry["format"], RENDER_PROFILES[profile])
+        except RenderQueueFull as e:
+            logger.warning(str(e))
+            return busy_response()
+        except Exception as e:
+            logger.error(f"Error rendering chart variant: {e}")
+            return jsonify({"error": "Error occurred while generating the chart."}), 500
+        chart_cache.put(variant_key, dict(entry, filename=filename))
+        pending_variants.discard(filename)
+        if blob_store is not None:
+            # 直接使用刚绘制的字节：并发写入可能已把它从 blob_store 中淘汰
+            return blob_response((image_bytes, blob_etag(image_bytes)), mimetype)
+        return send_file(file_path, mimetype=mimetype)
+
+    # 图片仍在后台队列中绘制
+    if render_queue.is_pending(filename):
+        response = jsonify({"status": "pending"})
+        response.headers["Retry-After"] = str(render_queue.retry_after())
+        return response, 202
 
     logger.error(f"File not found: {filename}")
     return jsonify({"error": "File not found"}), 404
 
+
+def blob_response(blob, mimetype):
+    """从内存返回图片；与 send_file 一样带 ETag，If-None-Match 匹配时返回 304"""
+    data, etag = blob
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
 @app.route("/ai-plugin.json")
 def serve_ai_plugin():
     return serve_static_file("ai-plugin.json", "application/json")
@@ -268,16 +955,9 @@ def serve_static_file(filename, mimetype):
     logger.error(f"File not found: {file_path}")
     return jsonify({"error": f"{filename} not found"}), 404
 
-def clean_output_folder(folder_path, max_age_seconds=3600):
-    folder_path = os.path.abspath(folder_path)
-    now = time.time()
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        if os.path.isfile(file_path) and now - os.path.getmtime(file_path) > max_age_seconds:
-            os.remove(file_path)
-            logger.info(f"Removed old file: {file_path}")
-
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     logger.info(f"Current working directory: {os.getcwd()}")
+    if render_pool is not None:
+        render_pool.warm_up()
     app.run(host="0.0.0.0", port=port)
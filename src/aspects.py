@@ -0,0 +1,128 @@
+"""
+相位计算：以 NumPy 一次性求出所有天体两两之间的角距矩阵，并同时与全部相位角及容许度比对。
+
+同一套函数既可处理单张命盘 (n_bodies,)，也可处理一批命盘 (n_charts, n_bodies)，
+以及合盘、行运等两组天体之间的交叉相位。
+"""
+import numpy as np
+
+# 相位定义：(标准相位角, 容许度, 相位线颜色)
+ASPECTS_DEF = [
+    (0, 8, 'purple'),       # 合相
+    (30, 3, 'magenta'),     # 半六分相
+    (45, 3, 'cyan'),        # 半方相
+    (51.43, 3, 'olive'),    # 七分相
+    (60, 6, 'green'),       # 六分相
+    (72, 3, 'teal'),        # 五分相
+    (90, 6, 'blue'),        # 四分相（宫刑）
+    (120, 6, 'orange'),     # 拱相
+    (135, 3, 'pink'),       # Sesquisquare (135°)
+    (144, 3, 'brown'),      # 双五分相
+    (150, 3, 'gray'),       # 欠刑相/Quincunx
+    (180, 8, 'red')         # 对分相
+]
+
+# 各相位的标准相位角，顺序与 ASPECTS_DEF 相同
+ASPECT_ANGLES = np.array([angle for angle, _, _ in ASPECTS_DEF], dtype=float)
+_ASPECT_ORBS = np.array([orb for _, orb, _ in ASPECTS_DEF], dtype=float)
+
+
+def angular_distance(lon1, lon2):
+    """两组黄经之间的最短角距（0°～180°），支持广播"""
+    diff = np.abs(np.asarray(lon1, dtype=float) - np.asarray(lon2, dtype=float)) % 360
+    return np.where(diff > 180, 360 - diff, diff)
+
+
+def match_aspects(diff):
+    """
+    对任意形状的角距数组，找出容许度内误差最小的相位。
+    返回与 diff 同形状的整数数组：ASPECTS_DEF 中的索引，不构成相位处为 -1。
+    误差相同时取 ASPECTS_DEF 中靠前的相位。
+    """
+    error = np.abs(diff[..., None] - ASPECT_ANGLES)
+    error = np.where(error <= _ASPECT_ORBS, error, np.inf)
+    index = np.argmin(error, axis=-1)
+    return np.where(np.isinf(np.min(error, axis=-1)), -1, index)
+
+
+def aspect_matrix(longitudes):
+    """
+    计算天体两两之间的角距与相位索引。
+
+    :param longitudes: 形状为 (..., n_bodies) 的黄经数组，例如单张命盘 (n,) 或一批命盘 (charts, n)
+    :return: (diff, index)，形状均为 (..., n_bodies, n_bodies)
+    """
+    lons = np.asarray(longitudes, dtype=float)
+    diff = angular_distance(lons[..., :, None], lons[..., None, :])
+    return diff, match_aspects(diff)
+
+
+def calculate_aspects(planet_positions):
+    """
+    根据行星间角度，自动判断主要及辅助相位，并返回一个包含
+    (行星1, 行星2, 相位线颜色, 实际角度差, 标准相位角) 的列表。
+    输出与原先逐对循环的实现完全一致，可直接交给 plot_natal_chart 使用。
+    """
+    planets = list(planet_positions.keys())
+    lons = [planet_positions[planet]['position'] for planet in planets]
+    return calculate_aspects_batch([lons], planets)[0]
+
+
+def calculate_aspects_batch(longitudes, planets):
+    """
+    批量计算多张命盘的相位。
+
+    :param longitudes: 形状为 (n_charts, n_bodies) 的黄经数组
+    :param planets: 天体名称列表，顺序与 longitudes 的列一致
+    :return: 每张命盘一个列表，元素格式同 calculate_aspects
+    """
+    i, j, diff, index = pair_aspects(longitudes)
+    return _split_by_chart(planets, planets, i, j, diff, index)
+
+
+def pair_aspects(longitudes):
+    """
+    只计算上三角的 n(n-1)/2 对天体：longitudes 形状为 (n_charts, n_bodies)。
+    返回 (i, j, diff, index)，i、j 为各对的天体下标，diff、index 形状为 (n_charts, n_pairs)
+    """
+    lons = np.asarray(longitudes, dtype=float)
+    i, j = np.triu_indices(lons.shape[-1], k=1)
+    diff = angular_distance(lons[:, i], lons[:, j])
+    return i, j, diff, match_aspects(diff)
+
+
+def cross_aspects(longitudes_a, longitudes_b, planets_a, planets_b):
+    """
+    计算两组天体之间的交叉相位（合盘、行运对本命等）。
+
+    :param longitudes_a: 形状为 (..., n_a) 的黄经数组
+    :param longitudes_b: 形状为 (..., n_b) 的黄经数组，前导维度需与 longitudes_a 可广播
+    :return: 前导维度为空时返回一个列表，否则返回按前导维度展平后的列表的列表；
+             元素为 (A 组天体, B 组天体, 相位线颜色, 实际角度差, 标准相位角)
+    """
+    lons_a = np.asarray(longitudes_a, dtype=float)
+    lons_b = np.asarray(longitudes_b, dtype=float)
+    diff = angular_distance(lons_a[..., :, None], lons_b[..., None, :])
+    index = match_aspects(diff)
+    i, j = np.indices((len(planets_a), len(planets_b))).reshape(2, -1)
+    pair_diff = diff[..., i, j].reshape(-1, i.size)
+    pair_index = index[..., i, j].reshape(-1, i.size)
+    result = _split_by_chart(planets_a, planets_b, i, j, pair_diff, pair_index)
+    return result[0] if diff.ndim == 2 else result
+
+
+def _split_by_chart(planets_a, planets_b, i, j, diff, index):
+    """diff、index 形状为 (n_charts, n_pairs)；一次生成全部相位元组后按命盘切分"""
+    chart_ids, pair_ids = np.nonzero(index >= 0)
+    rows = _aspect_tuples(planets_a, planets_b, i[pair_ids], j[pair_ids],
+                          diff[chart_ids, pair_ids], index[chart_ids, pair_ids])
+    bounds = np.cumsum(np.bincount(chart_ids, minlength=index.shape[0])).tolist()
+    return [rows[start:end] for start, end in zip([0] + bounds[:-1], bounds)]
+
+
+def _aspect_tuples(planets_a, planets_b, i, j, diff, index):
+    """把相位索引转换为 (天体1, 天体2, 颜色, 角度差, 相位角) 元组列表，index 中不应含 -1"""
+    return [
+        (planets_a[a], planets_b[b], ASPECTS_DEF[k][2], d, ASPECTS_DEF[k][0])
+        for a, b, d, k in zip(i.tolist(), j.tolist(), diff.tolist(), index.tolist())
+    ]
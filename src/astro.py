@@ -0,0 +1,158 @@
+"""
+与绘图无关的命盘计算与符号表：Julian Day、行星位置、宫头，以及星座、行星、相位的符号和排版角度。
+
+只依赖 numpy 与 swisseph，不导入 matplotlib；只返回 JSON 的接口、批量计算与 SVG 绘图都使用本模块，
+需要 matplotlib 的栅格绘图集中在 visualization 中，在第一次绘图时才导入。
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import swisseph as swe  # 需要 pyswisseph 用来计算天体位置与宫头
+
+from ephemeris import PositionEngine, planet_codes, positions_to_dict
+from ephemeris_table import DEFAULT_TABLE_PATH, load_table
+from houses import DEFAULT_HOUSE_SYSTEM, house_cusps, house_of
+
+# 依照 12 个星座的顺序（此处定义 0-30° 为 Aries，即白羊座），
+# 这里采用常见的黄道顺序：从 Aries 开始
+zodiac_signs = ['\u2648', '\u2649', '\u264A', '\u264B', '\u264C', '\u264D',
+                '\u264E', '\u264F', '\u2650', '\u2651', '\u2652', '\u2653']
+zodiac_names = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
+                'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces']
+
+# 宫主星对应（仅作参考，实际运用可扩充）
+ruling_planets = {
+    'Aquarius': 'Uranus', 'Pisces': 'Neptune', 'Aries': 'Mars', 'Taurus': 'Venus',
+    'Gemini': 'Mercury', 'Cancer': 'Moon', 'Leo': 'Sun', 'Virgo': 'Mercury',
+    'Libra': 'Venus', 'Scorpio': 'Pluto', 'Sagittarius': 'Jupiter', 'Capricorn': 'Saturn'
+}
+
+# 行星符号
+planet_symbols = {
+    "Sun": "\u2609", "Moon": "\u263D", "Mercury": "\u263F",
+    "Venus": "\u2640", "Mars": "\u2642", "Jupiter": "\u2643",
+    "Saturn": "\u2644", "Uranus": "\u2645", "Neptune": "\u2646", "Pluto": "\u2647"
+}
+
+# 相位符号：{标准相位角: 符号}
+ASPECT_SYMBOLS = {
+    0: "*",  # 合相
+    30: "◦",  # 半六分相
+    45: "▢",  # 半方相
+    51.43: "✶",  # 七分相
+    60: "∿",  # 六分相
+    72: "⌘",  # 五分相
+    90: "□",  # 四分相
+    120: "△",  # 拱相
+    135: "⊟",  # Sesquisquare
+    144: "✹",  # 双五分相
+    150: "⁑",  # 欠刑相 / Quincunx
+    180: "⊥"  # 对分相
+}
+
+# 所有图表共用的批量星历引擎（默认计算 planet_codes 中的全部行星）
+_position_engine = PositionEngine()
+
+# 可选的预计算 Chebyshev 星历表（由 `python src/ephemeris_table.py` 生成），
+# 不存在时所有计算都直接使用 Swiss Ephemeris
+_ephemeris_table = load_table(os.environ.get("EPHEMERIS_TABLE", DEFAULT_TABLE_PATH))
+
+
+def get_julian_day_with_time(year, month, day, hour, minute, second, timezone_offset):
+    """
+    根据客户端输入的当地出生时间及时区偏移量，
+    将当地时间转换为 UT 时间，并利用 swisseph 计算 Julian Day。
+    """
+    local_decimal = hour + minute / 60 + second / 3600
+    ut_hour = local_decimal - timezone_offset
+    return swe.julday(year, month, day, ut_hour)
+
+
+def julian_day_to_datetime(julian_day):
+    """get_julian_day_with_time 的逆运算：把 Julian Day（UT）转换为带 UTC 时区的 datetime"""
+    year, month, day, hour = swe.revjul(julian_day)
+    return datetime(year, month, day, tzinfo=timezone.utc) + timedelta(hours=hour)
+
+
+def get_planet_positions(julian_day):
+    """
+    根据给定的 Julian Day，自动计算主要行星的黄道经度（单位：°）及逆行状态。
+    使用 FLG_SPEED 标记获取速度信息，若黄道速度为负则视为逆行。
+
+    若已加载 Chebyshev 星历表且覆盖该时刻，则以多项式求值代替 swisseph。
+
+    返回格式:
+      { 'Sun': {'position': 123.45, 'retrograde': False, 'speed': 0.12}, ... }
+    """
+    return positions_to_dict(get_positions_array(julian_day)[0], _position_engine.bodies)
+
+
+def get_positions_array(julian_days):
+    """
+    批量计算一组 Julian Day 上所有行星的位置，返回 PositionEngine.calc 格式的结构化数组。
+    整组时刻都在 Chebyshev 表覆盖范围内时走多项式求值，否则回退到 Swiss Ephemeris。
+    """
+    return get_positions_with_backend(julian_days)[0]
+
+
+def get_positions_with_backend(julian_days):
+    """
+    与 get_positions_array 相同，另外返回提供数据的后端名称
+    （"chebyshev"、"swisseph"、"moshier" 等）
+    """
+    if _ephemeris_table is not None and _ephemeris_table.covers(julian_days):
+        return _ephemeris_table.calc(julian_days), "chebyshev"
+    return _position_engine.calc_with_backend(julian_days)
+
+
+def get_zodiac_sign(degree):
+    """
+    返回某个度数所属的星座及该星座内的度数，格式如 "Aries 10.25°"
+    """
+    index = int(degree // 30) % 12
+    return f"{zodiac_names[index]} {degree % 30:.2f}°"
+
+
+def calculate_house_cusps(julian_day, latitude, longitude, house_system=DEFAULT_HOUSE_SYSTEM):
+    """
+    计算 12 个宫头黄经，house_system 为 houses.HOUSE_SYSTEMS 中的代码（默认 Placidus）。
+    由 houses 模块计算并缓存，不修改 swisseph 的全局状态，可在多线程中调用
+    """
+    return house_cusps(julian_day, latitude, longitude, house_system)
+
+
+def get_house(degree, house_cusps):
+    """
+    根据行星的度数与宫头，判断该行星所在的宫位（跨越 0° 的宫位也能正确判断）
+    """
+    return house_of(degree, house_cusps)
+
+
+def layout_planets(planet_positions, offset, threshold=3):
+    """
+    排版步骤：计算每颗行星符号与黄经文本的显示角度（相对于 ASC，单位：度），见 layout_angles。
+
+    返回 [(行星名称, 行星符号角度, 黄经文本角度), ...]，顺序与 planet_positions 一致
+    """
+    angles = layout_angles([data['position'] for data in planet_positions.values()], offset, threshold)
+    return [(planet, angle, angle) for planet, angle in zip(planet_positions, angles)]
+
+
+def layout_angles(longitudes, offset, threshold=3):
+    """
+    一次遍历计算每颗行星的显示角度（相对于 ASC，单位：度）：与已排好的角度相差不足 threshold 度时
+    依次顺延 threshold 度，避免文字重叠。行星符号与黄经文本的排版规则相同，共用同一组角度
+    """
+    used_angles = []
+    for longitude in longitudes:
+        # 计算基准角度（相对于 ASC），单位为度
+        angle = (longitude - offset) % 360
+        while any(abs(angle - used) < threshold for used in used_angles):
+            angle = (angle + threshold) % 360
+        used_angles.append(angle)
+    return used_angles
+
+
+def aspect_symbol(aspect_angle):
+    """采用“最接近法”取得相位标准角对应的符号"""
+    return ASPECT_SYMBOLS[min(ASPECT_SYMBOLS, key=lambda x: abs(x - aspect_angle))]
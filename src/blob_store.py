@@ -0,0 +1,70 @@
+"""
+进程内的图片存储：以文件名为键保存图片字节，按总字节数做 LRU 淘汰。
+
+CHART_STORAGE=memory 时绘图结果直接保存在这里，/output/<filename> 从内存返回，
+不经过磁盘读写，适合磁盘为临时存储的主机。每个图片附带由内容计算的 ETag，用于条件请求。
+多 worker 部署时每个进程各自保存，需配合单 worker 或会话粘滞，或改用 inline=1 直接取得图片。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def blob_etag(data):
+    """由图片内容计算 ETag"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class BlobStore:
+    """线程安全的内存图片存储，总大小不超过 max_bytes"""
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._blobs = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, name, data):
+        """保存图片并返回其 ETag；超出上限时淘汰最久未使用的图片"""
+        etag = blob_etag(data)
+        with self._lock:
+            self._discard(name)
+            self._blobs[name] = (data, etag)
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and len(self._blobs) > 1:
+                self._discard(next(iter(self._blobs)))
+        return etag
+
+    def get(self, name):
+        """返回 (字节, ETag)，不存在时返回 None"""
+        with self._lock:
+            blob = self._blobs.get(name)
+            if blob is not None:
+                self._blobs.move_to_end(name)
+            return blob
+
+    def size(self, name):
+        with self._lock:
+            blob = self._blobs.get(name)
+            return len(blob[0]) if blob is not None else 0
+
+    def discard(self, name):
+        with self._lock:
+            self._discard(name)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return self._total_bytes
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._blobs
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def _discard(self, name):
+        blob = self._blobs.pop(name, None)
+        if blob is not None:
+            self._total_bytes -= len(blob[0])
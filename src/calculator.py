@@ -1,9 +1,11 @@
 import swisseph as swe
-import os
 
-# 設定 Swiss Ephemeris 的數據路徑（相對路徑）
-DATA_PATH = os.path.join(os.path.dirname(__file__), "data")
-print(f"Using data path: {DATA_PATH}")
+from ephemeris import PositionEngine
+from ephemeris_data import ensure_ephe_path
+
+# 與 astro 共用同一套引擎實作，此處使用 swe.calc_ut；
+# 建立引擎時會設定 Swiss Ephemeris 的數據路徑（倉庫根目錄下的 data/，由 ephemeris_data 統一解析）
+_position_engine = PositionEngine(flags=swe.FLG_SWIEPH, ut=True)
 
 def calculate_planet_positions(year, month, day, hour, minute):
     """
@@ -15,30 +17,18 @@ def calculate_planet_positions(year, month, day, hour, minute):
     :param minute: 出生分鐘
     :return: 行星位置字典
     """
-    # 設定天文數據路徑
-    swe.set_ephe_path(DATA_PATH)
-
     # 計算 Julian Day (JD)
     utc_time = hour + minute / 60.0
     jd = swe.julday(year, month, day, utc_time)
 
-    # 定義需要計算的行星列表
-    planets = [swe.SUN, swe.MOON, swe.MERCURY, swe.VENUS, swe.MARS,
-               swe.JUPITER, swe.SATURN, swe.URANUS, swe.NEPTUNE, swe.PLUTO]
-    planet_positions = {}
-
-    # 計算每顆行星的位置
-    for planet in planets:
-        try:
-            position, status = swe.calc_ut(jd, planet)
-            if status < 0:  # 確保計算成功
-                print(f"Error calculating {swe.get_planet_name(planet)}: status {status}")
-                continue
-            planet_name = swe.get_planet_name(planet)
-            planet_positions[planet_name] = position[0]  # 獲取黃道經度
-        except Exception as e:
-            print(f"Exception while calculating {swe.get_planet_name(planet)}: {e}")
+    # 以批量星曆引擎一次計算全部行星（UT 時間）
+    row = _position_engine.calc(jd)[0]
+    planet_positions = dict(zip(_position_engine.bodies, row['lon'].tolist()))
 
     return planet_positions
-positions = calculate_planet_positions(2025, 1, 15, 12, 0)
-print(f"Calculated positions: {positions}")
+
+
+if __name__ == "__main__":
+    print(f"Using data path: {ensure_ephe_path()}")
+    positions = calculate_planet_positions(2025, 1, 15, 12, 0)
+    print(f"Calculated positions: {positions}")
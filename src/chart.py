@@ -0,0 +1,135 @@
+"""
+紧凑的命盘数据模型：行星黄经与速度以 NumPy 数组保存，逆行、星座、星座内度数、宫位与相位在构造时一次算出。
+
+/generate-chart、批量接口、matplotlib 与 SVG 绘图共用 Chart，不再各自从
+{'Sun': {'position', 'retrograde', 'speed'}} 字典和相位元组中按行星名称反复推导同样的字段。
+Chart 使用 __slots__，可直接 pickle 后交给多进程绘图池。
+"""
+import numpy as np
+
+from aspects import ASPECT_ANGLES, ASPECTS_DEF, pair_aspects
+from houses import assign_houses
+
+# 相位数组的字段：body1、body2 为 Chart.bodies 中的下标，aspect 为 ASPECTS_DEF 中的下标，diff 为实际角度差
+ASPECT_DTYPE = np.dtype([('body1', 'i2'), ('body2', 'i2'), ('aspect', 'i2'), ('diff', 'f8')])
+
+
+class Chart:
+    """
+    单张命盘。属性均为只读约定，构造后不应修改：
+      bodies           天体名称元组
+      longitudes       黄经（°），形状 (n_bodies,)
+      speeds           黄经速度（°/日）
+      retrograde       是否逆行（速度为负）
+      sign_index       所在星座（0～11，对应 astro.zodiac_names）
+      degree_in_sign   星座内度数
+      house_cusps      12 个宫头黄经
+      cusp_sign_index  宫头所在星座
+      houses           所在宫位（1～12）
+      aspects          ASPECT_DTYPE 结构化数组
+      aspect_colors    调用方指定的相位线颜色（与 aspects 逐条对应），None 时使用 ASPECTS_DEF 的颜色
+    """
+
+    __slots__ = ("bodies", "longitudes", "speeds", "retrograde", "sign_index", "degree_in_sign",
+                 "house_cusps", "cusp_sign_index", "houses", "aspects", "aspect_colors")
+
+    def __init__(self, bodies, longitudes, speeds, house_cusps, aspects=None, houses=None, aspect_colors=None):
+        """aspects、houses 可传入批量算好的结果，否则在这里计算"""
+        self.bodies = tuple(bodies)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.speeds = np.asarray(speeds, dtype=float)
+        self.retrograde = self.speeds < 0
+        self.sign_index = (self.longitudes // 30).astype(int) % 12
+        self.degree_in_sign = self.longitudes % 30
+        self.house_cusps = np.asarray(house_cusps, dtype=float)
+        self.cusp_sign_index = (self.house_cusps // 30).astype(int) % 12
+        self.houses = assign_houses(self.longitudes, self.house_cusps) if houses is None else np.asarray(houses)
+        self.aspects = aspect_arrays(self.longitudes[None])[0] if aspects is None else aspects
+        self.aspect_colors = None if aspect_colors is None else tuple(aspect_colors)
+
+    @classmethod
+    def from_row(cls, row, bodies, house_cusps, aspects=None, houses=None):
+        """由 PositionEngine.calc 结构化数组的一行构造"""
+        return cls(bodies, row['lon'], row['speed'], house_cusps, aspects, houses)
+
+    @classmethod
+    def from_positions(cls, planet_positions, house_cusps, aspect_lines=None):
+        """
+        由 {名称: {'position', 'retrograde', 'speed'}} 字典与 calculate_aspects 格式的相位元组构造，
+        兼容以字典为参数的旧接口。与原先的绘图一致，相位线保留元组中的颜色，
+        相位符号取最接近的标准相位角（缺少相位角的 4 元组按合相）
+        """
+        bodies = list(planet_positions)
+        longitudes = [planet_positions[name]['position'] for name in bodies]
+        speeds = [planet_positions[name].get('speed', -1.0 if planet_positions[name]['retrograde'] else 1.0)
+                  for name in bodies]
+        if aspect_lines is None:
+            return cls(bodies, longitudes, speeds, house_cusps)
+        return cls(bodies, longitudes, speeds, house_cusps, aspects_from_tuples(aspect_lines, bodies),
+                   aspect_colors=[aspect_data[2] for aspect_data in aspect_lines])
+
+    def positions(self):
+        """转换为 { 名称: {'position', 'retrograde', 'speed'} } 字典"""
+        return {
+            name: {'position': lon, 'retrograde': speed < 0, 'speed': speed}
+            for name, lon, speed in zip(self.bodies, self.longitudes.tolist(), self.speeds.tolist())
+        }
+
+    def line_colors(self):
+        """每条相位线的颜色，顺序与 aspects 相同"""
+        if self.aspect_colors is not None:
+            return list(self.aspect_colors)
+        return [ASPECTS_DEF[k][2] for k in self.aspects['aspect'].tolist()]
+
+    def aspect_lines(self):
+        """转换为 calculate_aspects 格式的 (天体1, 天体2, 颜色, 角度差, 相位角) 列表"""
+        return [
+            (self.bodies[a], self.bodies[b], color, d, ASPECTS_DEF[k][0])
+            for a, b, k, d, color in zip(self.aspects['body1'].tolist(), self.aspects['body2'].tolist(),
+                                         self.aspects['aspect'].tolist(), self.aspects['diff'].tolist(),
+                                         self.line_colors())
+        ]
+
+
+def aspect_arrays(longitudes):
+    """
+    批量计算多张命盘的相位，longitudes 形状为 (n_charts, n_bodies)。
+    返回每张命盘一个 ASPECT_DTYPE 数组，顺序与 calculate_aspects_batch 相同
+    """
+    i, j, diff, index = pair_aspects(longitudes)
+    chart_ids, pair_ids = np.nonzero(index >= 0)
+    records = np.empty(chart_ids.size, dtype=ASPECT_DTYPE)
+    records['body1'] = i[pair_ids]
+    records['body2'] = j[pair_ids]
+    records['aspect'] = index[chart_ids, pair_ids]
+    records['diff'] = diff[chart_ids, pair_ids]
+    bounds = np.cumsum(np.bincount(chart_ids, minlength=index.shape[0]))
+    return np.split(records, bounds[:-1])
+
+
+def aspects_from_tuples(aspect_lines, bodies):
+    """
+    把 calculate_aspects 格式的相位元组转换为 ASPECT_DTYPE 数组，aspect 取最接近的标准相位角；
+    缺少相位角的 4 元组按合相处理。颜色不在数组中，由 Chart.aspect_colors 保存
+    """
+    body_index = {name: i for i, name in enumerate(bodies)}
+    records = np.empty(len(aspect_lines), dtype=ASPECT_DTYPE)
+    for record, aspect_data in zip(records, aspect_lines):
+        aspect_angle = aspect_data[4] if len(aspect_data) > 4 else 0
+        record['body1'] = body_index[aspect_data[0]]
+        record['body2'] = body_index[aspect_data[1]]
+        record['aspect'] = np.argmin(np.abs(ASPECT_ANGLES - aspect_angle))
+        record['diff'] = aspect_data[3]
+    return records
+
+
+def charts_from_positions(positions_array, cusps, bodies, aspects=None):
+    """
+    批量构造 Chart：positions_array 为 PositionEngine.calc 的结构化数组 (n_charts, n_bodies)，
+    cusps 形状为 (n_charts, 12)；宫位与相位（aspects 为 aspect_arrays 的结果，可预先传入）对整批一次算出
+    """
+    houses = assign_houses(positions_array['lon'], cusps)
+    if aspects is None:
+        aspects = aspect_arrays(positions_array['lon'])
+    return [Chart.from_row(row, bodies, house_cusps, row_aspects, row_houses)
+            for row, house_cusps, row_aspects, row_houses in zip(positions_array, cusps, aspects, houses)]
@@ -0,0 +1,253 @@
+"""
+基于内容寻址的命盘缓存。
+
+缓存键由规范化后的出生资料（四舍五入后的 Julian Day、经纬度）、宫位系统及绘图选项
+计算哈希得到，图片文件名也由该键生成，因此相同输入总是对应同一张图片。
+缓存按条目数做 LRU 淘汰，被淘汰条目的图片文件随之删除；过期与总字节数上限由后台清理线程
+按过期时间索引批量处理，取代原来每次请求都扫描输出目录的清理方式。
+"""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Julian Day 保留 6 位小数（约 0.1 秒），经纬度保留 4 位小数（约 11 米）
+JD_DECIMALS = 6
+COORD_DECIMALS = 4
+
+_FILENAME_PATTERN = re.compile(r"^natal_chart_([0-9a-f]{32})\.(png|svg|webp)$")
+
+
+def chart_key(julian_day, latitude, longitude, house_system, render_options=None):
+    """
+    计算命盘的缓存键（32 位十六进制字符串）。
+    render_options 为影响图片内容的绘图参数字典，如 {"dpi": 300}
+    """
+    normalized = {
+        "jd": round(float(julian_day), JD_DECIMALS),
+        "lat": round(float(latitude), COORD_DECIMALS),
+        "lon": round(float(longitude), COORD_DECIMALS),
+        "hsys": house_system,
+        "render": render_options or {},
+    }
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def chart_filename(key, extension="png"):
+    """由缓存键得到图片文件名"""
+    return f"natal_chart_{key}.{extension}"
+
+
+class ChartCache:
+    """
+    线程安全的 LRU 命盘缓存，同时是输出目录的索引。
+
+    每个条目是一个字典，至少包含 "filename"；请求处理时还会写入 "planetary_positions"
+    等 JSON 数据。启动时会把输出目录中已有的图片登记为只有文件名的条目（按修改时间排序），
+    这样重启后也能复用旧图片，且总数同样受 max_entries 限制。
+
+    除条目数上限外，缓存还记录每个文件的大小与过期时间（写入时间 + max_age 秒）：
+    过期时间放在最小堆中，sweep() 从堆顶批量删除已过期的文件，再按 LRU 删除超出 max_bytes 的部分。
+    sweep() 由后台清理线程每 sweep_interval 秒调用一次，请求处理过程中不再扫描输出目录。
+    max_age / max_bytes 为 None 时不做相应限制。
+
+    传入 blob_store（BlobStore）时图片保存在内存中：存在性、大小与删除都改由 blob_store 处理，
+    启动时也不再登记输出目录中的文件。
+    """
+
+    def __init__(self, output_folder, max_entries=1000, max_age=None, max_bytes=None, sweep_interval=60,
+                 blob_store=None):
+        self.output_folder = os.path.abspath(output_folder)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.blob_store = blob_store
+        self._entries = OrderedDict()
+        # {缓存键: (文件字节数, 过期时间)}，以及按过期时间排序的堆 [(过期时间, 缓存键)]；
+        # 条目重新写入后堆中的旧记录不删除，sweep 时与 _meta 中的过期时间不一致即跳过
+        self._meta = {}
+        self._expiry_heap = []
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._janitor_pid = None
+        if blob_store is None:
+            os.makedirs(self.output_folder, exist_ok=True)
+            self._index_existing_files()
+
+    def get(self, key):
+        """命中时返回条目并标记为最近使用；图片已不存在时视为未命中"""
+        # 只处理缓存命中的 worker 也要清理启动时索引的旧文件
+        self._ensure_janitor()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._exists(entry["filename"]):
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """写入条目，并按 LRU 淘汰超出上限的旧条目及其图片"""
+        self._ensure_janitor()
+        self._add(key, entry)
+
+    def _add(self, key, entry, created_at=None):
+        size = self._size(entry["filename"])
+        expires_at = None
+        if self.max_age is not None:
+            expires_at = (time.time() if created_at is None else created_at) + self.max_age
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = entry
+            self._meta[key] = (size, expires_at)
+            self._total_bytes += size
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, key))
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._pop_oldest())
+        for filename in evicted:
+            self._remove_file(filename)
+
+    def sweep(self, now=None):
+        """删除已过期的条目，再按 LRU 删除超出字节数上限的条目；返回删除的文件数"""
+        now = time.time() if now is None else now
+        evicted = []
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                meta = self._meta.get(key)
+                if meta is not None and meta[1] == expires_at:
+                    evicted.append(self._entries[key]["filename"])
+                    self._forget(key)
+            if self.max_bytes is not None:
+                while self._entries and self._total_bytes > self.max_bytes:
+                    evicted.append(self._pop_oldest())
+            # 反复写入同一条目会在堆中留下过期记录，过多时重建
+            if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+                self._expiry_heap = [(expires_at, key) for key, (_, expires_at) in self._meta.items()
+                                     if expires_at is not None]
+                heapq.heapify(self._expiry_heap)
+        for filename in evicted:
+            self._remove_file(filename)
+        return len(evicted)
+
+    @property
+    def total_bytes(self):
+        """缓存中图片文件的总字节数（按写入时的大小统计）"""
+        with self._lock:
+            return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _forget(self, key):
+        """从索引中移除条目（不删除文件），调用方需持有锁"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            size, _ = self._meta.pop(key)
+            self._total_bytes -= size
+        return entry
+
+    def _pop_oldest(self):
+        """移除最久未使用的条目并返回其文件名，调用方需持有锁"""
+        key = next(iter(self._entries))
+        return self._forget(key)["filename"]
+
+    def _ensure_janitor(self):
+        # 与 RenderQueue 相同，按进程延迟启动：gunicorn 预加载应用后 fork 出的 worker 不继承线程
+        if self.sweep_interval is None or (self.max_age is None and self.max_bytes is None):
+            return
+        pid = os.getpid()
+        if self._janitor_pid == pid:
+            return
+        with self._lock:
+            if self._janitor_pid == pid:
+                return
+            self._janitor_pid = pid
+        threading.Thread(target=self._janitor_loop, name="chart-cache-janitor", daemon=True).start()
+
+    def _janitor_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"Chart cache janitor removed {removed} files")
+            except Exception as e:
+                logger.error(f"Chart cache janitor failed: {e}")
+
+    def _index_existing_files(self):
+        existing = []
+        for filename in os.listdir(self.output_folder):
+            match = _FILENAME_PATTERN.match(filename)
+            if match:
+                path = os.path.join(self.output_folder, filename)
+                existing.append((os.path.getmtime(path), match.group(1), filename))
+        for mtime, key, filename in sorted(existing):
+            self._add(key, {"filename": filename}, created_at=mtime)
+
+    def _exists(self, filename):
+        if self.blob_store is not None:
+            return filename in self.blob_store
+        return os.path.exists(os.path.join(self.output_folder, filename))
+
+    def _size(self, filename):
+        if self.blob_store is not None:
+            return self.blob_store.size(filename)
+        try:
+            return os.path.getsize(os.path.join(self.output_folder, filename))
+        except OSError:
+            return 0
+
+    def _remove_file(self, filename):
+        if self.blob_store is not None:
+            self.blob_store.discard(filename)
+            return
+        file_path = os.path.join(self.output_folder, filename)
+        try:
+            os.remove(file_path)
+            logger.info(f"Evicted cached chart: {file_path}")
+        except FileNotFoundError:
+            pass
+
+
+class VariantRegistry:
+    """
+    尚未生成的图片变体（同一命盘的其他分辨率）登记表：{文件名: 变体信息}，按 LRU 最多保留 max_entries 项。
+    /generate-chart 只绘制请求的那一种，其余变体在 /output/<filename> 第一次被请求时才据此绘制
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, filename, variant):
+        with self._lock:
+            self._entries[filename] = variant
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, filename):
+        with self._lock:
+            return self._entries.get(filename)
+
+    def discard(self, filename):
+        with self._lock:
+            self._entries.pop(filename, None)
+
+    def __len__(self):
+        return len(self._entries)
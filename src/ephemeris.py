@@ -0,0 +1,104 @@
+import numpy as np
+import swisseph as swe  # 需要 pyswisseph 用来计算天体位置
+
+import ephemeris_data
+
+# 将行星名称与 swisseph 常数对应
+planet_codes = {
+    "Sun": swe.SUN,
+    "Moon": swe.MOON,
+    "Mercury": swe.MERCURY,
+    "Venus": swe.VENUS,
+    "Mars": swe.MARS,
+    "Jupiter": swe.JUPITER,
+    "Saturn": swe.SATURN,
+    "Uranus": swe.URANUS,
+    "Neptune": swe.NEPTUNE,
+    "Pluto": swe.PLUTO
+}
+
+# 结构化数组的字段：黄经、黄纬、距离（AU）、黄经速度（°/日）
+POSITION_DTYPE = np.dtype([('lon', 'f8'), ('lat', 'f8'), ('dist', 'f8'), ('speed', 'f8')])
+
+# 每次批量写入的 JD 数量
+_CHUNK_SIZE = 8192
+
+
+class PositionEngine:
+    """
+    批量星历计算引擎：一次调用即可计算多个 Julian Day × 多个天体的位置。
+
+    swisseph 本身没有向量化接口，这里把 Python 层的循环收敛到一个地方，
+    结果直接组装成 NumPy 数组，不再为每个时刻构造 dict of dicts。
+
+    用法:
+      engine = PositionEngine()
+      result = engine.calc(np.array([jd1, jd2]))
+      result['lon'][0, 0]   # 第一个时刻太阳的黄经
+    """
+
+    def __init__(self, bodies=None, flags=swe.FLG_SWIEPH | swe.FLG_SPEED, ut=False):
+        """
+        :param bodies: 天体名称列表（planet_codes 的键），默认为全部十颗行星
+        :param flags: 传给 swisseph 的计算标记
+        :param ut: 为 True 时使用 swe.calc_ut（输入为 UT），否则使用 swe.calc
+        """
+        self.bodies = list(bodies) if bodies is not None else list(planet_codes)
+        self.codes = [planet_codes[name] for name in self.bodies]
+        self.flags = flags
+        self.ut = ut
+        ephemeris_data.ensure_ephe_path()
+
+    def calc(self, julian_days):
+        """
+        计算给定 Julian Day 数组上所有天体的位置。
+
+        :param julian_days: 标量或一维数组
+        :return: 形状为 (len(julian_days), len(bodies)) 的结构化数组，
+                 字段见 POSITION_DTYPE；黄经已归一化到 [0, 360)
+        """
+        return self.calc_with_backend(julian_days)[0]
+
+    def calc_with_backend(self, julian_days):
+        """
+        与 calc 相同，另外返回实际提供数据的星历后端名称
+        （"swisseph"、"moshier" 等；若同一批次混用了多个后端，以逗号分隔）
+        """
+        jds = np.atleast_1d(np.asarray(julian_days, dtype=float))
+        calc = swe.calc_ut if self.ut else swe.calc
+        codes = self.codes
+        flags = self.flags
+        raw = np.empty((jds.size, len(codes), 4))
+        retflags = set()
+        if jds.size:
+            ephemeris_data.map_julian_days(jds.min(), jds.max())
+        # 以 JD 为外层循环：swisseph 会缓存同一时刻的章动、地球位置等中间量，
+        # 同一 JD 下连续计算各天体最快；tolist() 避免逐个拆箱 NumPy 标量。
+        # 分块写入预分配数组，百万级时刻时中间 Python 对象的内存占用保持有界
+        for start in range(0, jds.size, _CHUNK_SIZE):
+            chunk = jds[start:start + _CHUNK_SIZE].tolist()
+            results = [calc(jd, code, flags) for jd in chunk for code in codes]
+            raw[start:start + len(chunk)] = np.array([xx[:4] for xx, _ in results]).reshape(len(chunk), len(codes), 4)
+            retflags.update(retflag for _, retflag in results)
+        raw[..., 0] %= 360
+        backend = ",".join(sorted({ephemeris_data.backend_name(retflag) for retflag in retflags}))
+        return raw.view(POSITION_DTYPE)[..., 0], backend
+
+    def positions(self, julian_day):
+        """
+        计算单个时刻的位置，返回与 get_planet_positions 相同的字典格式：
+          { 'Sun': {'position': 123.45, 'retrograde': False, 'speed': 0.12}, ... }
+        """
+        return positions_to_dict(self.calc(julian_day)[0], self.bodies)
+
+
+def positions_to_dict(row, bodies):
+    """
+    将单个时刻的结构化数组行转换为 { 名称: {'position', 'retrograde', 'speed'} } 字典
+    """
+    lons = row['lon'].tolist()
+    speeds = row['speed'].tolist()
+    return {
+        name: {'position': lon, 'retrograde': speed < 0, 'speed': speed}
+        for name, lon, speed in zip(bodies, lons, speeds)
+    }
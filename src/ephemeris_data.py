@@ -0,0 +1,147 @@
+"""
+Swiss Ephemeris 数据文件管理：
+
+  - 只解析一次数据目录并调用 swe.set_ephe_path（默认使用仓库根目录下的 data/，
+    可用环境变量 SE_EPHE_PATH 覆盖）
+  - 以 600 年为一块（sepl_18 = 1800–2399 年，seplm06 = 公元前 600–1 年），
+    按需把请求用到的文件内存映射进来，避免首个请求的磁盘等待
+  - 可在 worker 启动时预热一段年份（环境变量 EPHE_WARM_YEARS，例如 "1900-2100"）
+  - 根据 swisseph 的返回标记报告实际使用的星历后端
+"""
+import logging
+import mmap
+import os
+import threading
+
+import swisseph as swe
+
+logger = logging.getLogger(__name__)
+
+# 行星（含冥王星）与月亮所在的文件前缀；小行星文件 seas 本项目用不到
+FILE_PREFIXES = ("sepl", "semo")
+
+_YEARS_PER_FILE = 600
+
+_lock = threading.Lock()
+_ephe_path_set = threading.Event()
+_data_dir = None
+_mapped = {}  # 文件名 -> mmap 对象，保持映射使页面常驻缓存
+_mapped_blocks = set()
+
+
+def resolve_data_dir():
+    """返回星历数据目录的绝对路径（只解析一次）"""
+    global _data_dir
+    if _data_dir is None:
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+        _data_dir = os.path.abspath(os.environ.get("SE_EPHE_PATH", default_dir))
+    return _data_dir
+
+
+def ensure_ephe_path():
+    """确保 swisseph 已指向数据目录；可重复调用，只有第一次真正生效"""
+    if _ephe_path_set.is_set():
+        return resolve_data_dir()
+    with _lock:
+        if not _ephe_path_set.is_set():
+            data_dir = resolve_data_dir()
+            if not os.path.isdir(data_dir):
+                logger.warning(f"Ephemeris data directory not found, falling back to Moshier: {data_dir}")
+            swe.set_ephe_path(data_dir)
+            _ephe_path_set.set()
+    return resolve_data_dir()
+
+
+def block_of_year(year):
+    """返回覆盖某年份的 600 年数据块编号（以百年计，如 1900 年 -> 18）"""
+    return (year // _YEARS_PER_FILE) * (_YEARS_PER_FILE // 100)
+
+
+def file_names_for_block(block):
+    """返回某数据块对应的文件名，例如 18 -> ['sepl_18.se1', 'semo_18.se1']"""
+    suffix = f"_{block:02d}" if block >= 0 else f"m{-block:02d}"
+    return [f"{prefix}{suffix}.se1" for prefix in FILE_PREFIXES]
+
+
+def map_years(start_year, end_year):
+    """
+    将覆盖 [start_year, end_year] 的数据文件内存映射并预读到页缓存。
+    已映射的块直接跳过；返回本次新映射的文件名列表。
+    """
+    blocks = range(block_of_year(start_year), block_of_year(end_year) + 1, _YEARS_PER_FILE // 100)
+    pending = [block for block in blocks if block not in _mapped_blocks]
+    if not pending:
+        return []
+    data_dir = ensure_ephe_path()
+    newly_mapped = []
+    with _lock:
+        for block in pending:
+            if block in _mapped_blocks:
+                continue
+            for name in file_names_for_block(block):
+                path = os.path.join(data_dir, name)
+                if name in _mapped or not os.path.exists(path):
+                    continue
+                _mapped[name] = _map_file(path)
+                newly_mapped.append(name)
+            _mapped_blocks.add(block)
+    if newly_mapped:
+        logger.info(f"Mapped ephemeris files: {', '.join(newly_mapped)}")
+    return newly_mapped
+
+
+def map_julian_days(first_jd, last_jd):
+    """按 Julian Day 范围映射所需的数据文件，供批量计算前调用"""
+    return map_years(swe.revjul(first_jd)[0], swe.revjul(last_jd)[0])
+
+
+def warm_up(start_year, end_year):
+    """
+    预热一段年份：映射数据文件，并在每个数据块内各计算一次全部行星，
+    让 swisseph 提前打开文件句柄、读入文件头
+    """
+    from ephemeris import planet_codes
+
+    map_years(start_year, end_year)
+    for block in range(block_of_year(start_year), block_of_year(end_year) + 1, _YEARS_PER_FILE // 100):
+        year = min(max(block * 100, start_year), end_year)
+        jd = swe.julday(year, 1, 1, 0)
+        for code in planet_codes.values():
+            swe.calc(jd, code, swe.FLG_SWIEPH | swe.FLG_SPEED)
+    logger.info(f"Ephemeris warmed up for years {start_year}-{end_year}")
+
+
+def warm_up_from_env():
+    """读取环境变量 EPHE_WARM_YEARS（格式 "起始年-结束年"），未设置时不做任何事"""
+    years = os.environ.get("EPHE_WARM_YEARS")
+    if not years:
+        return
+    start_year, end_year = (int(value) for value in years.split("-", 1))
+    warm_up(start_year, end_year)
+
+
+def backend_name(retflag):
+    """根据 swe.calc 的返回标记判断实际使用的星历后端"""
+    if retflag & swe.FLG_JPLEPH:
+        return "jpl"
+    if retflag & swe.FLG_SWIEPH:
+        return "swisseph"
+    if retflag & swe.FLG_MOSEPH:
+        return "moshier"
+    return "unknown"
+
+
+def mapped_files():
+    """返回当前已映射的文件名列表"""
+    return sorted(_mapped)
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_WILLNEED)
+    # 逐页读取一个字节，确保文件内容已进入页缓存
+    for offset in range(0, len(mapped), mmap.PAGESIZE):
+        mapped[offset]
+    return mapped
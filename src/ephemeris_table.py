@@ -0,0 +1,209 @@
+"""
+预计算的 Chebyshev 星历表：以分段 Chebyshev 多项式缓存各行星的黄经，
+在覆盖范围内通过多项式求值得到黄经与速度，范围外由调用方回退到 Swiss Ephemeris。
+
+生成表文件（默认覆盖 1900–2100 年，写入 data/ephemeris_table.npz）：
+  python src/ephemeris_table.py [输出路径] [起始年] [结束年]
+"""
+import os
+import sys
+
+import numpy as np
+import swisseph as swe
+from numpy.polynomial import chebyshev
+
+from ephemeris import POSITION_DTYPE, PositionEngine, planet_codes
+from ephemeris_data import resolve_data_dir
+
+DEFAULT_TABLE_PATH = os.path.join(resolve_data_dir(), "ephemeris_table.npz")
+
+# 每个天体的分段长度（日）与每段的 Chebyshev 系数个数，
+# 取值使构建时实测的黄经误差约在 1″ 以内
+BODY_SEGMENTS = {
+    "Sun": (16, 10),
+    "Moon": (4, 12),
+    "Mercury": (8, 12),
+    "Venus": (16, 12),
+    "Mars": (16, 12),
+    "Jupiter": (32, 12),
+    "Saturn": (32, 12),
+    "Uranus": (32, 10),
+    "Neptune": (16, 10),
+    "Pluto": (32, 10)
+}
+
+# 构建时每段用于估计误差上界的抽样点数
+_CHECK_POINTS = 16
+
+
+class ChebyshevTable:
+    """
+    分段 Chebyshev 星历表。
+
+    属性:
+      start_jd / end_jd: 覆盖范围 [start_jd, end_jd)
+      bodies: 表中包含的天体名称（顺序与 calc 的输出列一致）
+      lon_error / speed_error: 构建时实测的最大黄经误差（°）与速度误差（°/日）
+    """
+
+    def __init__(self, start_jd, end_jd, segments):
+        """
+        :param segments: { 名称: (分段长度, 系数矩阵[段数, 系数个数], 黄经误差, 速度误差) }
+        """
+        self.start_jd = float(start_jd)
+        self.end_jd = float(end_jd)
+        self.bodies = list(segments)
+        self._seg_days = np.array([segments[b][0] for b in self.bodies], dtype=float)
+        self._coef = {b: segments[b][1] for b in self.bodies}
+        # 把所有天体的系数按行拼接成一个矩阵（系数个数不足的补零），
+        # 求值时一次索引即可取出 (时刻 × 天体) 的全部系数行
+        width = max(c.shape[1] for c in self._coef.values())
+        stacked = [np.pad(c, ((0, 0), (0, width - c.shape[1]))) for c in self._coef.values()]
+        self._row_offset = np.cumsum([0] + [c.shape[0] for c in stacked[:-1]])
+        self._coef_all = np.concatenate(stacked)
+        # 导数系数在加载时一次性求出，速度即多项式的导数
+        self._dcoef_all = chebyshev.chebder(self._coef_all, axis=1)
+        # 单个时刻时改用 Python 浮点运算，避免小数组上的 NumPy 调用开销
+        self._seg_list = self._seg_days.tolist()
+        self._offset_list = self._row_offset.tolist()
+        self.lon_error = {b: float(segments[b][2]) for b in self.bodies}
+        self.speed_error = {b: float(segments[b][3]) for b in self.bodies}
+
+    def covers(self, julian_days):
+        """判断所有给定时刻是否都在表的覆盖范围内"""
+        jds = np.asarray(julian_days, dtype=float)
+        return bool(np.all((jds >= self.start_jd) & (jds < self.end_jd)))
+
+    def calc(self, julian_days):
+        """
+        以多项式求值计算各天体的黄经与速度，输出格式与 PositionEngine.calc 相同。
+        表中只保存黄经，lat 与 dist 字段填 NaN。调用前应先用 covers() 检查范围。
+        """
+        jds = np.atleast_1d(np.asarray(julian_days, dtype=float))
+        out = np.full((jds.size, len(self.bodies)), np.nan, dtype=POSITION_DTYPE)
+        if jds.size == 1:
+            lons, speeds = self._calc_scalar(float(jds[0]))
+            out['lon'][0] = lons
+            out['speed'][0] = speeds
+            return out
+        offset = jds[:, None] - self.start_jd
+        idx = (offset // self._seg_days).astype(int)
+        x = 2.0 * (offset - idx * self._seg_days) / self._seg_days - 1.0
+        rows = idx + self._row_offset
+        out['lon'] = _clenshaw(self._coef_all[rows], x) % 360
+        out['speed'] = _clenshaw(self._dcoef_all[rows], x) * (2.0 / self._seg_days)
+        return out
+
+    def _calc_scalar(self, julian_day):
+        offset = julian_day - self.start_jd
+        lons = []
+        speeds = []
+        for seg, row_offset in zip(self._seg_list, self._offset_list):
+            idx = int(offset // seg)
+            x = 2.0 * (offset - idx * seg) / seg - 1.0
+            lons.append(_clenshaw_scalar(self._coef_all[idx + row_offset].tolist(), x) % 360)
+            speeds.append(_clenshaw_scalar(self._dcoef_all[idx + row_offset].tolist(), x) * 2.0 / seg)
+        return lons, speeds
+
+    def save(self, path):
+        arrays = {
+            "start_jd": self.start_jd,
+            "end_jd": self.end_jd,
+            "bodies": np.array(self.bodies),
+        }
+        for j, body in enumerate(self.bodies):
+            arrays[f"{body}_seg_days"] = self._seg_days[j]
+            arrays[f"{body}_coef"] = self._coef[body]
+            arrays[f"{body}_error"] = np.array([self.lon_error[body], self.speed_error[body]])
+        np.savez(path, **arrays)
+
+
+def _clenshaw(coef, x):
+    """
+    以 Clenshaw 递推求 Chebyshev 级数的值。
+    coef 的最后一维为系数，其余维度与 x 的形状一致
+    """
+    b1 = np.zeros_like(x)
+    b2 = np.zeros_like(x)
+    for k in range(coef.shape[-1] - 1, 0, -1):
+        b1, b2 = 2.0 * x * b1 - b2 + coef[..., k], b1
+    return x * b1 - b2 + coef[..., 0]
+
+
+def _clenshaw_scalar(coef, x):
+    """_clenshaw 的纯 Python 版本，coef 为系数列表"""
+    b1 = b2 = 0.0
+    for c in coef[:0:-1]:
+        b1, b2 = 2.0 * x * b1 - b2 + c, b1
+    return x * b1 - b2 + coef[0]
+
+
+def build_table(start_jd, end_jd, bodies=None):
+    """
+    由 Swiss Ephemeris 计算 Chebyshev 节点上的黄经并拟合系数，返回 ChebyshevTable。
+    end_jd 会向后取整到各天体分段长度的整数倍，因此实际覆盖范围取所有天体中最短者。
+    """
+    bodies = list(bodies) if bodies is not None else list(planet_codes)
+    rng = np.random.default_rng(0)
+    segments = {}
+    covered_end = np.inf
+    for body in bodies:
+        seg_days, n = BODY_SEGMENTS[body]
+        engine = PositionEngine(bodies=[body])
+        n_seg = int(np.ceil((end_jd - start_jd) / seg_days))
+        seg_start = start_jd + np.arange(n_seg) * seg_days
+        covered_end = min(covered_end, seg_start[-1] + seg_days)
+
+        # 在 Chebyshev 节点上取样，并在段内展开 360° 跳变
+        k = np.arange(n)
+        x = np.cos(np.pi * (k + 0.5) / n)
+        node_jds = seg_start[:, None] + (x[None, :] + 1.0) * seg_days / 2.0
+        lon = engine.calc(node_jds.ravel())['lon'].reshape(n_seg, n)
+        lon = np.unwrap(lon, period=360, axis=1)
+
+        # 离散余弦变换求系数
+        basis = np.cos(np.outer(k, np.pi * (k + 0.5) / n))
+        coef = lon @ basis.T * (2.0 / n)
+        coef[:, 0] /= 2.0
+
+        # 在每段内随机抽样，与 Swiss Ephemeris 对比得到误差上界
+        check_idx = np.repeat(np.arange(n_seg), _CHECK_POINTS)
+        check_x = rng.uniform(-1.0, 1.0, check_idx.size)
+        check_jds = seg_start[check_idx] + (check_x + 1.0) * seg_days / 2.0
+        expected = engine.calc(check_jds)
+        lon_fit = _clenshaw(coef[check_idx], check_x)
+        speed_fit = _clenshaw(chebyshev.chebder(coef, axis=1)[check_idx], check_x) * (2.0 / seg_days)
+        lon_error = np.abs((lon_fit - expected['lon'][:, 0] + 180) % 360 - 180).max()
+        speed_error = np.abs(speed_fit - expected['speed'][:, 0]).max()
+
+        segments[body] = (seg_days, coef, lon_error, speed_error)
+    return ChebyshevTable(start_jd, covered_end, segments)
+
+
+def load_table(path=DEFAULT_TABLE_PATH):
+    """读取由 build_table().save() 写出的表文件；文件不存在时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        segments = {
+            str(body): (
+                float(data[f"{body}_seg_days"]),
+                data[f"{body}_coef"],
+                *data[f"{body}_error"].tolist()
+            )
+            for body in data["bodies"]
+        }
+        return ChebyshevTable(float(data["start_jd"]), float(data["end_jd"]), segments)
+
+
+if __name__ == "__main__":
+    output_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE_PATH
+    start_year = int(sys.argv[2]) if len(sys.argv) > 2 else 1900
+    end_year = int(sys.argv[3]) if len(sys.argv) > 3 else 2100
+
+    table = build_table(swe.julday(start_year, 1, 1, 0), swe.julday(end_year, 1, 1, 0))
+    table.save(output_path)
+    print(f"Saved Chebyshev table to {output_path}")
+    for body in table.bodies:
+        print(f"  {body}: max lon error {table.lon_error[body] * 3600:.3f}″, "
+              f"max speed error {table.speed_error[body]:.2e}°/day")
@@ -0,0 +1,376 @@
+"""
+天象事件搜索：
+  - 行运行星与本命点形成精确相位的时刻（find_aspect_events）
+  - 行星换座，即黄经越过 30° 的整数倍（find_ingresses）
+  - 行星停滞，即黄经速度变号（find_stations）
+
+做法是先在粗网格上（默认每日一个点）批量计算行星的黄经与速度，找出目标函数变号的区间；
+行星在区间内停滞转向时，先按速度线性插值估计停滞时刻，把区间一分为二，
+以免同一区间内的两次穿越互相抵消而漏掉。随后对全部候选区间一起迭代求根：
+每步用 swisseph 计算精确值做牛顿迭代，落到区间外时改为二分，直到时刻误差小于 ROOT_TOLERANCE。
+结果按块以生成器逐条产出，块内按时间排序。
+
+换座与停滞事件还可预先算好保存为 EventIndex（默认 data/event_index.npz），
+查询“下一次换座/停滞”时对排好序的时刻数组做二分查找，复杂度 O(log n)：
+  python src/events.py [输出路径] [起始年] [结束年]
+"""
+import os
+import sys
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris import PositionEngine, planet_codes
+from ephemeris_data import resolve_data_dir
+from astro import get_positions_with_backend, zodiac_names
+
+DEFAULT_INDEX_PATH = os.path.join(resolve_data_dir(), "event_index.npz")
+
+# 默认搜索的主要相位
+MAJOR_ASPECTS = (0, 60, 90, 120, 180)
+
+# 换座与停滞的事件类型
+EVENT_KINDS = ("ingress", "station_retrograde", "station_direct")
+
+# 求根的时刻精度（日），约 0.1 秒
+ROOT_TOLERANCE = 1e-6
+_MAX_ITERATIONS = 40
+
+# 以差分求速度变化率（加速度）时的时间间隔（日）
+_ACCELERATION_STEP = 1e-3
+
+_BODIES = list(planet_codes)
+
+
+def find_aspect_events(start_jd, end_jd, natal_positions, transit_bodies=None, aspects=MAJOR_ASPECTS,
+                       step_days=1.0, chunk_days=64):
+    """
+    搜索 [start_jd, end_jd) 内行运行星与本命行星形成精确相位的时刻。
+
+    :param natal_positions: 本命盘位置，格式同 get_planet_positions 的返回值
+                            （{名称: {'position': 黄经, ...}}）
+    :param transit_bodies: 参与搜索的行运天体名称，默认为 planet_codes 中的全部行星
+    :param aspects: 相位角（°）序列，默认为主要相位
+    :param step_days: 粗网格步长（日），需保证行运天体在一步内移动远小于 180°
+    :return: 生成器，逐条产出
+             {"jd", "transit", "natal", "aspect", "retrograde"}，retrograde 为成相时行运天体是否逆行
+    """
+    natal_names, angles, targets = _aspect_targets(natal_positions, aspects)
+    for jds, body_index, target_index, speed in _find_crossings(
+            start_jd, end_jd, transit_bodies, targets, step_days, chunk_days):
+        for jd, body, target, body_speed in zip(jds.tolist(), body_index.tolist(), target_index.tolist(),
+                                                speed.tolist()):
+            yield {
+                "jd": jd,
+                "transit": _BODIES[body],
+                "natal": natal_names[target],
+                "aspect": angles[target],
+                "retrograde": body_speed < 0
+            }
+
+
+def find_ingresses(start_jd, end_jd, bodies=None, step_days=1.0, chunk_days=366):
+    """
+    搜索 [start_jd, end_jd) 内行星进入新星座的时刻。
+    产出 {"jd", "body", "event": "ingress", "sign", "retrograde"}，sign 为进入的星座名称；
+    逆行退回前一星座时 retrograde 为 True
+    """
+    boundaries = np.arange(12) * 30.0
+    for jds, body_index, boundary_index, speed in _find_crossings(
+            start_jd, end_jd, bodies, boundaries, step_days, chunk_days):
+        for jd, body, boundary, body_speed in zip(jds.tolist(), body_index.tolist(), boundary_index.tolist(),
+                                                  speed.tolist()):
+            yield _event(_BODIES[body], "ingress", jd, boundary if body_speed >= 0 else (boundary - 1) % 12,
+                         body_speed < 0)
+
+
+def find_stations(start_jd, end_jd, bodies=None, step_days=1.0, chunk_days=366):
+    """
+    搜索 [start_jd, end_jd) 内行星停滞（黄经速度为零）的时刻。
+    产出 {"jd", "body", "event", "position"}，event 为 "station_retrograde"（转为逆行）
+    或 "station_direct"（转为顺行），position 为停滞时的黄经。太阳与月亮不会停滞
+    """
+    bodies = list(bodies) if bodies is not None else _BODIES
+    if not bodies:
+        return
+    for chunk_jds, lon, speed in _grid_chunks(start_jd, end_jd, bodies, step_days, chunk_days):
+        step_index, column = np.nonzero((speed[:-1] < 0) != (speed[1:] < 0))
+        if not step_index.size:
+            continue
+        body_index = np.array([_BODIES.index(body) for body in bodies])[column]
+
+        def evaluate(active, t):
+            return _speed_and_acceleration(body_index[active], t)
+
+        jds, acceleration = refine_roots(evaluate, chunk_jds[step_index], chunk_jds[step_index + 1],
+                                         speed[step_index, column], speed[step_index + 1, column])
+        position = _body_positions(body_index, jds)[0]
+        keep = (jds >= start_jd) & (jds < end_jd)
+        for i in np.flatnonzero(keep)[np.argsort(jds[keep], kind="stable")]:
+            kind = "station_retrograde" if acceleration[i] < 0 else "station_direct"
+            yield _event(_BODIES[body_index[i]], kind, float(jds[i]), float(position[i]))
+
+
+def refine_roots(evaluate, a, b, fa, fb):
+    """
+    在一组区间 [a, b] 上同时求根，要求 fa、fb 异号。
+
+    :param evaluate: evaluate(active, t) -> (f, dfdt)，active 为仍在迭代的区间下标，t 为对应的时刻数组
+    :return: (根, 根处的 dfdt)
+    """
+    a, b, fa, fb = (np.array(x, dtype=float) for x in (a, b, fa, fb))
+    t = a - fa * (b - a) / (fb - fa)
+    derivative = np.full(t.size, np.nan)
+    active = np.arange(t.size)
+    for _ in range(_MAX_ITERATIONS):
+        if not active.size:
+            break
+        f, df = evaluate(active, t[active])
+        derivative[active] = df
+        # 用 t 处的符号收缩区间
+        left = (f < 0) == (fa[active] < 0)
+        a[active] = np.where(left, t[active], a[active])
+        fa[active] = np.where(left, f, fa[active])
+        b[active] = np.where(left, b[active], t[active])
+        fb[active] = np.where(left, fb[active], f)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = t[active] - f / df
+        inside = np.isfinite(step) & (step > a[active]) & (step < b[active])
+        new_t = np.where(inside, step, 0.5 * (a[active] + b[active]))
+        done = (np.abs(new_t - t[active]) < ROOT_TOLERANCE) | (f == 0) | (b[active] - a[active] < ROOT_TOLERANCE)
+        t[active] = np.where(f == 0, t[active], new_t)
+        active = active[~done]
+    return t, derivative
+
+
+class EventIndex:
+    """
+    预先计算的换座与停滞事件索引。
+
+    每个 (天体, 事件类型) 保存一个按时间排序的结构化数组（jd、value、retrograde），
+    value 在换座事件中为进入星座的序号，在停滞事件中为停滞黄经。
+    只有查询时刻落在 [start_jd, end_jd) 内时结果才完整，covers() 用于判断。
+    """
+
+    _RECORD_DTYPE = np.dtype([('jd', 'f8'), ('value', 'f8'), ('retrograde', '?')])
+
+    def __init__(self, start_jd, end_jd, records):
+        """
+        :param records: { (天体, 事件类型): 结构化数组 }，可由 from_events 从事件字典构建
+        """
+        self.start_jd = float(start_jd)
+        self.end_jd = float(end_jd)
+        self._records = {key: np.sort(value, order='jd') for key, value in records.items()}
+
+    @classmethod
+    def from_events(cls, start_jd, end_jd, events):
+        grouped = {}
+        for event in events:
+            value = zodiac_names.index(event["sign"]) if event["event"] == "ingress" else event["position"]
+            grouped.setdefault((event["body"], event["event"]), []).append(
+                (event["jd"], value, event.get("retrograde", False)))
+        return cls(start_jd, end_jd, {key: np.array(rows, dtype=cls._RECORD_DTYPE) for key, rows in grouped.items()})
+
+    def covers(self, julian_day):
+        return self.start_jd <= julian_day < self.end_jd
+
+    def next_event(self, julian_day, body, kind="ingress"):
+        """返回 julian_day 之后（不含）该天体的第一个 kind 事件；不在索引范围内时返回 None"""
+        records = self._records.get((body, kind))
+        if records is None or not self.covers(julian_day):
+            return None
+        i = np.searchsorted(records['jd'], julian_day, side='right')
+        return self._to_event(body, kind, records[i]) if i < len(records) else None
+
+    def events_between(self, start_jd, end_jd, body, kind="ingress"):
+        """返回 [start_jd, end_jd) 内该天体的全部 kind 事件"""
+        records = self._records.get((body, kind), np.empty(0, dtype=self._RECORD_DTYPE))
+        lo, hi = np.searchsorted(records['jd'], [start_jd, end_jd], side='left')
+        return [self._to_event(body, kind, record) for record in records[lo:hi]]
+
+    def save(self, path):
+        arrays = {"start_jd": self.start_jd, "end_jd": self.end_jd}
+        for (body, kind), records in self._records.items():
+            arrays[f"{body}__{kind}"] = records
+        np.savez(path, **arrays)
+
+    @staticmethod
+    def _to_event(body, kind, record):
+        if kind == "ingress":
+            return _event(body, kind, float(record['jd']), int(record['value']), bool(record['retrograde']))
+        return _event(body, kind, float(record['jd']), float(record['value']))
+
+
+def build_event_index(start_jd, end_jd, bodies=None):
+    """计算 [start_jd, end_jd) 内全部换座与停滞事件并建立索引"""
+    events = chain(find_ingresses(start_jd, end_jd, bodies), find_stations(start_jd, end_jd, bodies))
+    return EventIndex.from_events(start_jd, end_jd, events)
+
+
+def load_event_index(path=DEFAULT_INDEX_PATH):
+    """读取由 EventIndex.save 写出的索引文件；文件不存在时返回 None"""
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        records = {tuple(name.split("__", 1)): data[name] for name in data.files if "__" in name}
+        return EventIndex(float(data["start_jd"]), float(data["end_jd"]), records)
+
+
+def find_next_event(julian_day, body, kinds=("ingress",), index=None, max_years=40):
+    """
+    查找 julian_day 之后该天体第一个属于 kinds 的换座或停滞事件。
+    索引覆盖该时刻时直接二分查找；否则（或索引中其后已无事件）从索引末尾或 julian_day 起
+    逐年向后搜索，最多 max_years 年，找不到时返回 None
+    """
+    search_from = julian_day
+    if index is not None and index.covers(julian_day):
+        found = [event for event in (index.next_event(julian_day, body, kind) for kind in kinds) if event]
+        if found:
+            return min(found, key=lambda event: event["jd"])
+        search_from = index.end_jd
+
+    finders = []
+    if "ingress" in kinds:
+        finders.append(find_ingresses)
+    if any(kind != "ingress" for kind in kinds):
+        finders.append(find_stations)
+    for year in range(max_years):
+        window_start = search_from + year * 366
+        found = [event for finder in finders for event in finder(window_start, window_start + 366, [body])
+                 if event["event"] in kinds and event["jd"] > julian_day]
+        if found:
+            return min(found, key=lambda event: event["jd"])
+    return None
+
+
+def _event(body, kind, julian_day, value, retrograde=False):
+    if kind == "ingress":
+        return {"jd": julian_day, "body": body, "event": kind, "sign": zodiac_names[value],
+                "retrograde": retrograde}
+    return {"jd": julian_day, "body": body, "event": kind, "position": value}
+
+
+def _find_crossings(start_jd, end_jd, bodies, targets, step_days, chunk_days):
+    """
+    搜索天体黄经与各目标黄经相合（差值为零）的时刻，按块产出排序后的
+    (时刻, 天体序号, 目标序号, 速度) 数组；天体序号为在 planet_codes 中的位置
+    """
+    bodies = list(bodies) if bodies is not None else _BODIES
+    if not bodies or not len(targets):
+        return
+
+    def evaluate(active, t):
+        lon, speed = _body_positions(body_index[active], t)
+        return _wrap180(lon - targets[target_index[active]]), speed
+
+    for chunk_jds, chunk_lon, chunk_speed in _grid_chunks(start_jd, end_jd, bodies, step_days, chunk_days):
+        brackets = []
+        for column, body in enumerate(bodies):
+            jds, lon, speed = _split_at_stations(body, chunk_jds, chunk_lon[:, column], chunk_speed[:, column])
+            # (时刻, 目标) 上的角距，以及相邻时刻间沿实际运动方向展开后的终点值
+            f = _wrap180(lon[:, None] - targets[None, :])
+            f0 = f[:-1]
+            f1 = f0 + _wrap180(np.diff(lon))[:, None]
+            step_index, target_index = np.nonzero((f0 < 0) != (f1 < 0))
+            brackets.append((np.full(step_index.size, _BODIES.index(body)), target_index,
+                             jds[step_index], jds[step_index + 1],
+                             f0[step_index, target_index], f1[step_index, target_index]))
+        body_index, target_index, a, b, fa, fb = (np.concatenate(column) for column in zip(*brackets))
+        if not a.size:
+            continue
+
+        jds, speed = refine_roots(evaluate, a, b, fa, fb)
+        keep = np.flatnonzero((jds >= start_jd) & (jds < end_jd))
+        order = keep[np.argsort(jds[keep], kind="stable")]
+        yield jds[order], body_index[order], target_index[order], speed[order]
+
+
+def _aspect_targets(natal_positions, aspects):
+    """
+    展开所有目标黄经：0° 与 180° 只有一个目标点，其余相位在本命点两侧各有一个。
+    返回 (本命天体名称列表, 相位角列表, 目标黄经数组)，三者一一对应
+    """
+    names = []
+    angles = []
+    targets = []
+    for name, data in natal_positions.items():
+        for angle in aspects:
+            for sign in ((1,) if angle in (0, 180) else (1, -1)):
+                names.append(name)
+                angles.append(angle)
+                targets.append((data['position'] + sign * angle) % 360)
+    return names, angles, np.array(targets, dtype=float)
+
+
+def _grid_chunks(start_jd, end_jd, bodies, step_days, chunk_days):
+    """
+    按块产出 (网格时刻, 黄经[时刻, 天体], 速度[时刻, 天体])；相邻块共用边界时刻，
+    最后一个网格点不早于 end_jd。全部行星时经由 get_positions_with_backend（可使用 Chebyshev 表），
+    只有部分天体时只计算这些天体
+    """
+    steps = max(1, int(np.ceil((end_jd - start_jd) / step_days)))
+    chunk_steps = max(1, int(chunk_days / step_days))
+    for first in range(0, steps, chunk_steps):
+        jds = start_jd + np.arange(first, min(first + chunk_steps, steps) + 1) * step_days
+        if bodies == _BODIES:
+            positions = get_positions_with_backend(jds)[0]
+        else:
+            positions = _engine(tuple(bodies)).calc(jds)
+        yield jds, positions['lon'], positions['speed']
+
+
+def _split_at_stations(body, jds, lon, speed):
+    """
+    在速度变号的区间内插入估计的停滞时刻（速度线性插值为零处），返回 (时刻, 黄经, 速度)。
+    插入点的位置用 swisseph 精确计算
+    """
+    station = np.flatnonzero(speed[:-1] * speed[1:] < 0)
+    if not station.size:
+        return jds, lon, speed
+    station_jds = jds[station] + (jds[station + 1] - jds[station]) * speed[station] / (speed[station] - speed[station + 1])
+    station_positions = _engine((body,)).calc(station_jds)[:, 0]
+    return (np.insert(jds, station + 1, station_jds),
+            np.insert(lon, station + 1, station_positions['lon']),
+            np.insert(speed, station + 1, station_positions['speed']))
+
+
+def _body_positions(body_index, jds):
+    """按天体分组，以 swisseph 精确计算每个 (天体, 时刻) 的黄经与速度"""
+    lon = np.empty(jds.size)
+    speed = np.empty(jds.size)
+    for index in np.unique(body_index):
+        mask = body_index == index
+        positions = _engine((_BODIES[index],)).calc(jds[mask])[:, 0]
+        lon[mask] = positions['lon']
+        speed[mask] = positions['speed']
+    return lon, speed
+
+
+def _speed_and_acceleration(body_index, jds):
+    """停滞求根用：返回速度及其前向差分得到的变化率"""
+    speed = _body_positions(body_index, jds)[1]
+    later = _body_positions(body_index, jds + _ACCELERATION_STEP)[1]
+    return speed, (later - speed) / _ACCELERATION_STEP
+
+
+@lru_cache(maxsize=None)
+def _engine(bodies):
+    return PositionEngine(bodies=list(bodies))
+
+
+def _wrap180(angle):
+    """把角度差归一化到 [-180, 180)"""
+    return (angle + 180) % 360 - 180
+
+
+if __name__ == "__main__":
+    output_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INDEX_PATH
+    start_year = int(sys.argv[2]) if len(sys.argv) > 2 else 1900
+    end_year = int(sys.argv[3]) if len(sys.argv) > 3 else 2100
+
+    event_index = build_event_index(swe.julday(start_year, 1, 1, 0), swe.julday(end_year, 1, 1, 0))
+    event_index.save(output_path)
+    print(f"Saved event index to {output_path}")
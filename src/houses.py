@@ -0,0 +1,208 @@
+"""
+宫位计算服务。
+
+支持 HOUSE_SYSTEMS 中的宫位系统。batch_houses 可一次计算一组 (JD, 纬度, 经度) 的宫头：
+等宫制、整宫制、Porphyry、Regiomontanus 与 Campanus 有闭式解，可以 NumPy 向量化计算。
+闭式解需要每个时刻的恒星时与黄赤交角，逐个向 swisseph 取值并不比直接调用 swe.houses 便宜，
+因此只在时刻密集（例如行运时间序列）时，在 0.25 日的等距网格上取样后插值（误差约 0.001″）；
+时刻稀疏的批次以及需要迭代求解的 Placidus、Koch，仍逐个调用 swe.houses（经由下面的缓存）。
+assign_houses 以二分查找的方式一次判断一批天体所在的宫位。
+
+原先在计算宫头前调用 swe.set_topo，它会修改 Swiss Ephemeris 的进程级全局状态，
+而宫头只取决于时刻、地理经纬度与宫位系统，本身并不需要观测点设置，因此这里不再调用。
+
+计算结果是不可变的元组，按 (Julian Day, 纬度, 经度, 宫位系统) 做 LRU 缓存：
+同一请求中生成 JSON 与绘图两次取宫头时，第二次直接命中缓存。
+functools.lru_cache 本身是线程安全的，可在多线程 WSGI worker 或线程池中直接调用。
+"""
+from bisect import bisect_right
+from functools import lru_cache
+
+import numpy as np
+import swisseph as swe
+
+DEFAULT_HOUSE_SYSTEM = "P"  # Placidus
+
+# 宫位系统代码 -> 名称（代码与 swisseph 一致）
+HOUSE_SYSTEMS = {
+    "P": "Placidus",
+    "K": "Koch",
+    "O": "Porphyry",
+    "R": "Regiomontanus",
+    "C": "Campanus",
+    "E": "Equal",
+    "W": "Whole Sign"
+}
+
+# 可用闭式公式向量化计算的宫位系统
+_CLOSED_FORM_SYSTEMS = {"O", "R", "C", "E", "W"}
+
+# Regiomontanus / Campanus 的中间宫头：{宫头索引: 自天顶量起的等分角（°）}
+_INTERMEDIATE_CUSPS = {10: 30.0, 11: 60.0, 1: 120.0, 2: 150.0}
+
+# 恒星时与黄赤交角的插值网格步长（日）
+_FRAME_STEP = 0.25
+# 恒星时每日的平均增量（°），插值前先扣除这一线性部分
+_SIDEREAL_RATE = 360.98564736629
+_J2000 = 2451545.0
+
+# 缓存的 (时刻, 地点, 宫位系统) 组合数
+_CACHE_SIZE = 4096
+
+
+def compute_houses(julian_day, latitude, longitude, house_system=DEFAULT_HOUSE_SYSTEM):
+    """
+    计算 12 个宫头及 ASC/MC 等特殊点。
+
+    :param julian_day: Julian Day（UT）
+    :param house_system: 宫位系统代码，见 HOUSE_SYSTEMS
+    :return: (cusps, ascmc)，cusps 为 12 个宫头黄经的元组；
+             ascmc 依次为 ASC、MC、ARMC、Vertex 等，与 swe.houses 相同
+    """
+    _check_house_system(house_system)
+    return _houses(float(julian_day), float(latitude), float(longitude), house_system)
+
+
+def house_cusps(julian_day, latitude, longitude, house_system=DEFAULT_HOUSE_SYSTEM):
+    """只返回 12 个宫头黄经的元组"""
+    return compute_houses(julian_day, latitude, longitude, house_system)[0]
+
+
+def batch_houses(julian_days, latitudes, longitudes, house_system=DEFAULT_HOUSE_SYSTEM):
+    """
+    批量计算宫头。三个参数可为标量或可相互广播的数组，展平后共 n 组。
+
+    :return: (cusps, ascmc)，形状分别为 (n, 12) 与 (n, 3)，ascmc 的列为 ASC、MC、ARMC
+    """
+    _check_house_system(house_system)
+    jds, lats, lons = (np.ravel(a) for a in np.broadcast_arrays(
+        np.asarray(julian_days, dtype=float), np.asarray(latitudes, dtype=float),
+        np.asarray(longitudes, dtype=float)))
+    # 网格每点需两次 swisseph 调用，逐个计算每组只需一次 swe.houses
+    if house_system in _CLOSED_FORM_SYSTEMS and jds.size and 2 * _frame_grid_size(jds) < jds.size:
+        return _closed_form_houses(*_sidereal_frame(jds), lats, lons, house_system)
+
+    cusps = np.empty((jds.size, 12))
+    ascmc = np.empty((jds.size, 3))
+    for i, (jd, lat, lon) in enumerate(zip(jds.tolist(), lats.tolist(), lons.tolist())):
+        row_cusps, row_ascmc = _houses(jd, lat, lon, house_system)
+        cusps[i] = row_cusps
+        ascmc[i] = row_ascmc[:3]
+    return cusps, ascmc
+
+
+def assign_houses(longitudes, cusps):
+    """
+    判断天体所在的宫位（1～12）。
+
+    :param longitudes: 形状为 (..., n_bodies) 的天体黄经
+    :param cusps: 形状为 (..., 12) 的宫头黄经，前导维度与 longitudes 一致
+    :return: 形状为 (..., n_bodies) 的整数数组
+
+    以第 1 宫宫头为起点把宫头与黄经都换算成 [0, 360) 内的相对角度，宫头即成为递增序列，
+    宫位就是相对黄经在其中的插入位置（searchsorted，side="right"），跨越 0° 的宫位也能正确处理
+    """
+    lons = np.asarray(longitudes, dtype=float)
+    cusps = np.asarray(cusps, dtype=float)
+    rel_cusps = (cusps - cusps[..., :1]) % 360
+    rel_lons = (lons - cusps[..., :1]) % 360
+    if cusps.ndim == 1:
+        return np.searchsorted(rel_cusps, rel_lons, side="right")
+    return np.sum(rel_lons[..., :, None] >= rel_cusps[..., None, :], axis=-1)
+
+
+def house_of(degree, cusps):
+    """assign_houses 的单个天体版本，用纯 Python 的二分查找，返回 1～12"""
+    first = cusps[0]
+    rel_cusps = [(cusp - first) % 360 for cusp in cusps]
+    return bisect_right(rel_cusps, (degree - first) % 360)
+
+
+def cache_info():
+    """返回宫头缓存的命中统计（functools.lru_cache 的 CacheInfo）"""
+    return _houses.cache_info()
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _houses(julian_day, latitude, longitude, house_system):
+    cusps, ascmc = swe.houses(julian_day, latitude, longitude, house_system.encode("ascii"))
+    return tuple(cusps), tuple(ascmc)
+
+
+def _check_house_system(house_system):
+    if house_system not in HOUSE_SYSTEMS:
+        raise ValueError(f"Unsupported house system: {house_system}")
+
+
+def _frame_grid_size(jds):
+    return int((jds.max() - jds.min()) / _FRAME_STEP) + 2
+
+
+def _sidereal_frame(jds):
+    """
+    返回每个时刻的格林尼治视恒星时（°）与真黄赤交角（弧度）。
+    在等距网格上向 swisseph 取值（与 swe.houses 使用相同的岁差章动模型），
+    恒星时扣除线性部分后与黄赤交角一起线性插值
+    """
+    grid = jds.min() + np.arange(_frame_grid_size(jds)) * _FRAME_STEP
+    grid_list = grid.tolist()
+    gst = np.array([swe.sidtime(jd) for jd in grid_list]) * 15.0
+    eps = np.array([swe.calc_ut(jd, swe.ECL_NUT)[0][0] for jd in grid_list])
+    residual = np.unwrap(gst - _SIDEREAL_RATE * (grid - _J2000), period=360)
+    gst = (np.interp(jds, grid, residual) + _SIDEREAL_RATE * (jds - _J2000)) % 360
+    return gst, np.deg2rad(np.interp(jds, grid, eps))
+
+
+def _closed_form_houses(gst, eps, lats, lons, house_system):
+    armc = (gst + lons) % 360
+    phi = np.deg2rad(lats)
+
+    ramc = np.deg2rad(armc)
+    mc = np.rad2deg(np.arctan2(np.sin(ramc), np.cos(ramc) * np.cos(eps))) % 360
+    asc = _ascendant(armc, eps, np.tan(phi))
+    # 极圈内 ASC 可能落在 MC 西侧。与 swisseph 一致：Porphyry、等宫制、整宫制只把 ASC 换成其对点，
+    # Regiomontanus 与 Campanus 则把整组宫头（含 ASC、MC）旋转 180°
+    flipped = (asc - mc) % 360 > 180
+    if house_system in ("O", "E", "W"):
+        asc = np.where(flipped, (asc + 180) % 360, asc)
+
+    cusps = np.empty((armc.size, 12))
+    if house_system == "E":
+        cusps[:] = asc[:, None] + 30.0 * np.arange(12)
+    elif house_system == "W":
+        cusps[:] = (asc - asc % 30)[:, None] + 30.0 * np.arange(12)
+    else:
+        cusps[:, 0] = asc
+        cusps[:, 9] = mc
+        if house_system == "O":
+            # Porphyry：把 MC→ASC 与 ASC→IC 两个象限各三等分
+            arc = (asc - mc) % 360
+            cusps[:, 10] = mc + arc / 3
+            cusps[:, 11] = mc + arc * 2 / 3
+            cusps[:, 1] = asc + (180 - arc) / 3
+            cusps[:, 2] = asc + (180 - arc) * 2 / 3
+        else:
+            for index, angle in _INTERMEDIATE_CUSPS.items():
+                h = np.deg2rad(angle)
+                if house_system == "R":
+                    # Regiomontanus：等分天赤道，宫位圈的极高 tanφ' = tanφ·sin h
+                    offset = angle
+                    tan_pole = np.tan(phi) * np.sin(h)
+                else:
+                    # Campanus：等分卯酉圈，换算为赤道上的偏移与极高 sinφ' = sinφ·sin h
+                    offset = np.rad2deg(np.arctan2(np.sin(h) * np.cos(phi), np.cos(h)))
+                    tan_pole = np.tan(np.arcsin(np.sin(phi) * np.sin(h)))
+                cusps[:, index] = _ascendant(armc + offset - 90, eps, tan_pole)
+        # 其余宫头为对宫宫头 + 180°
+        cusps[:, 3:9] = cusps[:, [9, 10, 11, 0, 1, 2]] + 180
+        if house_system in ("R", "C"):
+            cusps[flipped] += 180
+            asc = np.where(flipped, (asc + 180) % 360, asc)
+            mc = np.where(flipped, (mc + 180) % 360, mc)
+    return cusps % 360, np.stack([asc, mc, armc], axis=1)
+
+
+def _ascendant(armc, eps, tan_pole):
+    """给定 ARMC（°）、黄赤交角（弧度）与极高的正切，求对应的上升点黄经（°）"""
+    ramc = np.deg2rad(armc)
+    return np.rad2deg(np.arctan2(np.cos(ramc), -(np.sin(ramc) * np.cos(eps) + tan_pole * np.sin(eps)))) % 360
@@ -0,0 +1,97 @@
+"""
+多进程绘图池：matplotlib 绘图期间持有 GIL，多线程无法利用多核，
+这里改为在若干常驻工作进程中绘图。
+
+  - 工作进程启动时预先导入 visualization 并绘制一张命盘，载入字体、建立底图模板
+  - 只传递可序列化的命盘描述（Chart，或行星字典、宫头与相位列表），返回图片字节
+  - 每个工作进程绘制 max_tasks_per_child 张后自动重启，限制 matplotlib 缓存带来的内存增长
+  - 进程池在第一次提交任务时才创建，导入本模块不会启动任何进程
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from chart import Chart
+
+logger = logging.getLogger(__name__)
+
+# 预热用的命盘：J2000.0，经纬度 0°
+_WARM_UP_JD = 2451545.0
+
+
+def _init_worker():
+    """工作进程初始化：导入绘图模块并完整绘制一次，之后的任务无需再加载字体与底图"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import visualization
+
+    positions = visualization.get_planet_positions(_WARM_UP_JD)
+    house_cusps = visualization.calculate_house_cusps(_WARM_UP_JD, 0.0, 0.0)
+    visualization.render_chart_png(positions, house_cusps, dpi=72)
+
+
+def _render(chart, dpi, image_format):
+    import visualization
+    return visualization.render_chart(chart, dpi, image_format)
+
+
+def _ping():
+    return os.getpid()
+
+
+class RenderPool:
+    """
+    用法:
+      render_pool = RenderPool(processes=4)
+      png_bytes = render_pool.render(positions, house_cusps, aspect_lines)
+    """
+
+    def __init__(self, processes=None, max_tasks_per_child=200):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # max_tasks_per_child 不支持 fork；spawn 也避免复制 Flask 进程中的线程状态
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        max_tasks_per_child=self.max_tasks_per_child)
+                    logger.info(f"Started render pool with {self.processes} processes")
+        return self._executor
+
+    def submit(self, planet_positions, house_cusps, aspect_lines=None, dpi=300, image_format="png"):
+        """提交绘图任务，返回结果为图片字节的 Future；image_format 见 visualization.IMAGE_FORMATS"""
+        return self.submit_chart(Chart.from_positions(planet_positions, house_cusps, aspect_lines), dpi,
+                                 image_format)
+
+    def submit_chart(self, chart, dpi=300, image_format="png"):
+        """与 submit 相同，参数为 Chart"""
+        return self._get_executor().submit(_render, chart, dpi, image_format)
+
+    def render(self, planet_positions, house_cusps, aspect_lines=None, dpi=300, image_format="png"):
+        """同步绘图，返回图片字节"""
+        return self.submit(planet_positions, house_cusps, aspect_lines, dpi, image_format).result()
+
+    def render_chart(self, chart, dpi=300, image_format="png"):
+        """以 Chart 同步绘图，返回图片字节"""
+        return self.submit_chart(chart, dpi, image_format).result()
+
+    def warm_up(self):
+        """提前启动全部工作进程并完成初始化，避免第一批请求承担启动开销"""
+        executor = self._get_executor()
+        pids = {future.result() for future in [executor.submit(_ping) for _ in range(self.processes)]}
+        logger.info(f"Render pool warmed up: {len(pids)} processes")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
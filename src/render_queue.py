@@ -0,0 +1,107 @@
+"""
+后台绘图队列：把耗时的 savefig 从请求线程移到固定数量的工作线程中执行。
+
+  - 队列有容量上限，满了以后 submit 抛出 RenderQueueFull，由调用方返回 503 实现背压
+  - 以文件名为键去重：同一张图片正在排队或绘制时，重复提交直接视为成功
+  - 记录绘图耗时的滑动平均，用来估算客户端应等待的秒数（Retry-After）
+  - 工作线程在第一次提交任务时才启动：gunicorn preload_app 在主进程中导入应用后 fork，
+    线程不会被带到子进程，因此按进程号判断，每个 worker 进程各自启动自己的线程
+"""
+import logging
+import math
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 尚无耗时统计时假定的单张绘图秒数
+_DEFAULT_RENDER_SECONDS = 2.0
+# 耗时滑动平均的平滑系数
+_EWMA_ALPHA = 0.2
+
+
+class RenderQueueFull(Exception):
+    """队列已满，调用方应稍后重试"""
+
+
+class RenderQueue:
+    """
+    用法:
+      render_queue = RenderQueue(workers=2, max_pending=32)
+      render_queue.submit(filename, plot_natal_chart, positions, ..., on_done=callback)
+      render_queue.is_pending(filename)
+    """
+
+    def __init__(self, workers=2, max_pending=32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue = queue.Queue()
+        self._pending = set()  # 排队中或绘制中的文件名
+        self._lock = threading.Lock()
+        self._avg_seconds = _DEFAULT_RENDER_SECONDS
+        self._threads = []
+        self._pid = None
+
+    def submit(self, name, func, *args, on_done=None, **kwargs):
+        """
+        提交一个绘图任务。name 通常为输出文件名，用于去重与查询状态；
+        on_done 在绘图成功后于工作线程中调用（不带参数）。
+        队列已满时抛出 RenderQueueFull。
+        """
+        with self._lock:
+            if name in self._pending:
+                return
+            if len(self._pending) >= self.max_pending:
+                raise RenderQueueFull(f"Render queue is full ({self.max_pending} pending)")
+            self._pending.add(name)
+            self._start_workers()
+        self._queue.put((name, func, args, kwargs, on_done))
+
+    def _start_workers(self):
+        """在当前进程中启动工作线程（调用方持有 self._lock）"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"render-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def is_pending(self, name):
+        with self._lock:
+            return name in self._pending
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def retry_after(self):
+        """估算当前队列排空所需的秒数（向上取整，至少 1 秒）"""
+        with self._lock:
+            pending = len(self._pending)
+            avg_seconds = self._avg_seconds
+        return max(1, math.ceil(avg_seconds * max(pending, 1) / self.workers))
+
+    def join(self):
+        """等待所有已提交的任务完成（主要供测试使用）"""
+        self._queue.join()
+
+    def _worker(self):
+        while True:
+            name, func, args, kwargs, on_done = self._queue.get()
+            start = time.perf_counter()
+            try:
+                func(*args, **kwargs)
+                if on_done is not None:
+                    on_done()
+            except Exception as e:
+                logger.error(f"Background render failed for {name}: {e}")
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._pending.discard(name)
+                    self._avg_seconds += _EWMA_ALPHA * (elapsed - self._avg_seconds)
+                self._queue.task_done()
@@ -0,0 +1,176 @@
+"""
+不经过 matplotlib、直接由命盘数据生成 SVG 的绘图器。
+
+命盘是固定版式的圆盘：同心圆、宫头线、符号文字与左右两张表格，版式与 draw_natal_chart 一致
+（ASC 固定在左侧，黄经逆时针增加）。这里直接换算坐标、拼接 SVG 元素，
+一张命盘只需几毫秒，文件大小也远小于 300 dpi 的 PNG。
+
+需要 PNG 时可用 svg_to_png 栅格化，依赖可选的 cairosvg；未安装时 HAS_RASTERIZER 为 False。
+"""
+import math
+from xml.sax.saxutils import escape
+
+from aspects import ASPECTS_DEF
+from astro import aspect_symbol, layout_angles, planet_symbols, ruling_planets, zodiac_names, zodiac_signs
+from chart import Chart
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+HAS_RASTERIZER = cairosvg is not None
+
+# 画布尺寸与圆盘中心（px），SVG 以 96 dpi 为 1 英寸
+WIDTH = 1400
+HEIGHT = 900
+CENTER_X = 700
+CENTER_Y = 470
+# 半径 1.0（draw_natal_chart 中的极坐标单位）对应的像素数
+SCALE = 400
+
+FONT_FAMILY = "'Segoe UI Symbol', 'Microsoft YaHei', 'DejaVu Sans', sans-serif"
+
+
+def render_chart_svg(planet_positions, house_cusps, aspect_lines=None):
+    """以已算好的宫头生成命盘 SVG，返回字符串；参数同 render_chart_png"""
+    return render_svg(Chart.from_positions(planet_positions, house_cusps, aspect_lines))
+
+
+def render_svg(chart):
+    """由 Chart 生成命盘 SVG，返回字符串"""
+    house_cusps = chart.house_cusps.tolist()
+    longitudes = chart.longitudes.tolist()
+    offset = house_cusps[0]
+
+    def trans(angle):
+        return (angle - offset) % 360
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" '
+        f'viewBox="0 0 {WIDTH} {HEIGHT}" font-family="{FONT_FAMILY}" text-anchor="middle" '
+        f'dominant-baseline="central">',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="white"/>',
+        _text(CENTER_X, 40, "Natal Chart", 22),
+    ]
+
+    # —— 同心圆架构 ——
+    for r in (0.4, 0.5, 0.7, 0.8, 0.9):
+        parts.append(f'<circle cx="{CENTER_X}" cy="{CENTER_Y}" r="{r * SCALE:g}" fill="none" '
+                     f'stroke="slategray" stroke-width="0.7"/>')
+
+    # —— 宫头分界线与星座度分 ——
+    for cusp in house_cusps:
+        angle = trans(cusp)
+        parts.append(_line(angle, 0.7, angle, 0.85, "slategray", 1.3))
+        parts.append(_polar_text(angle, 0.8, _degree_minute(cusp), 16, background=True))
+
+    # —— 宫位编号，位于相邻宫头的中点 ——
+    for i in range(12):
+        current = trans(house_cusps[i])
+        nxt = trans(house_cusps[(i + 1) % 12])
+        if nxt < current:
+            nxt += 360
+        parts.append(_polar_text((current + nxt) / 2 % 360, 0.45, str(i + 1), 16, "maroon"))
+
+    # —— ASC、MC、IC、DSC ——
+    mc = trans(house_cusps[9])
+    for angle, label in zip((0, mc, (mc + 180) % 360, 180), ("ASC", "MC", "IC", "DSC")):
+        parts.append(_line(angle, 0.5, angle, 0.8, "darkgrey", 3.3))
+        parts.append(_polar_text(angle, 0.9, label, 15, "red"))
+
+    # —— 相位线，中点标示相位符号 ——
+    aspects = chart.aspects
+    for body1, body2, aspect_index, color in zip(aspects['body1'].tolist(), aspects['body2'].tolist(),
+                                                 aspects['aspect'].tolist(), chart.line_colors()):
+        aspect_angle = ASPECTS_DEF[aspect_index][0]
+        angle1 = trans(longitudes[body1])
+        angle2 = trans(longitudes[body2])
+        parts.append(_line(angle1, 0.4, angle2, 0.4, color, 1.3))
+        x1, y1 = _point(angle1, 0.4)
+        x2, y2 = _point(angle2, 0.4)
+        parts.append(_text((x1 + x2) / 2, (y1 + y2) / 2, aspect_symbol(aspect_angle), 18, color))
+
+    # —— 行星符号、逆行标记与黄经文本（两者的显示角度相同） ——
+    planet_rows = []
+    for planet, angle, retrograde, idx, degree_in_sign, house in zip(
+            chart.bodies, layout_angles(longitudes, offset), chart.retrograde.tolist(), chart.sign_index.tolist(),
+            chart.degree_in_sign.tolist(), chart.houses.tolist()):
+        parts.append(_polar_text(angle, 0.65, planet_symbols[planet], 21))
+        if retrograde:
+            parts.append(_polar_text(angle, 0.68, "R", 16, "red"))
+        sign = zodiac_signs[idx]
+        degree_text = f"{degree_in_sign:.1f}°"
+        parts.append(_polar_text(angle, 0.59, degree_text, 16, "royalblue"))
+        parts.append(_polar_text(angle, 0.53, sign, 16, "royalblue"))
+        planet_rows.append([planet_symbols[planet] + (" R" if retrograde else ""), f"{sign} {degree_text}", house])
+
+    # —— 左侧宫主星表格与右侧行星表格 ——
+    body_houses = dict(zip(chart.bodies, chart.houses.tolist()))
+    house_rows = []
+    for i, (cusp, idx) in enumerate(zip(house_cusps, chart.cusp_sign_index.tolist())):
+        ruling = ruling_planets[zodiac_names[idx]]
+        house_rows.append([i + 1, _degree_minute(cusp), planet_symbols.get(ruling, ruling), f"H{body_houses[ruling]}"])
+    parts.append(_table(20, 90, [60, 100, 100, 90], ["House", "Zodiac", "Ruling Planet", "H Location"], house_rows))
+    parts.append(_table(1110, 90, [80, 130, 60], ["Planet", "Zodiac", "House"], planet_rows))
+
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+
+def svg_to_png(svg, dpi=300):
+    """把 SVG 栅格化为 PNG 字节；需要可选依赖 cairosvg"""
+    if cairosvg is None:
+        raise RuntimeError("PNG rasterization requires the optional cairosvg package")
+    return cairosvg.svg2png(bytestring=svg.encode("utf-8"), dpi=dpi, scale=dpi / 96)
+
+
+def _point(angle, r):
+    """极坐标（相对 ASC 的角度，半径）-> 画布坐标：0° 在左侧，角度逆时针增加"""
+    theta = math.radians(angle)
+    return CENTER_X - r * SCALE * math.cos(theta), CENTER_Y + r * SCALE * math.sin(theta)
+
+
+def _line(angle1, r1, angle2, r2, color, width):
+    x1, y1 = _point(angle1, r1)
+    x2, y2 = _point(angle2, r2)
+    return (f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+            f'stroke="{color}" stroke-width="{width:g}"/>')
+
+
+def _text(x, y, content, size, color="black", background=False):
+    text = f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" fill="{color}">{escape(str(content))}</text>'
+    if background:
+        # 与 matplotlib 版本的半透明白底一致，按字符数估计宽度
+        width = 0.6 * size * len(str(content))
+        text = (f'<rect x="{x - width / 2:.1f}" y="{y - size * 0.6:.1f}" width="{width:.1f}" '
+                f'height="{size * 1.2:.1f}" fill="white" fill-opacity="0.7"/>' + text)
+    return text
+
+
+def _polar_text(angle, r, content, size, color="black", background=False):
+    x, y = _point(angle, r)
+    return _text(x, y, content, size, color, background)
+
+
+def _degree_minute(longitude):
+    """黄经 -> 星座符号加星座内度分，如 "♑25°30′" """
+    internal = longitude % 30
+    d = int(internal)
+    m = int(round((internal - d) * 60))
+    return f"{zodiac_signs[int(longitude // 30) % 12]}{d}°{m}′"
+
+
+def _table(x, y, widths, labels, rows, row_height=26):
+    """以矩形与文字绘制简单表格，首行为表头"""
+    parts = ['<g font-size="13">']
+    for row_index, row in enumerate([labels] + rows):
+        cell_x = x
+        cell_y = y + row_index * row_height
+        for width, value in zip(widths, row):
+            parts.append(f'<rect x="{cell_x}" y="{cell_y}" width="{width}" height="{row_height}" '
+                         f'fill="white" stroke="black" stroke-width="0.6"/>')
+            parts.append(_text(cell_x + width / 2, cell_y + row_height / 2, value, 13))
+            cell_x += width
+    parts.append('</g>')
+    return "".join(parts)
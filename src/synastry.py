@@ -0,0 +1,63 @@
+"""
+合盘计算：两张命盘之间的比较盘（synastry）与中点组合盘（composite）。
+
+两人的行星位置以一次批量星历调用算出（形状为 (2, n_bodies) 的结构化数组），
+交叉相位由 aspects.cross_aspects 以 (n_bodies, n_bodies) 的角距矩阵一次求出，
+宫位互相落入（house overlay）由 assign_houses 一次判定，均不做逐对的 Python 循环。
+组合盘取两人每颗行星沿较短弧的中点；宫头以上升点的中点为准，各宫头取同一侧的中点，保持宫头顺序。
+"""
+import numpy as np
+
+from aspects import calculate_aspects, cross_aspects
+from ephemeris import positions_to_dict
+from houses import assign_houses
+
+
+def midpoints(lon_a, lon_b):
+    """两组黄经沿较短弧的中点，支持广播；两点恰好相对时取 lon_a 逆时针方向 90° 处"""
+    lon_a = np.asarray(lon_a, dtype=float)
+    diff = (np.asarray(lon_b, dtype=float) - lon_a + 180) % 360 - 180
+    return (lon_a + diff / 2) % 360
+
+
+def composite_cusps(cusps_a, cusps_b):
+    """
+    组合盘宫头：上升点取较短弧的中点，其余宫头取两人各自相对上升点的弧长的平均值。
+    每个宫头仍是两人对应宫头的中点之一，但与上升点落在同一侧，不会因逐个取较短弧而打乱顺序
+    """
+    cusps_a = np.asarray(cusps_a, dtype=float)
+    cusps_b = np.asarray(cusps_b, dtype=float)
+    offsets = ((cusps_a - cusps_a[..., :1]) % 360 + (cusps_b - cusps_b[..., :1]) % 360) / 2
+    return (midpoints(cusps_a[..., :1], cusps_b[..., :1]) + offsets) % 360
+
+
+def synastry(positions, cusps, planets):
+    """
+    计算比较盘。
+
+    :param positions: 形状为 (2, n_bodies) 的结构化数组（PositionEngine.calc 格式）
+    :param cusps: 形状为 (2, 12) 的宫头黄经
+    :param planets: 天体名称列表，顺序与 positions 的列一致
+    :return: (aspects, overlays)：aspects 为 (一号盘天体, 二号盘天体, 颜色, 角度差, 相位角) 列表；
+             overlays 为两个 {天体: 宫位} 字典，分别是一号盘行星落入二号盘的宫位及反之
+    """
+    lons = positions['lon']
+    aspects = cross_aspects(lons[0], lons[1], planets, planets)
+    # 各自的行星对照对方的宫头：第 0 行为一号盘行星在二号盘中的宫位
+    houses = assign_houses(lons, cusps[::-1])
+    overlays = [dict(zip(planets, row)) for row in houses.tolist()]
+    return aspects, overlays
+
+
+def composite(positions, cusps, planets):
+    """
+    计算中点组合盘。
+
+    :return: (组合盘位置字典（格式同 get_planet_positions）, 组合盘宫头, 组合盘内部相位)；
+             速度取两人的平均值，逆行据此判断
+    """
+    composite_row = np.zeros(len(planets), dtype=positions.dtype)
+    composite_row['lon'] = midpoints(positions['lon'][0], positions['lon'][1])
+    composite_row['speed'] = positions['speed'].mean(axis=0)
+    composite_positions = positions_to_dict(composite_row, planets)
+    return composite_positions, composite_cusps(cusps[0], cusps[1]), calculate_aspects(composite_positions)
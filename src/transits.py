@@ -0,0 +1,96 @@
+"""
+行运时间序列：计算一段时间内按固定步长取样的行星位置。
+
+整个时间网格按 chunk_steps 分块生成，每块一次批量计算（有 Chebyshev 表时走多项式求值，
+否则走 PositionEngine），内存占用只取决于块大小，与时间范围无关；例如一年、每分钟一个点
+（约 52.6 万个时刻）也可以边算边输出。
+
+输出格式：
+  - 列式 NDJSON：首行为元数据，其后每块一行 {"offset", "jd", "lon": {天体: [...]}, "speed": {...}}
+  - NPY：一维结构化数组，字段 jd、lon[n_bodies]、speed[n_bodies]，可直接用 np.load 读取
+"""
+import io
+import json
+
+import numpy as np
+
+from ephemeris import POSITION_DTYPE, planet_codes
+from astro import get_positions_with_backend
+
+# 每块的时刻数
+DEFAULT_CHUNK_STEPS = 8192
+
+
+def transit_count(start_jd, end_jd, step_days):
+    """[start_jd, end_jd) 内按 step_days 取样的时刻数"""
+    if step_days <= 0:
+        raise ValueError("step must be positive")
+    return max(0, int(np.ceil((end_jd - start_jd) / step_days)))
+
+
+def iter_transits(start_jd, end_jd, step_days, chunk_steps=DEFAULT_CHUNK_STEPS):
+    """
+    按块生成行运数据，每块产出 (offset, jds, positions, backend)：
+      offset 为该块第一个时刻在整个序列中的序号；
+      positions 为 (len(jds), n_bodies) 的结构化数组，天体顺序同 planet_codes
+    时刻由 start_jd + 序号 × step_days 直接算出，不累加步长，避免浮点误差积累
+    """
+    count = transit_count(start_jd, end_jd, step_days)
+    for offset in range(0, count, chunk_steps):
+        jds = start_jd + np.arange(offset, min(offset + chunk_steps, count)) * step_days
+        positions, backend = get_positions_with_backend(jds)
+        yield offset, jds, positions, backend
+
+
+def transits(start_jd, end_jd, step_days):
+    """一次返回整个序列 (jds, positions)，适合范围较小的调用"""
+    jds = []
+    positions = []
+    for _, chunk_jds, chunk_positions, _ in iter_transits(start_jd, end_jd, step_days):
+        jds.append(chunk_jds)
+        positions.append(chunk_positions)
+    if not jds:
+        return np.empty(0), np.empty((0, len(planet_codes)), dtype=POSITION_DTYPE)
+    return np.concatenate(jds), np.concatenate(positions)
+
+
+def transit_dtype(n_bodies=len(planet_codes)):
+    """NPY 输出的结构化数组类型"""
+    return np.dtype([('jd', 'f8'), ('lon', 'f8', (n_bodies,)), ('speed', 'f8', (n_bodies,))])
+
+
+def iter_json_lines(start_jd, end_jd, step_days, chunk_steps=DEFAULT_CHUNK_STEPS):
+    """生成列式 NDJSON：首行为元数据，其后每块一行"""
+    bodies = list(planet_codes)
+    yield json.dumps({
+        "bodies": bodies,
+        "start_jd": start_jd,
+        "step_days": step_days,
+        "count": transit_count(start_jd, end_jd, step_days)
+    }) + "\n"
+    for offset, jds, positions, backend in iter_transits(start_jd, end_jd, step_days, chunk_steps):
+        yield json.dumps({
+            "offset": offset,
+            "ephemeris_backend": backend,
+            "jd": jds.tolist(),
+            "lon": dict(zip(bodies, positions['lon'].T.tolist())),
+            "speed": dict(zip(bodies, positions['speed'].T.tolist()))
+        }) + "\n"
+
+
+def iter_npy_bytes(start_jd, end_jd, step_days, chunk_steps=DEFAULT_CHUNK_STEPS):
+    """生成 .npy 文件内容：先输出包含总长度的文件头，再逐块输出数据"""
+    dtype = transit_dtype()
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {
+        "descr": np.lib.format.dtype_to_descr(dtype),
+        "fortran_order": False,
+        "shape": (transit_count(start_jd, end_jd, step_days),)
+    })
+    yield header.getvalue()
+    for _, jds, positions, _ in iter_transits(start_jd, end_jd, step_days, chunk_steps):
+        records = np.empty(len(jds), dtype=dtype)
+        records['jd'] = jds
+        records['lon'] = positions['lon']
+        records['speed'] = positions['speed']
+        yield records.tobytes()
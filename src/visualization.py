@@ -1,159 +1,246 @@
+import io
 import os
+import threading
+
 import numpy as np
-import matplotlib.pyplot as plt
-import swisseph as swe  # 需要 pyswisseph 用来计算天体位置与宫头
+from matplotlib.figure import Figure
 from matplotlib.patches import Circle
+from matplotlib.transforms import Bbox
+from PIL import Image
 from matplotlib import rcParams
 
+# 计算与符号表在 astro 中（不依赖 matplotlib），这里一并导出，兼容原有的导入方式
+from astro import (  # noqa: F401
+    ASPECT_SYMBOLS, aspect_symbol, calculate_house_cusps, get_house, get_julian_day_with_time,
+    get_planet_positions, get_positions_array, get_positions_with_backend, get_zodiac_sign,
+    julian_day_to_datetime, layout_angles, layout_planets, planet_codes, planet_symbols, positions_to_dict,
+    ruling_planets, zodiac_names, zodiac_signs
+)
+from aspects import ASPECTS_DEF, calculate_aspects  # noqa: F401
+from chart import Chart
+from houses import DEFAULT_HOUSE_SYSTEM
+from metrics import stage
+
 rcParams['font.family'] = 'sans-serif'
 # 先用支持特殊符号的字体，再用支持中文的字体作后备
 rcParams['font.sans-serif'] = ['Segoe UI Symbol', 'Microsoft YaHei', 'DejaVu Sans', 'Microsoft JhengHei UI']
 rcParams['axes.unicode_minus'] = False
 
-# 依照 12 个星座的顺序（此处定义 0-30° 为 Aries，即白羊座），
-# 这里采用常见的黄道顺序：从 Aries 开始
-zodiac_signs = ['\u2648', '\u2649', '\u264A', '\u264B', '\u264C', '\u264D',
-                '\u264E', '\u264F', '\u2650', '\u2651', '\u2652', '\u2653']
-zodiac_names = ['Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo',
-                'Libra', 'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces']
-
-# 宫主星对应（仅作参考，实际运用可扩充）
-ruling_planets = {
-    'Aquarius': 'Uranus', 'Pisces': 'Neptune', 'Aries': 'Mars', 'Taurus': 'Venus',
-    'Gemini': 'Mercury', 'Cancer': 'Moon', 'Leo': 'Sun', 'Virgo': 'Mercury',
-    'Libra': 'Venus', 'Scorpio': 'Pluto', 'Sagittarius': 'Jupiter', 'Capricorn': 'Saturn'
-}
-
-# 行星符号
-planet_symbols = {
-    "Sun": "\u2609", "Moon": "\u263D", "Mercury": "\u263F",
-    "Venus": "\u2640", "Mars": "\u2642", "Jupiter": "\u2643",
-    "Saturn": "\u2644", "Uranus": "\u2645", "Neptune": "\u2646", "Pluto": "\u2647"
-}
-
-# 将行星名称与 swisseph 常数对应
-planet_codes = {
-    "Sun": swe.SUN,
-    "Moon": swe.MOON,
-    "Mercury": swe.MERCURY,
-    "Venus": swe.VENUS,
-    "Mars": swe.MARS,
-    "Jupiter": swe.JUPITER,
-    "Saturn": swe.SATURN,
-    "Uranus": swe.URANUS,
-    "Neptune": swe.NEPTUNE,
-    "Pluto": swe.PLUTO
-}
-
-
-def get_julian_day_with_time(year, month, day, hour, minute, second, timezone_offset):
+# 保存图片时裁剪的范围（英寸）：版式固定，取多张命盘 bbox_inches='tight' 结果的并集再留 0.1 英寸边距。
+# 使用固定范围可省去 'tight' 为计算边界额外进行的一次完整绘制
+CHART_BBOX = Bbox.from_extents(-0.09, 0.8, 13.82, 10.06)
+
+# render_chart_image 支持的图片格式；png8 为量化到 256 色调色板的 PNG，体积约为普通 PNG 的四分之一
+IMAGE_FORMATS = ("png", "png8", "webp")
+WEBP_QUALITY = 80
+
+# 每个线程各自缓存一份命盘底图（Figure 对象不能跨线程共享）
+_chart_templates = threading.local()
+
+
+def _draw_chart_background(fig):
     """
-    根据客户端输入的当地出生时间及时区偏移量，
-    将当地时间转换为 UT 时间，并利用 swisseph 计算 Julian Day。
+    在空白 Figure 上绘制与输入无关的图层：极坐标轴、同心圆架构、样式与标题，返回极坐标轴
     """
-    local_decimal = hour + minute / 60 + second / 3600
-    ut_hour = local_decimal - timezone_offset
-    return swe.julday(year, month, day, ut_hour)
+    ax = fig.add_subplot(projection='polar')
+    ax.set_theta_zero_location('W')
+    ax.set_theta_direction(1)
 
+    outer_r = 0.9
 
-def get_planet_positions(julian_day):
-    """
-    根据给定的 Julian Day，自动计算主要行星的黄道经度（单位：°）及逆行状态。
-    使用 FLG_SPEED 标记获取速度信息，若黄道速度为负则视为逆行。
+    # 绘制同心圆架构（例如从 0.4 到 outer_r）
+    for r in [0.4, 0.5, 0.7, 0.8, outer_r]:
+        ax.add_patch(Circle((0, 0), r, transform=ax.transData._b,
+                            color='slategray', fill=False, linewidth=0.5))
 
-    返回格式:
-      { 'Sun': {'position': 123.45, 'retrograde': False, 'speed': 0.12}, ... }
-    """
-    positions = {}
-    for planet, code in planet_codes.items():
-        result = swe.calc(julian_day, code, swe.FLG_SWIEPH | swe.FLG_SPEED)
-        pos = result[0][0] % 360
-        speed = result[0][3] if len(result[0]) > 3 else 0
-        retrograde = speed < 0
-        positions[planet] = {'position': pos, 'retrograde': retrograde, 'speed': speed}
-    return positions
+    ax.set_yticks([])
+    ax.set_xticks([])
+    ax.set_title("Natal Chart", va='bottom', fontsize=16, pad=30)
+    # 固定半径范围（即宫头线与 ASC 线自动缩放后的结果），复用底图时不受上一张命盘影响
+    ax.set_ylim(0, 0.8725)
+    return ax
 
 
-def get_zodiac_sign(degree):
+def _get_chart_template():
     """
-    返回某个度数所属的星座及该星座内的度数，格式如 "Aries 10.25°"
+    取得当前线程缓存的命盘底图，首次调用时构建。
+    返回 (fig, ax, 底图图元集合)，绘制完成后用 _clear_chart_layers 移除底图以外的图元
     """
-    index = int(degree // 30) % 12
-    return f"{zodiac_names[index]} {degree % 30:.2f}°"
+    template = getattr(_chart_templates, 'template', None)
+    if template is None:
+        fig = Figure(figsize=(14, 10))
+        ax = _draw_chart_background(fig)
+        template = (fig, ax, set(ax.get_children()))
+        _chart_templates.template = template
+    return template
 
 
-def calculate_house_cusps(julian_day, latitude, longitude):
-    swe.set_topo(longitude, latitude, 0)
-    # 使用 "P" 表示 Placidus 宫位系统（以字节串形式）
-    cusps, ascmc = swe.houses(julian_day, latitude, longitude, b"P")
-    return cusps
+def _clear_chart_layers(ax, base_artists):
+    """移除本次命盘绘制的宫头、行星、相位线及表格，使底图可供下一张命盘复用"""
+    for artist in ax.get_children():
+        if artist not in base_artists:
+            artist.remove()
 
 
-def get_house(degree, house_cusps):
-    """
-    根据行星的度数与宫头，判断该行星所在的宫位
-    """
-    for i in range(12):
-        if i == 11:
-            if house_cusps[i] <= degree or degree < house_cusps[0]:
-                return i + 1
-        else:
-            if house_cusps[i] <= degree < house_cusps[i + 1]:
-                return i + 1
-    return 12
+def draw_natal_chart(ax, planet_positions, house_cusps, aspect_lines=None):
+    """与 draw_chart 相同，参数为行星字典、宫头与相位元组（aspect_lines 为 None 时自动计算）"""
+    draw_chart(ax, Chart.from_positions(planet_positions, house_cusps, aspect_lines))
 
 
-def calculate_aspects(planet_positions):
+def draw_chart(ax, chart):
     """
-    根据行星间角度，自动判断主要及辅助相位，并返回一个包含
-    (行星1, 行星2, 相位线颜色, 实际角度差, 标准相位角) 的列表。
-    新增相位包括：
-      - 半六分相：30° (orb 3°, 颜色 "magenta")
-      - 半方相：45° (orb 3°, 颜色 "cyan")
-      - 七分相：约51.43° (orb 3°, 颜色 "olive")
-      - 五分相：72° (orb 3°, 颜色 "teal")
-      - 补充半方相：135° (orb 3°, 颜色 "pink")
-      - 双五分相：144° (orb 3°, 颜色 "brown")
-      - 欠刑相：150° (orb 3°, 颜色 "gray")
+    绘制步骤：在已有底图的极坐标轴上绘制随输入变化的图层
+    （宫头、ASC/MC 线、相位线、行星及两侧表格），每个图元只绘制一次。
+    星座、星座内度数与宫位都直接取自 Chart 中已算好的数组
     """
-    aspects_def = [
-        (0, 8, 'purple'),       # 合相
-        (30, 3, 'magenta'),     # 半六分相
-        (45, 3, 'cyan'),        # 半方相
-        (51.43, 3, 'olive'),     # 七分相
-        (60, 6, 'green'),       # 六分相
-        (72, 3, 'teal'),        # 五分相
-        (90, 6, 'blue'),        # 四分相（宫刑）
-        (120, 6, 'orange'),     # 拱相
-        (135, 3, 'pink'),       # Sesquisquare (135°)
-        (144, 3, 'brown'),      # 双五分相
-        (150, 3, 'gray'),       # 欠刑相/Quincunx
-        (180, 8, 'red')         # 对分相
-    ]
-    aspect_lines = []
-    planets = list(planet_positions.keys())
-    for i in range(len(planets)):
-        for j in range(i + 1, len(planets)):
-            pos1 = planet_positions[planets[i]]['position']
-            pos2 = planet_positions[planets[j]]['position']
-            diff = abs(pos1 - pos2) % 360
-            if diff > 180:
-                diff = 360 - diff
-            best = None
-            best_error = None
-            for aspect_angle, orb, color in aspects_def:
-                error = abs(diff - aspect_angle)
-                if error <= orb:
-                    if best_error is None or error < best_error:
-                        best = (aspect_angle, color)
-                        best_error = error
-            if best is not None:
-                aspect_angle, color = best
-                aspect_lines.append((planets[i], planets[j], color, diff, aspect_angle))
-    return aspect_lines
-
-
-def plot_natal_chart(planet_positions, julian_day, latitude, longitude, aspect_lines=None, output_path=None, show=True):
+    house_cusps = chart.house_cusps.tolist()
+    cusp_signs = chart.cusp_sign_index.tolist()
+    longitudes = chart.longitudes.tolist()
+
+    # 设定偏移量，将 ASC 固定为 0°，以第一个宫头为基准
+    offset = house_cusps[0]
+
+    # 定义辅助函数：将角度转换为相对于 ASC 的角度（单位：度）
+    def trans(angle):
+        return (angle - offset) % 360
+
+    # 计算主要点（转换后的角度）
+    ASC = trans(house_cusps[0])  # 应为 0
+    MC  = trans(house_cusps[9])
+    DSC = (ASC + 180) % 360
+    IC  = (MC + 180) % 360
+
+    outer_r = 0.9
+
+    # —— 绘制外圈星座符号及分界线 ——
+    # 在每个宫头线上显示对应星座符号及宫位起始点的黄经转换为星座内度分格式
+    for cusp_current, idx in zip(house_cusps, cusp_signs):
+        theta_boundary = np.deg2rad(trans(cusp_current))
+        ax.plot([theta_boundary, theta_boundary], [outer_r - 0.2, outer_r - 0.05],
+                color='slategray', linewidth=1)
+        # 计算内部度数：宫位起始点在所属星座内的度数 = cusp_current - (idx*30)
+        internal = cusp_current - (idx * 30)
+        d = int(internal)
+        m = int(round((internal - d) * 60))
+        zodiac_text = f"{zodiac_signs[idx]}{d}°{m}′"
+        ax.text(theta_boundary, outer_r - 0.10, zodiac_text,
+                ha='center', va='center', fontsize=12,
+                rotation=0, rotation_mode='anchor',
+                bbox=dict(facecolor='white', edgecolor='none', alpha=0.7))
+
+    # —— 绘制宫头标记 ——
+    # 显示宫位编号（1～12），位置为当前宫头与下一宫头之间的中点
+    for i in range(12):
+        current = trans(house_cusps[i])
+        nxt = trans(house_cusps[(i + 1) % 12])
+        if nxt < current:
+            nxt += 360
+        mid_deg = (current + nxt) / 2.0 % 360
+        theta_mid = np.deg2rad(mid_deg)
+        ax.text(theta_mid, outer_r - 0.45, f"{i + 1}",
+                ha='center', va='center', fontsize=12, color='maroon')
+
+    # —— 绘制 ASC、MC、IC、DSC 线及标示 ——
+    for angle, label in zip([ASC, MC, IC, DSC], ["ASC", "MC", "IC", "DSC"]):
+        theta = np.deg2rad(angle)
+        ax.plot([theta, theta], [0.5, 0.8], color='darkgrey', linestyle='-', linewidth=2.5)
+        ax.text(theta, 0.9, label, ha='center', va='center', fontsize=11, color='red')
+
+    # —— 绘制行星间相位线及标示精确相位符号 ——
+    aspects = chart.aspects
+    for body1, body2, aspect_index, color in zip(aspects['body1'].tolist(), aspects['body2'].tolist(),
+                                                 aspects['aspect'].tolist(), chart.line_colors()):
+        aspect_angle = ASPECTS_DEF[aspect_index][0]
+        theta1 = np.deg2rad(trans(longitudes[body1]))
+        theta2 = np.deg2rad(trans(longitudes[body2]))
+        ax.plot([theta1, theta2], [0.4, 0.4], color=color, linestyle='-', linewidth=1)
+        # 计算在半径为 0.4 处两个端点的笛卡尔坐标，并取中点
+        r_line = 0.4
+        x1, y1 = r_line * np.cos(theta1), r_line * np.sin(theta1)
+        x2, y2 = r_line * np.cos(theta2), r_line * np.sin(theta2)
+        x_mid = (x1 + x2) / 2.0
+        y_mid = (y1 + y2) / 2.0
+        r_mid = np.sqrt(x_mid ** 2 + y_mid ** 2)
+        theta_mid = np.arctan2(y_mid, x_mid)
+        if theta_mid < 0:
+            theta_mid += 2 * np.pi
+        symbol = aspect_symbol(aspect_angle)
+        ax.text(theta_mid, r_mid, symbol, ha='center', va='center', fontsize=14, color=color)
+
+    # —— 绘制行星位置、符号及逆行标记与黄经文本 ——
+    planet_data = []
+    for planet, angle, retrograde, idx, degree_in_sign, house_val in zip(
+            chart.bodies, layout_angles(longitudes, offset), chart.retrograde.tolist(), chart.sign_index.tolist(),
+            chart.degree_in_sign.tolist(), chart.houses.tolist()):
+        # 行星符号与黄经文本的显示角度相同
+        theta_planet = theta_text = np.deg2rad(angle)
+
+        # 绘制行星符号（放在半径 0.65 处）
+        ax.text(theta_planet, 0.65, planet_symbols[planet],
+                ha='center', va='center', fontsize=16, color='black')
+        if retrograde:
+            ax.text(theta_planet, 0.68, "R", ha='center', va='center', fontsize=12, color='red')
+
+        # 构造黄经文本（分离星座符号与度数）
+        zodiac_text = zodiac_signs[idx]
+        degree_text = f"{degree_in_sign:.1f}°"
+
+        # 绘制黄经文本
+        # 此处保持 rotation=0，使文本保持水平（如果希望依弧线排列，可自行修改 rotation 计算）
+        ax.text(theta_text, 0.59, degree_text,
+                ha='center', va='center', fontsize=12, color='royalblue',
+                rotation=0, rotation_mode='anchor')
+        ax.text(theta_text, 0.53, zodiac_text,
+                ha='center', va='center', fontsize=12, color='royalblue',
+                rotation=0, rotation_mode='anchor')
+
+        p_symbol = planet_symbols[planet] + (" R" if retrograde else "")
+        planet_data.append([p_symbol, f"{zodiac_text} {degree_text}", house_val])
+
+    # —— 绘制左侧宫主星表格 ——
+    # 表格内容：House, Zodiac (House start), Ruling Planet, H Location
+    house_table_data = []
+    body_houses = dict(zip(chart.bodies, chart.houses.tolist()))
+    for i, (cusp, idx) in enumerate(zip(house_cusps, cusp_signs)):
+        house_num = i + 1
+        # 计算宫头内部度数：内部度数 = cusp - (idx*30)
+        internal = cusp - (idx * 30)
+        d = int(internal)
+        m = int(round((internal - d) * 60))
+        zodiac_text = f"{zodiac_signs[idx]}{d}°{m}′"
+        zodiac_name = zodiac_names[idx]
+        ruling = ruling_planets[zodiac_name]
+        ruling_symbol = planet_symbols[ruling] if ruling in planet_symbols else ruling
+        flight_house = body_houses[ruling]
+        fei_text = f"H{flight_house}"
+        house_table_data.append([house_num, zodiac_text, ruling_symbol, fei_text])
+
+    left_column_labels = ["House", "Zodiac", "Ruling Planet", "H Location"]
+    table_left = ax.table(
+        cellText=house_table_data,
+        colLabels=left_column_labels,
+        loc='left',
+        cellLoc='center',
+        bbox=[-0.43, 0.65, 0.45, 0.5]
+    )
+    table_left.auto_set_font_size(False)
+    table_left.set_fontsize(10)
+
+    # —— 绘制右侧行星信息表格 ——
+    column_labels = ["Planet", "Zodiac", "House"]
+    table = ax.table(
+        cellText=planet_data,
+        colLabels=column_labels,
+        loc='right',
+        cellLoc='center',
+        bbox=[1.0, 0.65, 0.35, 0.5]
+    )
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+
+
+def plot_natal_chart(planet_positions, julian_day, latitude, longitude, aspect_lines=None, output_path=None, show=True,
+                     house_system=DEFAULT_HOUSE_SYSTEM, dpi=300):
     """
     绘制命盘图表，所有信息都显示在主圆内：
       - 外圈星座符号及分界线：根据实际宫头数据绘制，在每个宫头线上显示对应星座符号及宫位起始点的黄经，
@@ -165,225 +252,70 @@ def plot_natal_chart(planet_positions, julian_day, latitude, longitude, aspect_l
       - 右侧信息表格（行星以符号、星座及度分、宫位）
       - 左侧宫主星表格（House, Zodiac (House start), Ruling Planet, H Location）
     """
-    global planet_data
+    base_artists = None
     try:
-        fig, ax = plt.subplots(figsize=(14, 10), subplot_kw={'projection': 'polar'})
-        ax.set_theta_zero_location('W')
-        ax.set_theta_direction(1)
-
-        # 计算宫头（Placidus 系统返回的 12 个宫头黄经值）
-        house_cusps = calculate_house_cusps(julian_day, latitude, longitude)
-        # 设定偏移量，将 ASC 固定为 0°，以第一个宫头为基准
-        offset = house_cusps[0]
-
-        # 定义辅助函数：将角度转换为相对于 ASC 的角度（单位：度）
-        def trans(angle):
-            return (angle - offset) % 360
-
-        # 计算主要点（转换后的角度）
-        ASC = trans(house_cusps[0])  # 应为 0
-        MC  = trans(house_cusps[9])
-        DSC = (ASC + 180) % 360
-        IC  = (MC + 180) % 360
-
-        outer_r = 0.9
-
-        # 绘制同心圆架构（例如从 0.4 到 outer_r）
-        for r in [0.4, 0.5, 0.7, 0.8, outer_r]:
-            ax.add_patch(Circle((0, 0), r, transform=ax.transData._b,
-                                color='slategray', fill=False, linewidth=0.5))
-
-        # —— 绘制外圈星座符号及分界线 ——
-        # 在每个宫头线上显示对应星座符号及宫位起始点的黄经转换为星座内度分格式
-        for i in range(12):
-            cusp_current = house_cusps[i]
-            theta_boundary = np.deg2rad(trans(cusp_current))
-            ax.plot([theta_boundary, theta_boundary], [outer_r - 0.2, outer_r - 0.05],
-                    color='slategray', linewidth=1)
-            idx = int(cusp_current // 30) % 12
-            # 计算内部度数：宫位起始点在所属星座内的度数 = cusp_current - (idx*30)
-            internal = cusp_current - (idx * 30)
-            d = int(internal)
-            m = int(round((internal - d) * 60))
-            zodiac_text = f"{zodiac_signs[idx]}{d}°{m}′"
-            ax.text(theta_boundary, outer_r - 0.10, zodiac_text,
-                    ha='center', va='center', fontsize=12,
-                    rotation=0, rotation_mode='anchor',
-                    bbox=dict(facecolor='white', edgecolor='none', alpha=0.7))
-
-        # —— 绘制宫头标记 ——
-        # 显示宫位编号（1～12），位置为当前宫头与下一宫头之间的中点
-        for i in range(12):
-            cusp_current = house_cusps[i]
-            cusp_next = house_cusps[(i + 1) % 12]
-            current = trans(cusp_current)
-            nxt = trans(cusp_next)
-            if nxt < current:
-                nxt += 360
-            mid_deg = (current + nxt) / 2.0 % 360
-            theta_mid = np.deg2rad(mid_deg)
-            ax.text(theta_mid, outer_r - 0.45, f"{i + 1}",
-                    ha='center', va='center', fontsize=12, color='maroon')
-
-        # —— 绘制 ASC、MC、IC、DSC 线及标示 ——
-        for angle, label in zip([ASC, MC, IC, DSC], ["ASC", "MC", "IC", "DSC"]):
-            theta = np.deg2rad(angle)
-            ax.plot([theta, theta], [0.5, 0.8], color='darkgrey', linestyle='-', linewidth=2.5)
-            ax.text(theta, 0.9, label, ha='center', va='center', fontsize=11, color='red')
-
-        # —— 绘制行星间相位线及标示精确相位符号 ——
-        # 定义相位符号映射字典
-        aspect_symbol_map = {
-            0: "*",  # 合相
-            30: "◦",  # 半六分相
-            45: "▢",  # 半方相
-            51.43: "✶",  # 七分相
-            60: "∿",  # 六分相
-            72: "⌘",  # 五分相
-            90: "□",  # 四分相
-            120: "△",  # 拱相
-            135: "⊟",  # Sesquisquare
-            144: "✹",  # 双五分相
-            150: "⁑",  # 欠刑相 / Quincunx
-            180: "⊥"  # 对分相
-        }
-        if aspect_lines is None:
-            aspect_lines = calculate_aspects(planet_positions)
-        for aspect_data in aspect_lines:
-            if len(aspect_data) == 4:
-                planet1, planet2, color, diff = aspect_data
-                aspect_angle = 0
-            else:
-                planet1, planet2, color, diff, aspect_angle = aspect_data
-            pos1 = planet_positions[planet1]['position']
-            pos2 = planet_positions[planet2]['position']
-            theta1 = np.deg2rad(trans(pos1))
-            theta2 = np.deg2rad(trans(pos2))
-            ax.plot([theta1, theta2], [0.4, 0.4], color=color, linestyle='-', linewidth=1)
-            # 计算在半径为 0.4 处两个端点的笛卡尔坐标，并取中点
-            r_line = 0.4
-            x1, y1 = r_line * np.cos(theta1), r_line * np.sin(theta1)
-            x2, y2 = r_line * np.cos(theta2), r_line * np.sin(theta2)
-            x_mid = (x1 + x2) / 2.0
-            y_mid = (y1 + y2) / 2.0
-            r_mid = np.sqrt(x_mid ** 2 + y_mid ** 2)
-            theta_mid = np.arctan2(y_mid, x_mid)
-            if theta_mid < 0:
-                theta_mid += 2 * np.pi
-            # 采用“最接近法”取得相位标准角的映射
-            rounded_aspect = min(aspect_symbol_map.keys(), key=lambda x: abs(x - aspect_angle))
-            symbol = aspect_symbol_map[rounded_aspect]
-            ax.text(theta_mid, r_mid, symbol, ha='center', va='center', fontsize=14, color=color)
-
-            # —— 绘制行星位置、符号及逆行标记与黄经文本 ——
-            planet_data = []
-            used_planet_angles = []  # 用于记录行星符号显示的角度（单位：度），避免重叠
-            used_text_angles = []  # 用于记录黄经文本显示的角度（单位：度），避免重叠
-            for planet, data in planet_positions.items():
-                pos = data['position']
-                retrograde = data['retrograde']
-                # 计算基准角度（相对于 ASC），单位为度
-                base_angle_deg = trans(pos)
-
-                # 避免行星符号重叠：调整行星符号显示角度
-                planet_angle_deg = base_angle_deg
-                threshold = 3  # 阈值设为 3 度（可根据需要调整）
-                while any(abs(planet_angle_deg - used) < threshold for used in used_planet_angles):
-                    planet_angle_deg = (planet_angle_deg + threshold) % 360
-                used_planet_angles.append(planet_angle_deg)
-                theta_planet = np.deg2rad(planet_angle_deg)
-
-                # 绘制行星符号（放在半径 0.65 处）
-                ax.text(theta_planet, 0.65, planet_symbols[planet],
-                        ha='center', va='center', fontsize=16, color='black')
-                if retrograde:
-                    ax.text(theta_planet, 0.68, "R", ha='center', va='center', fontsize=12, color='red')
-
-                # 计算行星黄经转换为该星座内的度数
-                idx = int(pos // 30) % 12
-                degree_in_sign = pos % 30
-
-                # 避免黄经文本重叠：调整文本显示角度
-                text_angle_deg = base_angle_deg
-                while any(abs(text_angle_deg - used) < threshold for used in used_text_angles):
-                    text_angle_deg = (text_angle_deg + threshold) % 360
-                used_text_angles.append(text_angle_deg)
-                theta_text = np.deg2rad(text_angle_deg)
-
-                # 构造黄经文本（分离星座符号与度数），原来的设置：
-                # zodiac_text = zodiac_signs[idx]
-                # degree_text = f"{degree_in_sign:.1f}°"
-                # 我们保持原有文本内容不变
-                zodiac_text = zodiac_signs[idx]
-                degree_text = f"{degree_in_sign:.1f}°"
-
-                # 绘制黄经文本
-                # 此处保持 rotation=0，使文本保持水平（如果希望依弧线排列，可自行修改 rotation 计算）
-                ax.text(theta_text, 0.59, degree_text,
-                        ha='center', va='center', fontsize=12, color='royalblue',
-                        rotation=0, rotation_mode='anchor')
-                ax.text(theta_text, 0.53, zodiac_text,
-                        ha='center', va='center', fontsize=12, color='royalblue',
-                        rotation=0, rotation_mode='anchor')
-
-                house_val = get_house(pos, house_cusps)
-                p_symbol = planet_symbols[planet] + (" R" if retrograde else "")
-                planet_data.append([p_symbol, f"{zodiac_text} {degree_text}", house_val])
-
-        # —— 绘制左侧宫主星表格 ——
-        # 表格内容：House, Zodiac (House start), Ruling Planet, H Location
-        house_table_data = []
-        for i, cusp in enumerate(house_cusps):
-            house_num = i + 1
-            idx = int(cusp // 30) % 12
-            # 计算宫头内部度数：内部度数 = cusp - (idx*30)
-            internal = cusp - (idx * 30)
-            d = int(internal)
-            m = int(round((internal - d) * 60))
-            zodiac_text = f"{zodiac_signs[idx]}{d}°{m}′"
-            zodiac_name = zodiac_names[idx]
-            ruling = ruling_planets[zodiac_name]
-            ruling_symbol = planet_symbols[ruling] if ruling in planet_symbols else ruling
-            flight_house = get_house(planet_positions[ruling]["position"], house_cusps)
-            fei_text = f"H{flight_house}"
-            house_table_data.append([house_num, zodiac_text, ruling_symbol, fei_text])
-
-        left_column_labels = ["House", "Zodiac", "Ruling Planet", "H Location"]
-        table_left = plt.table(
-            cellText=house_table_data,
-            colLabels=left_column_labels,
-            loc='left',
-            cellLoc='center',
-            bbox=[-0.43, 0.65, 0.45, 0.5]
-        )
-        table_left.auto_set_font_size(False)
-        table_left.set_fontsize(10)
-
-        # —— 绘制右侧行星信息表格 ——
-        column_labels = ["Planet", "Zodiac", "House"]
-        table = plt.table(
-            cellText=planet_data,
-            colLabels=column_labels,
-            loc='right',
-            cellLoc='center',
-            bbox=[1.0, 0.65, 0.35, 0.5]
-        )
-        table.auto_set_font_size(False)
-        table.set_fontsize(10)
-
-        ax.set_yticks([])
-        ax.set_xticks([])
-        ax.set_title("Natal Chart", va='bottom', fontsize=16, pad=30)
+        if show:
+            # 交互显示时通过 pyplot 新建图表；pyplot 会加载 GUI 后端，只在这里导入
+            import matplotlib.pyplot as plt
+            fig = plt.figure(figsize=(14, 10))
+            ax = _draw_chart_background(fig)
+        else:
+            # 只保存图片时复用底图，只绘制随输入变化的图层
+            fig, ax, base_artists = _get_chart_template()
+
+        # 计算宫头（默认为 Placidus 系统，返回 12 个宫头黄经值）
+        house_cusps = calculate_house_cusps(julian_day, latitude, longitude, house_system)
+        draw_natal_chart(ax, planet_positions, house_cusps, aspect_lines)
 
         if output_path:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
+            fig.savefig(output_path, dpi=dpi, bbox_inches=CHART_BBOX)
         if show:
             plt.show()
-        else:
-            plt.close(fig)
     except Exception as e:
         print(f"An error occurred while plotting the natal chart: {e}")
+    finally:
+        if base_artists is not None:
+            _clear_chart_layers(ax, base_artists)
+
+
+def render_chart_png(planet_positions, house_cusps, aspect_lines=None, dpi=300):
+    """
+    以已算好的宫头绘制命盘，直接返回 PNG 字节，不写入文件。
+    只依赖可序列化的输入（行星字典、宫头列表、相位列表），供多进程绘图池调用
+    """
+    return render_chart_image(planet_positions, house_cusps, aspect_lines, dpi)
+
+
+def render_chart_image(planet_positions, house_cusps, aspect_lines=None, dpi=300, image_format="png"):
+    """与 render_chart_png 相同，image_format 可为 IMAGE_FORMATS 中的任一格式"""
+    return render_chart(Chart.from_positions(planet_positions, house_cusps, aspect_lines), dpi, image_format)
+
+
+def render_chart(chart, dpi=300, image_format="png"):
+    """以 Chart 绘制命盘，返回 image_format（IMAGE_FORMATS 之一）格式的图片字节"""
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    fig, ax, base_artists = _get_chart_template()
+    try:
+        # draw 只创建图元，真正的栅格化与编码都发生在 savefig 中
+        with stage("draw"):
+            draw_chart(ax, chart)
+        buffer = io.BytesIO()
+        with stage("savefig"):
+            if image_format == "webp":
+                fig.savefig(buffer, format='webp', dpi=dpi, bbox_inches=CHART_BBOX,
+                            pil_kwargs={"quality": WEBP_QUALITY})
+            else:
+                fig.savefig(buffer, format='png', dpi=dpi, bbox_inches=CHART_BBOX)
+    finally:
+        _clear_chart_layers(ax, base_artists)
+    if image_format == "png8":
+        with stage("quantize"):
+            image = Image.open(buffer).convert("RGB").quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+            buffer = io.BytesIO()
+            image.save(buffer, format='PNG')
+    return buffer.getvalue()
 
 
 # -------------------------
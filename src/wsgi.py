@@ -0,0 +1,51 @@
+"""
+生产环境入口。
+
+gunicorn（Linux，见仓库根目录的 gunicorn.conf.py）：
+  gunicorn wsgi:application
+配置了 preload_app，本模块在主进程中导入一次：载入 matplotlib 与字体、设置星历路径、
+读取 Chebyshev 表与事件索引，并完整绘制一张命盘，之后 fork 出的 worker 直接共享这些内存页，
+不必各自重复初始化，第一个请求也不用承担冷启动开销。
+
+app 本身不导入 matplotlib（第一次绘图时才导入 visualization），这里是有意的预加载；
+只提供 JSON 接口或 SVG 的部署可设 PRELOAD_RENDERER=0 跳过，缩短冷启动时间。
+
+waitress（Windows 或无法 fork 的环境，单进程多线程）：
+  python src/wsgi.py
+"""
+import logging
+import os
+
+from app import app
+from ephemeris_data import ensure_ephe_path
+
+logger = logging.getLogger(__name__)
+
+# 预热用的命盘：J2000.0，经纬度 0°
+_WARM_UP_JD = 2451545.0
+
+
+def preload():
+    """在主进程中完成与请求无关的初始化：星历路径、字体缓存与绘图代码路径"""
+    ensure_ephe_path()
+    if os.environ.get("PRELOAD_RENDERER", "1") == "0":
+        return
+    import matplotlib
+    matplotlib.use('Agg')
+    import visualization
+
+    positions = visualization.get_planet_positions(_WARM_UP_JD)
+    house_cusps = visualization.calculate_house_cusps(_WARM_UP_JD, 0.0, 0.0)
+    visualization.render_chart_png(positions, house_cusps, dpi=72)
+    logger.info("Preloaded visualization for WSGI workers")
+
+
+preload()
+application = app
+
+
+if __name__ == "__main__":
+    from waitress import serve
+
+    serve(application, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)),
+          threads=int(os.environ.get("WEB_THREADS", 4)))
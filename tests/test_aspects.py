@@ -0,0 +1,58 @@
+import numpy as np
+
+from aspects import ASPECTS_DEF, calculate_aspects, calculate_aspects_batch, cross_aspects
+
+PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
+
+
+def reference_aspects(planet_positions):
+    # 原 app.py / visualization.py 中逐对循环的实现
+    aspect_lines = []
+    planets = list(planet_positions.keys())
+    for i in range(len(planets)):
+        for j in range(i + 1, len(planets)):
+            pos1 = planet_positions[planets[i]]['position']
+            pos2 = planet_positions[planets[j]]['position']
+            diff = abs(pos1 - pos2) % 360
+            if diff > 180:
+                diff = 360 - diff
+            best = None
+            best_error = None
+            for aspect_angle, orb, color in ASPECTS_DEF:
+                error = abs(diff - aspect_angle)
+                if error <= orb:
+                    if best_error is None or error < best_error:
+                        best = (aspect_angle, color)
+                        best_error = error
+            if best is not None:
+                aspect_angle, color = best
+                aspect_lines.append((planets[i], planets[j], color, diff, aspect_angle))
+    return aspect_lines
+
+
+def _positions(lons):
+    return {name: {'position': lon} for name, lon in zip(PLANETS, lons)}
+
+
+def test_matches_reference_implementation():
+    rng = np.random.default_rng(42)
+    charts = rng.uniform(0, 360, size=(200, len(PLANETS)))
+    # 恰好落在容许度边界与两个相位重叠区的角度
+    charts[0, :4] = [0.0, 48.0, 54.43, 183.0]
+
+    batch = calculate_aspects_batch(charts, PLANETS)
+    for lons, aspects in zip(charts, batch):
+        expected = reference_aspects(_positions(lons.tolist()))
+        assert calculate_aspects(_positions(lons.tolist())) == expected
+        assert aspects == expected
+
+
+def test_cross_aspects():
+    natal = [10.0, 100.0]
+    transit = [[190.0, 70.0], [12.0, 0.0]]
+
+    result = cross_aspects(natal, np.array(transit), ["Sun", "Moon"], ["Mars", "Venus"])
+
+    assert result[0] == [("Sun", "Mars", "red", 180.0, 180), ("Sun", "Venus", "green", 60.0, 60),
+                         ("Moon", "Mars", "blue", 90.0, 90), ("Moon", "Venus", "magenta", 30.0, 30)]
+    assert result[1] == [("Sun", "Mars", "purple", 2.0, 0), ("Moon", "Mars", "blue", 88.0, 90)]
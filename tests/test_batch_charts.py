@@ -0,0 +1,75 @@
+import json
+
+from app import RENDER_PROFILES, app, build_planetary_positions, parse_birth_record
+from visualization import calculate_house_cusps, get_planet_positions
+
+RECORDS = [
+    {"id": "a", "year": 1990, "month": 5, "day": 1, "hour": 10, "minute": 30, "latitude": 25.0, "longitude": 121.5},
+    {"id": "b", "year": 1967, "month": 11, "day": 18, "hour": 10, "minute": 55, "latitude": 25.03, "longitude": 121.3,
+     "house_system": "W"},
+    {"id": "bad", "year": 1990, "month": 5},
+]
+
+
+def read_lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    return sorted((json.loads(line) for line in response.get_data(as_text=True).splitlines()),
+                  key=lambda result: result["index"])
+
+
+def test_batch_matches_single_chart():
+    client = app.test_client()
+    results = read_lines(client.post("/generate-charts", json=RECORDS))
+    assert [result["id"] for result in results] == ["a", "b", "bad"]
+    assert "error" in results[2]
+
+    for record, result in zip(RECORDS[:2], results[:2]):
+        julian_day, latitude, longitude, house_system = parse_birth_record(record)
+        house_cusps = calculate_house_cusps(julian_day, latitude, longitude, house_system)
+        expected = build_planetary_positions(get_planet_positions(julian_day), house_cusps)
+        assert result["planetary_positions"] == expected
+        assert "chart_url" not in result
+
+
+def test_ndjson_input():
+    client = app.test_client()
+    body = "\n".join(json.dumps(record) for record in RECORDS)
+    ndjson = read_lines(client.post("/generate-charts", data=body, content_type="application/x-ndjson"))
+    array = read_lines(client.post("/generate-charts", json=RECORDS))
+    assert ndjson == array
+
+
+def test_rejects_non_array():
+    client = app.test_client()
+    assert client.post("/generate-charts", json=RECORDS[0]).status_code == 400
+
+
+def test_invalid_coordinates_only_fail_their_record():
+    client = app.test_client()
+    records = [dict(RECORDS[0], id="bad-lat", latitude="abc"), RECORDS[0]]
+    results = read_lines(client.post("/generate-charts", json=records))
+    assert results[0]["error"].startswith("Invalid record: latitude")
+    assert "error" not in results[1]
+
+
+def test_polar_placidus_record_does_not_fail_its_group():
+    client = app.test_client()
+    records = [dict(RECORDS[0], id="polar", latitude=70.0, house_system="P"),
+               dict(RECORDS[0], house_system="P"), dict(RECORDS[1], house_system="P")]
+    results = read_lines(client.post("/generate-charts", json=records))
+    assert "error" in results[0]
+    for record, result in zip(records[1:], results[1:]):
+        julian_day, latitude, longitude, house_system = parse_birth_record(record)
+        house_cusps = calculate_house_cusps(julian_day, latitude, longitude, house_system)
+        assert result["planetary_positions"] == build_planetary_positions(get_planet_positions(julian_day), house_cusps)
+
+
+def test_batch_render_caches_same_entry_as_single_chart():
+    client = app.test_client()
+    record = dict(RECORDS[0], latitude=-33.9, longitude=18.4, render=True)
+    batch = read_lines(client.post("/generate-charts", json=[record]))[0]
+    single = client.post("/generate-chart", json=record).get_json()
+    assert single["chart_url"] == batch["chart_url"]
+    assert set(single["variants"]) == set(RENDER_PROFILES)
+    assert client.get(single["variants"]["thumbnail"]).status_code == 200
@@ -0,0 +1,63 @@
+import base64
+
+from blob_store import BlobStore, blob_etag
+from chart_cache import ChartCache
+
+RECORD = {"year": 1971, "month": 7, "day": 4, "hour": 12, "minute": 40, "latitude": 48.9, "longitude": 2.35,
+          "profile": "thumbnail"}
+
+
+def test_blob_store_evicts_by_bytes():
+    store = BlobStore(max_bytes=10)
+    store.put("a.png", b"aaaa")
+    store.put("b.png", b"bbbb")
+    assert store.get("a.png")[0] == b"aaaa"  # a.png 成为最近使用
+    store.put("c.png", b"cccc")
+
+    assert "b.png" not in store
+    assert "a.png" in store and "c.png" in store
+    assert store.total_bytes == 8
+
+
+def test_memory_storage_inline_and_etag(monkeypatch, tmp_path):
+    import app as app_module
+
+    store = BlobStore()
+    monkeypatch.setattr(app_module, "blob_store", store)
+    monkeypatch.setattr(app_module, "chart_cache", ChartCache(tmp_path, blob_store=store))
+    client = app_module.app.test_client()
+
+    result = client.post("/generate-chart?inline=1", json=RECORD).get_json()
+    assert list(tmp_path.iterdir()) == []
+    prefix = "data:image/png;base64,"
+    assert result["chart_data"].startswith(prefix)
+    image_bytes = base64.b64decode(result["chart_data"][len(prefix):])
+
+    image = client.get(result["chart_url"])
+    assert image.status_code == 200 and image.data == image_bytes
+    assert client.get(result["chart_url"], headers={"If-None-Match": image.headers["ETag"]}).status_code == 304
+
+    # 缓存命中时同样附上图片
+    assert client.post("/generate-chart?inline=1", json=RECORD).get_json()["chart_data"] == result["chart_data"]
+    assert "chart_data" not in client.post("/generate-chart", json=RECORD).get_json()
+
+
+def test_lazy_variant_survives_concurrent_eviction(monkeypatch, tmp_path):
+    import app as app_module
+
+    store = BlobStore(max_bytes=1)
+    monkeypatch.setattr(app_module, "blob_store", store)
+    monkeypatch.setattr(app_module, "chart_cache", ChartCache(tmp_path, blob_store=store))
+    render_chart_file = app_module.render_chart_file
+
+    def render_then_evict(*args, **kwargs):
+        image_bytes = render_chart_file(*args, **kwargs)
+        store.put("other.png", b"x")  # 模拟并发请求写入的图片把刚绘制的变体淘汰
+        return image_bytes
+
+    client = app_module.app.test_client()
+    result = client.post("/generate-chart", json=RECORD).get_json()
+    monkeypatch.setattr(app_module, "render_chart_file", render_then_evict)
+    web = client.get(result["variants"]["web"])
+    assert web.status_code == 200 and web.data.startswith(b"\x89PNG")
+    assert web.headers["ETag"] == f'"{blob_etag(web.data)}"'
@@ -0,0 +1,60 @@
+import pickle
+
+import numpy as np
+
+from aspects import calculate_aspects
+from astro import calculate_house_cusps, get_planet_positions, get_positions_array
+from chart import Chart, charts_from_positions
+from ephemeris import planet_codes
+from houses import house_of
+from svg_chart import render_svg
+
+
+def test_chart_derived_fields_match_positions():
+    julian_day = 2447892.5
+    positions = get_planet_positions(julian_day)
+    house_cusps = calculate_house_cusps(julian_day, 25.03, 121.30)
+
+    chart = Chart.from_positions(positions, house_cusps)
+
+    assert chart.positions() == positions
+    assert chart.aspect_lines() == calculate_aspects(positions)
+    for name, sign, degree, house, retrograde in zip(chart.bodies, chart.sign_index.tolist(),
+                                                     chart.degree_in_sign.tolist(), chart.houses.tolist(),
+                                                     chart.retrograde.tolist()):
+        position = positions[name]['position']
+        assert (sign, degree) == (int(position // 30) % 12, position % 30)
+        assert house == house_of(position, house_cusps)
+        assert retrograde == positions[name]['retrograde']
+
+    # 相位元组与 Chart 相互转换后不变，且可以 pickle（交给绘图进程池）
+    again = pickle.loads(pickle.dumps(Chart.from_positions(positions, house_cusps, chart.aspect_lines())))
+    assert again.aspect_lines() == chart.aspect_lines()
+
+
+def test_batch_charts_match_single_charts():
+    julian_days = np.array([2440000.5, 2445000.25, 2450000.75])
+    positions_array = get_positions_array(julian_days)
+    cusps = np.array([calculate_house_cusps(jd, 40.7, -74.0) for jd in julian_days])
+
+    charts = charts_from_positions(positions_array, cusps, planet_codes)
+
+    for julian_day, chart in zip(julian_days, charts):
+        single = Chart.from_positions(get_planet_positions(julian_day), calculate_house_cusps(julian_day, 40.7, -74.0))
+        assert np.array_equal(chart.houses, single.houses)
+        assert chart.aspect_lines() == single.aspect_lines()
+
+
+def test_from_positions_keeps_caller_colors():
+    positions = get_planet_positions(2447892.5)
+    house_cusps = calculate_house_cusps(2447892.5, 25.03, 121.30)
+    # 自定义颜色的 5 元组与缺少相位角的 4 元组：颜色保留，后者的相位角按合相
+    lines = [("Sun", "Moon", "black", 88.5, 90), ("Sun", "Mars", "#123456", 3.0)]
+
+    chart = Chart.from_positions(positions, house_cusps, lines)
+
+    assert chart.line_colors() == ["black", "#123456"]
+    assert chart.aspect_lines() == [("Sun", "Moon", "black", 88.5, 90), ("Sun", "Mars", "#123456", 3.0, 0)]
+    assert 'stroke="#123456"' in render_svg(chart)
+    assert Chart.from_positions(positions, house_cusps).line_colors() == \
+        [color for _, _, color, _, _ in calculate_aspects(positions)]
@@ -0,0 +1,87 @@
+import os
+import time
+
+from chart_cache import ChartCache, chart_filename, chart_key
+
+
+def _touch(folder, key):
+    path = folder / chart_filename(key)
+    path.write_bytes(b"png")
+    return path
+
+
+def test_chart_key_normalizes_inputs():
+    key = chart_key(2451545.0, 25.03, 121.5, "P", {"dpi": 300})
+
+    assert key == chart_key(2451545.00000001, 25.030001, 121.50000004, "P", {"dpi": 300})
+    assert key != chart_key(2451545.0, 25.03, 121.5, "K", {"dpi": 300})
+    assert key != chart_key(2451545.0, 25.03, 121.5, "P", {"dpi": 100})
+    assert len(key) == 32
+
+
+def test_lru_eviction_removes_files(tmp_path):
+    cache = ChartCache(tmp_path, max_entries=2)
+    keys = [chart_key(2451545.0 + i, 0, 0, "P") for i in range(3)]
+    paths = [_touch(tmp_path, key) for key in keys]
+
+    cache.put(keys[0], {"filename": paths[0].name})
+    cache.put(keys[1], {"filename": paths[1].name})
+    assert cache.get(keys[0]) is not None  # keys[0] 成为最近使用
+    cache.put(keys[2], {"filename": paths[2].name})
+
+    assert cache.get(keys[1]) is None
+    assert not paths[1].exists()
+    assert paths[0].exists() and paths[2].exists()
+
+
+def test_existing_files_are_indexed(tmp_path):
+    key = chart_key(2451545.0, 0, 0, "P")
+    path = _touch(tmp_path, key)
+    (tmp_path / "unrelated.txt").write_text("x")
+
+    cache = ChartCache(tmp_path, max_entries=10)
+
+    assert cache.get(key) == {"filename": path.name}
+    os.remove(path)
+    assert cache.get(key) is None
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    cache = ChartCache(tmp_path, max_entries=10, max_age=60, sweep_interval=None)
+    keys = [chart_key(2451545.0 + i, 0, 0, "P") for i in range(2)]
+    paths = [_touch(tmp_path, key) for key in keys]
+    cache.put(keys[0], {"filename": paths[0].name})
+    cache.put(keys[1], {"filename": paths[1].name})
+
+    assert cache.sweep() == 0
+    assert cache.sweep(now=time.time() + 61) == 2
+    assert len(cache) == 0 and cache.total_bytes == 0
+    assert not paths[0].exists() and not paths[1].exists()
+
+
+def test_sweep_enforces_byte_quota(tmp_path):
+    cache = ChartCache(tmp_path, max_entries=10, max_bytes=7, sweep_interval=None)
+    keys = [chart_key(2451545.0 + i, 0, 0, "P") for i in range(3)]
+    paths = [_touch(tmp_path, key) for key in keys]  # 每个文件 3 字节
+    for key, path in zip(keys, paths):
+        cache.put(key, {"filename": path.name})
+    assert cache.total_bytes == 9
+
+    assert cache.sweep() == 1
+    assert cache.total_bytes == 6
+    assert not paths[0].exists()
+    assert cache.get(keys[1]) is not None and cache.get(keys[2]) is not None
+
+
+def test_janitor_starts_on_get(tmp_path):
+    keys = [chart_key(2451545.0 + i, 0, 0, "P") for i in range(2)]
+    paths = [_touch(tmp_path, key) for key in keys]
+    os.utime(paths[0], (time.time() - 120, time.time() - 120))
+
+    # 重启后只有缓存命中、没有写入时，索引的过期文件同样会被清理
+    cache = ChartCache(tmp_path, max_entries=10, max_age=60, sweep_interval=0.05)
+    assert cache.get(keys[1]) is not None
+    deadline = time.time() + 5
+    while paths[0].exists() and time.time() < deadline:
+        time.sleep(0.05)
+    assert not paths[0].exists() and paths[1].exists()
@@ -0,0 +1,77 @@
+import matplotlib
+
+matplotlib.use('Agg')
+
+from matplotlib.figure import Figure  # noqa: E402
+
+import visualization  # noqa: E402
+from visualization import (  # noqa: E402
+    calculate_aspects, calculate_house_cusps, draw_natal_chart, get_julian_day_with_time,
+    get_planet_positions, layout_planets, plot_natal_chart
+)
+
+LATITUDE, LONGITUDE = 25.03, 121.30
+
+
+def _chart_inputs(year=1990):
+    julian_day = get_julian_day_with_time(year, 5, 21, 14, 30, 0, 8)
+    positions = get_planet_positions(julian_day)
+    return positions, calculate_house_cusps(julian_day, LATITUDE, LONGITUDE), julian_day
+
+
+def _draw(positions, house_cusps, aspect_lines):
+    ax = visualization._draw_chart_background(Figure(figsize=(14, 10)))
+    base_texts, base_lines = len(ax.texts), len(ax.lines)
+    draw_natal_chart(ax, positions, house_cusps, aspect_lines)
+    return len(ax.texts) - base_texts, len(ax.lines) - base_lines, len(ax.tables)
+
+
+def test_artist_count_is_linear_in_aspects():
+    positions, house_cusps, _ = _chart_inputs()
+    aspect_lines = calculate_aspects(positions)
+    retrograde = sum(data['retrograde'] for data in positions.values())
+    assert len(aspect_lines) > 5
+
+    texts, lines, tables = _draw(positions, house_cusps, aspect_lines)
+
+    # 宫头星座 12 + 宫位编号 12 + ASC/MC/IC/DSC 4 + 每个相位一个符号
+    # + 每颗行星的符号、度数、星座 3 个文本 + 逆行标记
+    assert texts == 12 + 12 + 4 + len(aspect_lines) + 3 * len(positions) + retrograde
+    # 宫头线 12 + 四轴线 4 + 每个相位一条线
+    assert lines == 12 + 4 + len(aspect_lines)
+    assert tables == 2
+
+
+def test_chart_without_aspects(tmp_path):
+    positions, house_cusps, julian_day = _chart_inputs()
+    retrograde = sum(data['retrograde'] for data in positions.values())
+
+    texts, lines, tables = _draw(positions, house_cusps, [])
+    assert texts == 28 + 3 * len(positions) + retrograde
+    assert (lines, tables) == (16, 2)
+
+    output_path = tmp_path / "chart.png"
+    plot_natal_chart(positions, julian_day, LATITUDE, LONGITUDE, aspect_lines=[],
+                     output_path=str(output_path), show=False)
+    assert output_path.exists()
+
+
+def test_template_is_restored_after_render(tmp_path):
+    positions, _, julian_day = _chart_inputs()
+    plot_natal_chart(positions, julian_day, LATITUDE, LONGITUDE,
+                     output_path=str(tmp_path / "chart.png"), show=False)
+
+    _, ax, base_artists = visualization._get_chart_template()
+    assert set(ax.get_children()) == base_artists
+
+
+def test_layout_planets_avoids_overlap():
+    positions = {name: {'position': 100.0 + i, 'retrograde': False, 'speed': 1.0}
+                 for i, name in enumerate(["Sun", "Moon", "Mercury", "Venus"])}
+
+    layout = layout_planets(positions, offset=100.0)
+
+    assert [planet for planet, _, _ in layout] == list(positions)
+    assert layout[0][1] == 0.0
+    planet_angles = sorted(planet_angle for _, planet_angle, _ in layout)
+    assert all(b - a >= 3 for a, b in zip(planet_angles, planet_angles[1:]))
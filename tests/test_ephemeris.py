@@ -0,0 +1,26 @@
+import numpy as np
+import swisseph as swe
+
+from ephemeris import PositionEngine, POSITION_DTYPE, planet_codes
+
+
+def test_engine_matches_swe_calc():
+    engine = PositionEngine()
+    jds = np.array([2433282.5, 2451545.0, 2460000.25])
+    result = engine.calc(jds)
+
+    assert result.dtype == POSITION_DTYPE
+    assert result.shape == (3, len(planet_codes))
+    for i, jd in enumerate(jds):
+        for j, code in enumerate(planet_codes.values()):
+            xx, _ = swe.calc(jd, code, swe.FLG_SWIEPH | swe.FLG_SPEED)
+            assert result['lon'][i, j] == xx[0] % 360
+            assert result['speed'][i, j] == xx[3]
+
+
+def test_engine_positions_dict_format():
+    positions = PositionEngine(bodies=["Sun", "Mercury"]).positions(2451545.0)
+
+    assert list(positions) == ["Sun", "Mercury"]
+    assert set(positions["Sun"]) == {"position", "retrograde", "speed"}
+    assert positions["Sun"]["retrograde"] is False
@@ -0,0 +1,24 @@
+import swisseph as swe
+
+import ephemeris_data
+from ephemeris import PositionEngine
+
+
+def test_file_names_for_block():
+    assert ephemeris_data.block_of_year(1900) == 18
+    assert ephemeris_data.block_of_year(2400) == 24
+    assert ephemeris_data.block_of_year(-1) == -6
+    assert ephemeris_data.file_names_for_block(18) == ["sepl_18.se1", "semo_18.se1"]
+    assert ephemeris_data.file_names_for_block(-6) == ["seplm06.se1", "semom06.se1"]
+
+
+def test_engine_uses_swiss_ephemeris_files():
+    _, backend = PositionEngine().calc_with_backend([2415020.5, 2451545.0])
+
+    assert backend == "swisseph"
+    assert {"sepl_18.se1", "semo_18.se1"} <= set(ephemeris_data.mapped_files())
+
+
+def test_backend_name():
+    assert ephemeris_data.backend_name(swe.FLG_SWIEPH | swe.FLG_SPEED) == "swisseph"
+    assert ephemeris_data.backend_name(swe.FLG_MOSEPH | swe.FLG_SPEED) == "moshier"
@@ -0,0 +1,29 @@
+import numpy as np
+
+from ephemeris import PositionEngine
+from ephemeris_table import build_table, load_table
+
+
+def test_table_matches_engine_within_error_bound(tmp_path):
+    start_jd = 2451545.0
+    table = build_table(start_jd, start_jd + 365)
+    path = tmp_path / "table.npz"
+    table.save(path)
+    loaded = load_table(str(path))
+
+    jds = np.linspace(start_jd, start_jd + 360, 97)
+    expected = PositionEngine().calc(jds)
+    for result in (loaded.calc(jds), np.concatenate([loaded.calc(jd) for jd in jds])):
+        for j, body in enumerate(loaded.bodies):
+            lon_error = np.abs((result['lon'][:, j] - expected['lon'][:, j] + 180) % 360 - 180)
+            assert lon_error.max() <= max(loaded.lon_error[body], 1e-6) * 2
+            assert np.all(np.sign(result['speed'][:, j]) == np.sign(expected['speed'][:, j]))
+
+
+def test_table_coverage():
+    table = build_table(2451545.0, 2451545.0 + 40, bodies=["Sun", "Moon"])
+
+    assert table.covers(2451545.0)
+    assert not table.covers(2451544.9)
+    assert not table.covers([2451550.0, table.end_jd])
+    assert load_table("does-not-exist.npz") is None
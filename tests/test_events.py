@@ -0,0 +1,125 @@
+import json
+
+import numpy as np
+
+import events
+from app import app
+from visualization import get_planet_positions, get_positions_array
+
+START_JD = 2460676.5  # 2025-01-01
+NATAL = get_planet_positions(2447000.3)
+
+
+def brute_force_crossings(start_jd, end_jd, bodies):
+    """每 0.02 日采样一次，统计目标角距变号的次数作为对照"""
+    jds = np.arange(start_jd, end_jd, 0.02)
+    lons = get_positions_array(jds)['lon']
+    names, angles, targets = events._aspect_targets(NATAL, events.MAJOR_ASPECTS)
+    counts = {}
+    for body in bodies:
+        lon = lons[:, list(NATAL).index(body)]
+        f = events._wrap180(lon[:, None] - targets[None, :])
+        f1 = f[:-1] + events._wrap180(np.diff(lon))[:, None]
+        for k in np.nonzero((f[:-1] < 0) != (f1 < 0))[1]:
+            key = (body, names[k], angles[k])
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def test_matches_dense_sampling():
+    bodies = ["Sun", "Mercury", "Mars", "Saturn"]
+    found = list(events.find_aspect_events(START_JD, START_JD + 365, NATAL, transit_bodies=bodies))
+    counts = {}
+    for event in found:
+        key = (event["transit"], event["natal"], event["aspect"])
+        counts[key] = counts.get(key, 0) + 1
+    assert counts == brute_force_crossings(START_JD, START_JD + 365, bodies)
+    assert [event["jd"] for event in found] == sorted(event["jd"] for event in found)
+
+    # 根处的实际角距与相位角之差小于 0.1″
+    for event in found[:50]:
+        lon = events._engine((event["transit"],)).calc(event["jd"])['lon'][0, 0]
+        separation = abs(events._wrap180(lon - NATAL[event["natal"]]["position"]))
+        assert abs(separation - event["aspect"]) < 0.1 / 3600
+
+
+def test_double_crossing_around_station():
+    # 本命点取 2025 年 3 月水星停滞（约 3 月 15 日）附近的黄经：停滞前顺行、停滞后逆行各穿越一次，
+    # 即使两次穿越落在同一个 5 日的粗网格区间内也不应互相抵消
+    station_jd = 2460749.5
+    natal = {"Point": {"position": float(events._engine(("Mercury",)).calc(station_jd)['lon'][0, 0]) - 0.01}}
+    found = list(events.find_aspect_events(station_jd - 12, station_jd + 8, natal, ["Mercury"], aspects=(0,),
+                                           step_days=5))
+    assert len(found) == 2
+    assert [event["retrograde"] for event in found] == [False, True]
+
+
+def test_transit_aspects_route():
+    client = app.test_client()
+    response = client.post("/transit-aspects", json={
+        "year": 1990, "month": 5, "day": 1, "hour": 10, "minute": 30, "latitude": 25.0, "longitude": 121.5,
+        "start": "2025-01-01T00:00:00+00:00", "end": "2025-07-01T00:00:00+00:00", "bodies": ["Mars"]})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines and all(line["transit"] == "Mars" for line in lines)
+    assert lines[0]["datetime"].startswith("2025-")
+
+    # 空的或格式错误的 bodies、aspects 在开始输出前以 400 拒绝
+    for invalid in ({"bodies": []}, {"aspects": []}, {"aspects": "90"}, {"aspects": [True]}, {"bodies": [["Mars"]]},
+                  {"bodies": "Mars"}, {"bodies": ["Mars", "Mars"]}, {"bodies": ["Vulcan"]}, {"aspects": [200]}):
+        response = client.post("/transit-aspects", json={
+            "year": 1990, "month": 5, "day": 1, "hour": 10, "minute": 30, "latitude": 25.0, "longitude": 121.5,
+            "start": "2025-01-01T00:00:00+00:00", "end": "2025-07-01T00:00:00+00:00", **invalid})
+        assert response.status_code == 400
+
+
+def test_empty_body_list_finds_nothing():
+    assert list(events.find_ingresses(START_JD, START_JD + 30, [])) == []
+    assert list(events.find_stations(START_JD, START_JD + 30, [])) == []
+    assert list(events.find_aspect_events(START_JD, START_JD + 30, NATAL, [])) == []
+
+
+def test_stations_and_ingresses_match_dense_sampling():
+    jds = np.arange(START_JD, START_JD + 365, 0.02)
+    positions = get_positions_array(jds)
+    speed_changes = np.sum((positions['speed'][:-1] < 0) != (positions['speed'][1:] < 0))
+    sign_changes = np.sum(positions['lon'][:-1] // 30 != positions['lon'][1:] // 30)
+
+    stations = list(events.find_stations(START_JD, START_JD + 365))
+    ingresses = list(events.find_ingresses(START_JD, START_JD + 365))
+    assert len(stations) == speed_changes
+    assert len(ingresses) == sign_changes
+    for event in stations:
+        assert abs(events._engine((event["body"],)).calc(event["jd"])['speed'][0, 0]) < 1e-6
+    for event in ingresses[:50]:
+        lon = events._engine((event["body"],)).calc(event["jd"])['lon'][0, 0]
+        assert abs(events._wrap180(lon - round(lon / 30) * 30)) < 0.1 / 3600
+
+
+def test_event_index_round_trip(tmp_path):
+    index = events.build_event_index(START_JD, START_JD + 400, ["Mercury", "Mars"])
+    path = tmp_path / "event_index.npz"
+    index.save(path)
+    loaded = events.load_event_index(str(path))
+
+    def same_event(a, b):
+        # 搜索窗口不同，根只在求根精度内一致
+        return a["event"] == b["event"] and abs(a["jd"] - b["jd"]) < 1e-5
+
+    stations = ("station_retrograde", "station_direct")
+    for jd in (START_JD, START_JD + 100.3, START_JD + 250):
+        assert loaded.covers(jd)
+        assert same_event(events.find_next_event(jd, "Mercury", stations, loaded),
+                          events.find_next_event(jd, "Mercury", stations))
+        ingress = loaded.next_event(jd, "Mars", "ingress")
+        assert same_event(ingress, events.find_next_event(jd, "Mars"))
+        assert ingress["sign"] == events.find_next_event(jd, "Mars")["sign"]
+    # 索引范围外不做回答，由 find_next_event 改为即时搜索
+    assert loaded.next_event(START_JD + 500, "Mars") is None
+    assert events.find_next_event(START_JD + 500, "Mars", index=loaded)["jd"] > START_JD + 500
+
+    client = app.test_client()
+    response = client.post("/next-event", json={"body": "Mercury", "type": "station", "after": "2025-01-01T08:00:00"})
+    assert response.status_code == 200
+    assert response.get_json()["event"] in ("station_retrograde", "station_direct")
+    for body in (["Mars"], {"name": "Mars"}, "Vulcan"):
+        assert client.post("/next-event", json={"body": body}).status_code == 400
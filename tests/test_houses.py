@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import swisseph as swe
+
+import houses
+
+
+def test_matches_swisseph():
+    cusps, ascmc = houses.compute_houses(2451545.0, 25.03, 121.30)
+    expected_cusps, expected_ascmc = swe.houses(2451545.0, 25.03, 121.30, b"P")
+    assert cusps == tuple(expected_cusps)
+    assert ascmc == tuple(expected_ascmc)
+
+
+def test_repeated_call_hits_cache():
+    before = houses.cache_info().hits
+    houses.house_cusps(2440000.25, -33.9, 18.4)
+    houses.house_cusps(2440000.25, -33.9, 18.4)
+    assert houses.cache_info().hits == before + 1
+
+
+def test_thread_pool_results_are_consistent():
+    rng = np.random.default_rng(0)
+    charts = list(zip(rng.uniform(2415020, 2488070, 200).tolist(),
+                      rng.uniform(-60, 60, 200).tolist(),
+                      rng.uniform(-180, 180, 200).tolist()))
+    expected = [tuple(swe.houses(jd, lat, lon, b"P")[0]) for jd, lat, lon in charts]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda chart: houses.house_cusps(*chart), charts))
+    assert results == expected
+
+
+def test_batch_houses_match_swisseph():
+    rng = np.random.default_rng(1)
+    # 30 日内的密集时刻走闭式解（插值恒星时，误差约 0.005″），跨越百年的稀疏时刻逐个调用 swe.houses
+    for span in (30, 36500):
+        jds = 2451545.0 + rng.uniform(0, span, 2000)
+        lats = rng.uniform(-85, 85, 2000)
+        lons = rng.uniform(-180, 180, 2000)
+        for house_system in houses.HOUSE_SYSTEMS:
+            # Placidus、Koch 在极圈内无解，其余宫位系统覆盖到 ±85°
+            sys_lats = np.clip(lats, -60, 60) if house_system in ("P", "K") else lats
+            cusps, ascmc = houses.batch_houses(jds, sys_lats, lons, house_system)
+            expected = [swe.houses(jd, lat, lon, house_system.encode())
+                        for jd, lat, lon in zip(jds, sys_lats, lons)]
+            cusp_error = (cusps - np.array([c for c, _ in expected]) + 180) % 360 - 180
+            ascmc_error = (ascmc - np.array([a[:3] for _, a in expected]) + 180) % 360 - 180
+            assert np.abs(cusp_error).max() < 0.05 / 3600, house_system
+            assert np.abs(ascmc_error).max() < 0.05 / 3600, house_system
+
+
+def test_assign_houses_handles_wraparound():
+    # 第 8 宫跨越 0°（342.7° -> 12.2°）
+    cusps = [137.05, 162.73, 192.19, 224.42, 256.86, 287.80, 317.05, 342.73, 12.19, 44.42, 76.86, 107.80]
+    lons = [137.05, 350.0, 5.0, 12.19, 100.0, 136.9]
+    assert houses.assign_houses(lons, cusps).tolist() == [1, 8, 8, 9, 11, 12]
+    assert [houses.house_of(lon, cusps) for lon in lons] == [1, 8, 8, 9, 11, 12]
+    batch = houses.assign_houses(np.array([lons, lons]), np.array([cusps, cusps]))
+    assert batch.tolist() == [[1, 8, 8, 9, 11, 12]] * 2
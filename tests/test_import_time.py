@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# 冷启动导入 app 的时间上限（秒），远大于实测值（1 核约 0.3 秒），只用于发现明显的退化
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", 5.0))
+
+
+def _import_in_subprocess(module, tmp_path):
+    script = (f"import sys, time\nstart = time.perf_counter()\nimport {module}\n"
+              f"print(time.perf_counter() - start, int('matplotlib' in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=SRC_DIR, CHART_OUTPUT_FOLDER=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, check=True)
+    return result.stdout.split()
+
+
+def test_app_import_skips_matplotlib(tmp_path):
+    elapsed, has_matplotlib = _import_in_subprocess("app", tmp_path)[-2:]
+    assert has_matplotlib == "0"
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+
+
+def test_calculator_import_has_no_side_effects(tmp_path):
+    # 导入时不再计算行星位置、也不输出任何内容
+    assert len(_import_in_subprocess("calculator", tmp_path)) == 2
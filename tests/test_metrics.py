@@ -0,0 +1,35 @@
+from app import app
+from metrics import Histogram, server_timing_header
+
+
+def test_histogram_exposition():
+    histogram = Histogram("demo_seconds", "Demo", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="a")
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP demo_seconds Demo", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{stage="a"} 4.05' in lines
+    assert server_timing_header([("a", 0.001), ("b", 0.5), ("a", 0.002)]) == "a;dur=3.00, b;dur=500.00"
+
+
+def test_server_timing_and_metrics_endpoint():
+    client = app.test_client()
+    record = {"year": 1977, "month": 8, "day": 16, "hour": 15, "minute": 30, "latitude": 35.1, "longitude": -90.0,
+              "format": "svg"}
+    first = client.post("/generate-chart", json=record)
+    stages = [item.split(";")[0] for item in first.headers["Server-Timing"].split(", ")]
+    assert stages[:4] == ["julian_day", "positions", "aspects", "houses"]
+    assert stages[-1] == "total"
+    client.post("/generate-chart", json=record)
+
+    response = client.get("/metrics")
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert 'chart_stage_seconds_count{stage="positions"}' in text
+    assert 'chart_cache_requests_total{result="hit"}' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="generate_chart",le="+Inf"}' in text
+    for name in ("render_queue_depth", "chart_cache_bytes", "chart_cache_entries"):
+        assert f"\n{name} " in text
@@ -0,0 +1,20 @@
+import visualization
+from aspects import calculate_aspects
+from render_pool import RenderPool
+
+
+def test_pool_matches_in_process_render():
+    julian_day = 2448000.5
+    positions = visualization.get_planet_positions(julian_day)
+    house_cusps = visualization.calculate_house_cusps(julian_day, 25.03, 121.30)
+    aspect_lines = calculate_aspects(positions)
+    expected = visualization.render_chart_png(positions, house_cusps, aspect_lines, dpi=50)
+
+    # 每个进程只绘制一张就重启，同时检验进程回收
+    render_pool = RenderPool(processes=1, max_tasks_per_child=1)
+    try:
+        results = [render_pool.render(positions, house_cusps, aspect_lines, dpi=50) for _ in range(2)]
+    finally:
+        render_pool.shutdown()
+    assert results[0].startswith(b"\x89PNG")
+    assert results == [expected, expected]
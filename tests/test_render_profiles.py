@@ -0,0 +1,37 @@
+import io
+
+from PIL import Image
+
+from app import app
+
+RECORD = {"year": 1984, "month": 3, "day": 9, "hour": 6, "minute": 15, "latitude": 22.3, "longitude": 114.2}
+
+
+def test_thumbnail_with_lazy_variants():
+    client = app.test_client()
+    response = client.post("/generate-chart", json=dict(RECORD, profile="thumbnail"))
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["variants"]["thumbnail"] == result["chart_url"]
+
+    thumbnail = Image.open(io.BytesIO(client.get(result["chart_url"]).data))
+    # 其他分辨率在第一次请求时才绘制
+    web = client.get(result["variants"]["web"])
+    assert web.status_code == 200
+    assert Image.open(io.BytesIO(web.data)).width > thumbnail.width
+
+    # 之后以该分辨率请求同一命盘直接命中缓存
+    again = client.post("/generate-chart", json=dict(RECORD, profile="web")).get_json()
+    assert again["chart_url"] == result["variants"]["web"]
+
+
+def test_webp_and_palette_png():
+    client = app.test_client()
+    for chart_format, image_format, mimetype in (("webp", "WEBP", "image/webp"), ("png8", "PNG", "image/png")):
+        result = client.post("/generate-chart", json=dict(RECORD, format=chart_format, profile="thumbnail")).get_json()
+        image = client.get(result["chart_url"])
+        assert image.mimetype == mimetype
+        assert Image.open(io.BytesIO(image.data)).format == image_format
+
+    assert client.post("/generate-chart", json=dict(RECORD, profile="poster")).status_code == 400
+    assert client.post("/generate-chart", json=dict(RECORD, profile={"dpi": 72})).status_code == 400
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from render_queue import RenderQueue, RenderQueueFull
+
+
+def test_runs_task_and_callback():
+    done = []
+    render_queue = RenderQueue(workers=1, max_pending=4)
+    render_queue.submit("a.png", done.append, "rendered", on_done=lambda: done.append("callback"))
+    render_queue.join()
+    assert done == ["rendered", "callback"]
+    assert not render_queue.is_pending("a.png")
+
+
+def test_bounded_queue_and_dedup():
+    release = threading.Event()
+    render_queue = RenderQueue(workers=1, max_pending=2)
+    render_queue.submit("a.png", release.wait)
+    render_queue.submit("b.png", lambda: None)
+    # 相同文件名重复提交不占用额外名额
+    render_queue.submit("a.png", release.wait)
+    assert render_queue.pending_count() == 2
+    with pytest.raises(RenderQueueFull):
+        render_queue.submit("c.png", lambda: None)
+    assert render_queue.retry_after() >= 1
+
+    release.set()
+    render_queue.join()
+    assert render_queue.pending_count() == 0
+
+
+def test_failed_task_is_not_pending():
+    done = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    render_queue = RenderQueue(workers=1, max_pending=1)
+    render_queue.submit("a.png", fail, on_done=lambda: done.append("callback"))
+    render_queue.join()
+    assert done == []
+    assert not render_queue.is_pending("a.png")
+
+
+def test_inflight_render_cap(monkeypatch):
+    import app as app_module
+
+    # 占满绘图名额后，同步绘图请求在 RENDER_SLOT_TIMEOUT 后返回 503
+    monkeypatch.setattr(app_module, "render_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(app_module, "RENDER_SLOT_TIMEOUT", 0.01)
+    app_module.render_slots.acquire()
+    response = app_module.app.test_client().post("/generate-chart", json={
+        "year": 1955, "month": 2, "day": 24, "hour": 19, "minute": 15, "latitude": 37.8, "longitude": -122.4})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,33 @@
+import pytest
+
+from app import app, store_chart
+
+RECORD = {"year": 1962, "month": 10, "day": 5, "hour": 9, "minute": 45, "latitude": 51.5, "longitude": -0.1,
+          "format": "svg"}
+
+
+def test_generate_chart_validates_coordinates():
+    client = app.test_client()
+    for latitude, longitude in (("abc", 0), (91, 0), (0, 200), (True, 0), ([1], 0)):
+        response = client.post("/generate-chart", json=dict(RECORD, latitude=latitude, longitude=longitude))
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+    # 数字字符串转换为数值后返回
+    result = client.post("/generate-chart", json=dict(RECORD, latitude="51.5", longitude="-0.1")).get_json()
+    assert (result["latitude"], result["longitude"]) == (51.5, -0.1)
+
+
+def test_generate_chart_requires_boolean_async():
+    client = app.test_client()
+    for value in ("false", "true", 1, None):
+        assert client.post("/generate-chart", json=dict(RECORD, **{"async": value})).status_code == 400
+    assert client.post("/generate-chart", json=dict(RECORD, **{"async": False})).status_code == 200
+
+
+def test_store_chart_removes_temp_file_on_failure(tmp_path):
+    # 目标路径是目录，os.replace 失败
+    (tmp_path / "natal_chart_x.png").mkdir()
+    with pytest.raises(OSError):
+        store_chart(str(tmp_path / "natal_chart_x.png"), b"data")
+    assert [path.name for path in tmp_path.iterdir()] == ["natal_chart_x.png"]
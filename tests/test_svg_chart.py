@@ -0,0 +1,37 @@
+import xml.etree.ElementTree as ET
+
+from app import app
+from svg_chart import render_chart_svg
+from visualization import calculate_aspects, calculate_house_cusps, get_julian_day_with_time, get_planet_positions
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+def test_svg_contains_chart_elements():
+    julian_day = get_julian_day_with_time(1990, 5, 21, 14, 30, 0, 8)
+    positions = get_planet_positions(julian_day)
+    aspect_lines = calculate_aspects(positions)
+    root = ET.fromstring(render_chart_svg(positions, calculate_house_cusps(julian_day, 25.03, 121.30), aspect_lines))
+
+    # 宫头线 12 + 四轴线 4 + 每个相位一条线
+    assert len(root.findall(f"{SVG_NS}line")) == 12 + 4 + len(aspect_lines)
+    assert len(root.findall(f"{SVG_NS}circle")) == 5
+    texts = [text.text for text in root.iter(f"{SVG_NS}text")]
+    assert "ASC" in texts and "MC" in texts
+    assert sum(text == "R" for text in texts) == sum(data['retrograde'] for data in positions.values())
+
+
+def test_generate_chart_svg_format():
+    client = app.test_client()
+    record = {"year": 1990, "month": 5, "day": 1, "hour": 10, "minute": 30, "latitude": 25.0, "longitude": 121.5}
+    response = client.post("/generate-chart", json=dict(record, format="svg"))
+    assert response.status_code == 200
+    chart_url = response.get_json()["chart_url"]
+    assert chart_url.endswith(".svg")
+
+    image = client.get(chart_url)
+    assert image.mimetype == "image/svg+xml"
+    assert image.get_data(as_text=True).startswith("<svg")
+
+    assert client.post("/generate-chart", json=dict(record, format="gif")).status_code == 400
+    assert client.post("/generate-chart", json=dict(record, format=["svg"])).status_code == 400
@@ -0,0 +1,64 @@
+import numpy as np
+
+from app import app, parse_birth_record
+from aspects import angular_distance, match_aspects, ASPECTS_DEF
+from houses import house_of
+from synastry import composite_cusps, midpoints
+from visualization import calculate_house_cusps, get_planet_positions
+
+PERSON1 = {"year": 1990, "month": 5, "day": 1, "hour": 10, "minute": 30, "latitude": 25.0, "longitude": 121.5}
+PERSON2 = {"year": 1967, "month": 11, "day": 18, "hour": 10, "minute": 55, "latitude": 25.03, "longitude": 121.3,
+           "house_system": "W"}
+
+
+def test_midpoints_take_shorter_arc():
+    assert np.allclose(midpoints([10, 350, 100], [20, 20, 300]), [15, 5, 20])
+
+
+def test_synastry_matches_pairwise_loop():
+    response = app.test_client().post("/synastry", json={"person1": PERSON1, "person2": PERSON2})
+    assert response.status_code == 200
+    result = response.get_json()
+
+    parsed = [parse_birth_record(person) for person in (PERSON1, PERSON2)]
+    positions = [get_planet_positions(item[0]) for item in parsed]
+    cusps = [calculate_house_cusps(*item) for item in parsed]
+    expected = []
+    for planet1, data1 in positions[0].items():
+        for planet2, data2 in positions[1].items():
+            k = int(match_aspects(angular_distance(data1["position"], data2["position"])))
+            if k >= 0:
+                expected.append((planet1, planet2, ASPECTS_DEF[k][0]))
+    assert [(*item["planets"], item["aspect"]) for item in result["aspects"]] == expected
+
+    overlays = result["house_overlays"]
+    for planet, data in positions[0].items():
+        assert overlays["person1_in_person2"][planet] == house_of(data["position"], cusps[1])
+    for planet, data in positions[1].items():
+        assert overlays["person2_in_person1"][planet] == house_of(data["position"], cusps[0])
+
+
+def test_composite_and_invalid_request():
+    client = app.test_client()
+    person2 = dict(PERSON2, house_system="P")
+    response = client.post("/composite", json={"person1": PERSON1, "person2": person2})
+    assert response.status_code == 200
+    composite = response.get_json()["composite"]
+    assert len(composite["house_cusps"]) == 12
+    assert len(composite["planetary_positions"]) == len(get_planet_positions(2451545.0))
+
+    assert client.post("/composite", json={"person1": PERSON1}).status_code == 400
+    # 不同宫位系统的宫头不能取中点
+    assert client.post("/composite", json={"person1": PERSON1, "person2": PERSON2}).status_code == 400
+
+
+def test_composite_cusps_stay_in_order():
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        cusps = [calculate_house_cusps(rng.uniform(2415020, 2488070), rng.uniform(-60, 60), rng.uniform(-180, 180))
+                 for _ in range(2)]
+        result = composite_cusps(*cusps)
+        # 从第 1 宫宫头起沿黄道递增，且每个宫头都是两人对应宫头的中点之一
+        assert np.all(np.diff((result - result[0]) % 360) > 0)
+        distance = angular_distance(result, midpoints(*cusps))
+        assert np.all(np.isclose(distance, 0) | np.isclose(distance, 180))
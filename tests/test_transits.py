@@ -0,0 +1,43 @@
+import io
+import json
+
+import numpy as np
+
+import transits
+from app import app
+from visualization import get_positions_array
+
+START_JD = 2460676.5  # 2025-01-01 00:00 UT
+STEP_DAYS = 1 / 24
+
+
+def test_chunks_match_single_batch():
+    jds, positions = transits.transits(START_JD, START_JD + 3, STEP_DAYS)
+    assert len(jds) == transits.transit_count(START_JD, START_JD + 3, STEP_DAYS) == 72
+    chunks = list(transits.iter_transits(START_JD, START_JD + 3, STEP_DAYS, chunk_steps=10))
+    assert [offset for offset, *_ in chunks] == list(range(0, 72, 10))
+    assert np.array_equal(np.concatenate([chunk_jds for _, chunk_jds, _, _ in chunks]), jds)
+    np.testing.assert_allclose(positions['lon'], get_positions_array(jds)['lon'])
+
+
+def test_npy_stream_loads_with_numpy():
+    data = b"".join(transits.iter_npy_bytes(START_JD, START_JD + 1, STEP_DAYS, chunk_steps=7))
+    records = np.load(io.BytesIO(data))
+    jds, positions = transits.transits(START_JD, START_JD + 1, STEP_DAYS)
+    assert np.array_equal(records['jd'], jds)
+    assert np.array_equal(records['lon'], positions['lon'])
+    assert np.array_equal(records['speed'], positions['speed'])
+
+
+def test_transits_route_json():
+    client = app.test_client()
+    response = client.post("/transits", json={"start": "2025-01-01T00:00:00+00:00",
+                                              "end": "2025-01-02T00:00:00+00:00", "step_minutes": 30})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]["count"] == 48
+    assert lines[0]["start_jd"] == START_JD
+    assert len(lines[1]["jd"]) == 48
+    assert len(lines[1]["lon"]["Moon"]) == 48
+
+    bad = client.post("/transits", json={"start": "2025-01-01", "end": "2025-01-02", "step_minutes": 0})
+    assert bad.status_code == 400